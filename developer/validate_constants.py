@@ -3,15 +3,36 @@
 # This is a script that generates and validates the standard set of constants contained in this archive
 #
 # March 31, 2025 @ ANL : JHT created
+# October 19, 2026 : only sets whose digest changed are rechecked, in parallel, with per-constant diffs
 #
 # NOTE:
 # the main function is contained at the bottom of the file
+#
+# The digest of each standard set is compared with the digest recorded in the archive 
+# metadata, and the hash of the set file on disk with the file digest recorded with it. 
+# Sets where both match are unchanged since they were validated and are skipped; the 
+# others (or all of them, with --full) are loaded and compared constant by constant in a
+# pool of -j worker processes. The digests of the sets that validate, and of the files
+# they were read from, are then recorded in the archive.
+
+"""validate_constants
+
+Usage:
+    validate_constants.py [-j <ntask>] [--full]
+
+Options:
+    -j <ntask>  Number of sets to validate at once [default: 1]
+    --full      Recheck every set, even those whose digest is unchanged
+
+"""
 
 from superHEAT.archive_manager import constarc
 from superHEAT.archive_manager import constants
 
+from docopt import docopt
 from pathlib import Path
 from decimal import Decimal
+import concurrent.futures
 import os
 
 ARCHIVE_PATH = Path(__file__).resolve().parent.parent / "archive"
@@ -530,32 +551,72 @@ CFOUR_OLD.add_constant(constants.Constant(name = "",
 # Dictionary of the standard sets of constants that need to be included in the archive
 STANDARD_SETS = {CFOUR_OLD.set_name : CFOUR_OLD, CODATA2022.set_name : CODATA2022}
 
+#######################################################################
+# Validation of a single set, run in the worker processes. Returns the
+# name of the set and its differences with the archived set
+#
+def validate_set(name):
+    carc = constarc.Constants_Archive.open_read_only(ARCHIVE_PATH)
+    file_digest = carc.file_digest(name)
+    return name, carc.load_constants_set(name).diff(STANDARD_SETS[name]), file_digest
+
+# String describing the differences of a set
+def diff_string(diff):
+    s = ""
+    for key in diff['added']:
+        s += "    missing from archive : " + key + '\n'
+    for key in diff['removed']:
+        s += "    only in archive      : " + key + '\n'
+    for key, fields in diff['changed'].items():
+        s += "    changed              : " + key + " (" + ", ".join(fields) + ")\n"
+    return s
+
 #######################################################################
 # MAIN
 #
 if __name__ == '__main__':
+
+    args = docopt(__doc__)
+    ntask = max(1, int(args['-j']))
         
     assert(os.path.exists(ARCHIVE_PATH)), "Could not find the archive path, perhaps it was not upzipped?"
 
     carc = constarc.Constants_Archive(ARCHIVE_PATH)
 
-    #Check that each of the constants sets is in the archive
+    #Check that each of the constants sets is in the archive, and which need to be checked
+    digests = {key : value.digest() for key, value in STANDARD_SETS.items()}
+    to_check = []
     for key, value in STANDARD_SETS.items():
-        
-        #It exists, let's check that it matches
-        print("Validating {name}...".format(name = value.set_name), end='')
-        if key in carc.constants_sets:
-            print(" found in Archive...", end='')
 
-        #It does not exist, we need to add
-        else:
-            print(" not found in Archive...", end='')
+        #It does not exist, we need to add (which records its digest)
+        if key not in carc.constants_sets:
+            print("{name} not found in Archive... added".format(name = key))
             carc.add_constants_set(value)
 
-        #Validate the set
-        cset = carc.load_constants_set(key)
-        if value != cset:
-            print(" validation FAILED")
+        #It exists, and neither it nor its file changed since it was last validated
+        elif (not args['--full'] and carc.constants_sets[key].set_digest == digests[key]
+              and carc.constants_sets[key].file_digest == carc.file_digest(key)):
+            print("{name} unchanged... validated!".format(name = key))
+
         else:
-            print(" validated!")
+            to_check.append(key)
+
+    #Validate the rest in parallel
+    failed = []
+    file_digests = {}
+    if to_check:
+        with concurrent.futures.ProcessPoolExecutor(max_workers = min(ntask, len(to_check))) as executor:
+            for name, diff, file_digest in executor.map(validate_set, to_check):
+                file_digests[name] = file_digest
+                if diff['added'] or diff['removed'] or diff['changed']:
+                    print("{name} found in Archive... validation FAILED".format(name = name))
+                    print(diff_string(diff), end='')
+                    failed.append(name)
+                else:
+                    print("{name} found in Archive... validated!".format(name = name))
+
+    #Record the digests of the sets that passed
+    passed = {key : digests[key] for key in to_check if key not in failed}
+    if passed:
+        carc.record_digests(passed, {key : file_digests[key] for key in passed})
 
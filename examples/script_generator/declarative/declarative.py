@@ -0,0 +1,89 @@
+#*************************************************************
+# declarative.py
+#
+# An example of how to use this repository to generate
+# CFOUR input and runscript files from a declarative recipe
+# file, rather than from a python make_joblist function
+#
+# To make a new recipe, do the following:
+# 1. Copy recipe.json and edit the list of jobs
+# 2. Pass it to this script with --recipe
+#
+# The calcs and bases in the recipe refer to the short names in
+# the global CALCS and BASIS objects, and the options to the names
+# in ZMAT_OPTIONS and RUN_OPTIONS (see calc.py, basis.py, and option.py)
+#
+# The recipe is compiled the first time it is used, and the compiled
+# joblist is cached in .recipe_cache next to the recipe file
+#
+#*************************************************************
+
+#*************************************************************
+# DOCOPT input string
+#
+"""declarative
+
+Usage:
+    declarative.py --recipe=<recipe> --name=<name> --ZMAT=<zmat> --runfile=<run.sh> [--profile]
+    declarative.py --recipe=<recipe> --joblist
+    declarative.py --recipe=<recipe> --abrvs
+    declarative.py (-h | --help)
+    declarative.py --version
+
+Options:
+    --joblist     Print all predetermined jobs.
+    --abrvs       Print the list of default abbreviations
+    --profile     Print a timing profile of the generation (see profiler.py).
+    -h --help     Show this screen.
+    --version     Show version.
+
+"""
+
+#*************************************************************
+# Import statements
+#
+from docopt import docopt
+from superHEAT.script_generator import *
+
+
+#*************************************************************
+# Main function
+if __name__ == '__main__':
+
+    #Process Docopts input
+    args = docopt(__doc__, version="declarative 1.0")
+
+    #Switch on the profiler before anything is built
+    if args['--profile']:
+        PROFILER.enable()
+
+    #Read (or reuse) the compiled recipe
+    recipe = Recipe(args['--recipe'])
+
+    #if printing joblist
+    if args['--joblist']:
+        joblist = recipe.make_joblist(molecule="")
+        joblist.print_names()
+
+    #print options
+    elif args['--abrvs']:
+        print("ZMAT variables")
+        ZMAT_OPTIONS.print()
+
+        print("run.dummy variables")
+        RUN_OPTIONS.print()
+
+    #generating job files
+    else:
+        #Read ZMAT
+        zmat = Zmat(args['--ZMAT'])
+
+        #Read run.dummy
+        rundummy = Runscript(args['--runfile'])
+
+        #Generate the joblist from the recipe
+        joblist = recipe.make_joblist(args['--name'], zmat, rundummy)
+        joblist.print_names()
+
+        joblist.generate()
+
@@ -0,0 +1,165 @@
+# alignment.py
+#
+# Contains the functions that align geometries onto each other and compute their RMSD,
+# for batches of geometries at once
+#
+# NOTES:
+# October 19, 2026 : created
+#
+
+# The alignment is the Kabsch algorithm: both sets of coordinates are centered, and the
+# rotation that best maps one onto the other comes from the SVD of their 3x3 covariance.
+# NumPy's SVD works on stacks of matrices, so aligning one reference against N candidates
+# (or N^2 pairs of a batch) is a single call, without a Python loop over geometries.
+#
+# Functions on arrays take coordinates of shape (..., n, 3), and broadcast:
+#   kabsch_(P, Q)     : rotations R (..., 3, 3) such that (P - <P>) R^T ~ (Q - <Q>)
+#   rmsd_(P, Q)       : minimal RMSD (...) over rotations and translations
+#   align_(P, Q)      : P rotated and translated onto Q
+#   rmsd_matrix_(xyz) : (N, N) RMSDs between all frames of an (N, n, 3) array
+#   permutation_(P, Q, atoms) : best order of the atoms of P to match Q, within each element
+#
+# And on geometries (Geometry, Geometry_Batch or lists of Geometry):
+#   rmsd(reference, candidates, permute=False) -> (N,) array
+#   align(reference, candidates, permute=False) -> Geometry_Batch aligned onto the reference
+#   rmsd_matrix(batch) -> (N, N) array, e.g. to cluster conformers
+#
+# Reflections are never used, so mirror images are not superimposed. The permutation
+# search alternates between the assignment of atoms of each element (by the Hungarian
+# algorithm, scipy's linear_sum_assignment) and the Kabsch alignment, starting from the
+# given order and from each alignment of the principal axes, and keeps the best. It is
+# a heuristic, and can miss the best permutation of very symmetric structures.
+#
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from superHEAT.archive_manager import geometry
+
+#Kabsch rotations, and the singular values and sign used to find the RMSD
+def _kabsch(P, Q):
+    Pc = P - P.mean(axis=-2, keepdims=True)
+    Qc = Q - Q.mean(axis=-2, keepdims=True)
+    H = np.swapaxes(Pc, -1, -2) @ Qc
+    U, S, Vt = np.linalg.svd(H)
+    d = np.sign(np.linalg.det(np.swapaxes(Vt, -1, -2) @ np.swapaxes(U, -1, -2)))
+    d = np.where(d == 0, 1.0, d)
+    D = np.broadcast_to(np.eye(3), d.shape + (3, 3)).copy()
+    D[..., 2, 2] = d
+    R = np.swapaxes(Vt, -1, -2) @ D @ np.swapaxes(U, -1, -2)
+    return R, S, d, Pc, Qc
+
+#rotations R (..., 3, 3) such that (P - <P>) R^T best matches (Q - <Q>)
+def kabsch_(P, Q):
+    P = np.asarray(P, dtype=np.float64)
+    Q = np.asarray(Q, dtype=np.float64)
+    return _kabsch(P, Q)[0]
+
+#minimal RMSD between P and Q over rotations and translations
+def rmsd_(P, Q):
+    P = np.asarray(P, dtype=np.float64)
+    Q = np.asarray(Q, dtype=np.float64)
+    R, S, d, Pc, Qc = _kabsch(P, Q)
+    n = P.shape[-2]
+    E = np.sum(Pc**2, axis=(-2, -1)) + np.sum(Qc**2, axis=(-2, -1)) - 2.0 * (S[..., 0] + S[..., 1] + d * S[..., 2])
+    return np.sqrt(np.maximum(E, 0.0) / n)
+
+#P rotated and translated onto Q
+def align_(P, Q):
+    P = np.asarray(P, dtype=np.float64)
+    Q = np.asarray(Q, dtype=np.float64)
+    R, S, d, Pc, Qc = _kabsch(P, Q)
+    return Pc @ np.swapaxes(R, -1, -2) + Q.mean(axis=-2, keepdims=True)
+
+#RMSDs between all frames of an (N, n, 3) array, computed in chunks of pairs
+def rmsd_matrix_(xyz, chunk=65536):
+    xyz = np.asarray(xyz, dtype=np.float64)
+    N = xyz.shape[0]
+    i, j = np.triu_indices(N, k=1)
+    out = np.zeros((N, N))
+    for start in range(0, len(i), chunk):
+        a, b = i[start:start + chunk], j[start:start + chunk]
+        out[a, b] = out[b, a] = rmsd_(xyz[a], xyz[b])
+    return out
+
+#rotations of the principal axes of P onto those of Q, 4 of them (the axes have no sign)
+def _principal_rotations(P, Q):
+    def axes(X):
+        Xc = X - X.mean(axis=0)
+        w, v = np.linalg.eigh(Xc.T @ Xc)
+        if np.linalg.det(v) < 0:
+            v[:, 2] = -v[:, 2]
+        return v
+    vp, vq = axes(P), axes(Q)
+    flips = [np.diag(f) for f in ([1, 1, 1], [1, -1, -1], [-1, 1, -1], [-1, -1, 1])]
+    return [vq @ f @ vp.T for f in flips]
+
+#best order of the atoms of P to match Q (a list of indices into P), exchanging only
+# atoms of the same element
+def permutation_(P, Q, atoms, max_iter=20):
+    P = np.asarray(P, dtype=np.float64)
+    Q = np.asarray(Q, dtype=np.float64)
+    elements = np.array([geometry.element_(atom) for atom in atoms])
+    groups = [np.nonzero(elements == element)[0] for element in sorted(set(elements))]
+    Pc = P - P.mean(axis=0)
+    Qc = Q - Q.mean(axis=0)
+
+    #assignment of the atoms of rotated P to those of Q
+    def assign(X):
+        perm = np.arange(len(atoms))
+        for group in groups:
+            cost = np.sum((Qc[group][:, None, :] - X[group][None, :, :])**2, axis=-1)
+            rows, cols = linear_sum_assignment(cost)
+            perm[group[rows]] = group[cols]
+        return perm
+
+    best, best_rmsd = np.arange(len(atoms)), rmsd_(P, Q)
+    starts = [np.arange(len(atoms))] + [assign(Pc @ R.T) for R in _principal_rotations(P, Q)]
+    for perm in starts:
+        for it in range(max_iter):
+            new = assign(align_(Pc[perm], Qc)[np.argsort(perm)])
+            if np.array_equal(new, perm):
+                break
+            perm = new
+        value = rmsd_(P[perm], Q)
+        if value < best_rmsd - 1e-12:
+            best, best_rmsd = perm, value
+    return best
+
+#coordinates (N, n, 3) and atoms of a Geometry, Geometry_Batch or list of Geometry
+def _frames(geoms):
+    if isinstance(geoms, geometry.Geometry_Batch):
+        return geoms.xyz, geoms.atoms
+    if isinstance(geoms, geometry.Geometry):
+        return np.asarray(geoms.xyz, dtype=np.float64)[None, :, :], geoms.atoms
+    batch = geometry.Geometry_Batch.from_geometries(list(geoms))
+    return batch.xyz, batch.atoms
+
+#candidates (N, n, 3) put in the best atom order for the reference, if permute
+def _ordered(reference, candidates, permute):
+    ref, ref_atoms = _frames(reference)
+    xyz, atoms = _frames(candidates)
+    assert sorted(atoms) == sorted(ref_atoms), "ERROR : the candidates must have the same atoms as the reference"
+    if not permute:
+        assert list(atoms) == list(ref_atoms), "ERROR : the atoms are in another order, use permute=True"
+        return ref[0], xyz
+    #first match the element order of the reference, then search within each element
+    order = np.argsort(np.array([geometry.element_(atom) for atom in atoms]), kind='stable')
+    ref_order = np.argsort(np.array([geometry.element_(atom) for atom in ref_atoms]), kind='stable')
+    start = np.empty_like(order)
+    start[ref_order] = order
+    xyz = xyz[:, start]
+    return ref[0], np.stack([frame[permutation_(frame, ref[0], ref_atoms)] for frame in xyz])
+
+#RMSD (Bohr) of each candidate to the reference
+def rmsd(reference, candidates, permute=False):
+    ref, xyz = _ordered(reference, candidates, permute)
+    return rmsd_(xyz, ref[None, :, :])
+
+#Geometry_Batch of the candidates aligned onto the reference (in the atom order of the reference)
+def align(reference, candidates, permute=False):
+    ref, xyz = _ordered(reference, candidates, permute)
+    return geometry.Geometry_Batch(name=reference.name, atoms=list(reference.atoms), xyz=align_(xyz, ref[None, :, :]), copy=False)
+
+#RMSDs (Bohr) between all frames of a batch
+def rmsd_matrix(batch, chunk=65536):
+    xyz, atoms = _frames(batch)
+    return rmsd_matrix_(xyz, chunk)
@@ -0,0 +1,95 @@
+# archive_lock.py
+#
+# Contains the tools used to keep the archive files consistent when several processes
+# (e.g. parallel validation jobs on a shared filesystem) read and write them at once
+#
+# NOTES:
+# October 19, 2026 : created
+#
+
+# File_Lock
+#   An advisory lock on a lock file that sits next to the files it protects. Readers
+#   take a shared lock, so any number of them can read at once, and writers take an
+#   exclusive lock. Uses flock on POSIX systems, and msvcrt on Windows (where every
+#   lock is exclusive). File_Lock only protects against other processes; threads of
+#   the same process should also hold a threading.RLock.
+#
+#   with File_Lock("archive/constants/.constarc.lock", shared=True):
+#       ...read...
+#
+# atomic_write
+#   Writes a file by writing a temporary file in the same directory and then renaming
+#   it over the original, so readers see either the old or the new file, never a
+#   partially written one.
+#
+#   with atomic_write("archive/constants/constarc.json") as f:
+#       f.write(...)
+#
+import os
+import tempfile
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# File_Lock class
+class File_Lock:
+
+    def __init__(self, path, shared=False):
+        self.path = path
+        self.shared = shared
+        self.f = None
+
+    def __enter__(self):
+        try:
+            self.f = open(self.path, "a+b")
+        except OSError:
+            #a reader on a read-only filesystem has no writers to wait for
+            if self.shared:
+                return self
+            raise
+        if fcntl is not None:
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.f is None:
+            return False
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self.f.seek(0)
+                msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.f.close()
+            self.f = None
+        return False
+
+# Write a file atomically, yields a text file object (utf-8) to write to
+@contextlib.contextmanager
+def atomic_write(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        #keep the permissions of the file being replaced, mkstemp only allows the owner
+        os.chmod(tmp, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
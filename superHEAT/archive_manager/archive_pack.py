@@ -0,0 +1,268 @@
+# archive_pack.py
+#
+# Contains the functions that zip and unzip the archive incrementally, used by
+# zip_archive.py and unzip_archive.py at the top of this repository
+#
+# NOTES:
+# October 19, 2026 : created, replacing shutil.make_archive and shutil.unpack_archive
+# October 19, 2026 : unchanged members are copied compressed, unsafe member names are skipped
+#
+
+# The zipped archive is kept deterministic, so that zipping an unchanged archive
+# gives a byte-for-byte identical archive.zip (and no spurious diffs in git):
+#   - members are written in sorted order
+#   - every member has the same fixed timestamp and permissions
+#   - no directory entries are written
+#
+# Each archive.zip contains a manifest member, .manifest.json, with the sha256 hash of
+# every other member. The extracted archive directory keeps a local manifest of its own
+# (archive/.manifest.json), which also records the size and modification time of each
+# file when it was last hashed, so that only files that have been touched are rehashed.
+#
+# pack_archive:
+#   Hashes the (modified) files of the archive directory and compares them with the
+#   manifest of the existing zip. If nothing changed, the zip is not touched. Otherwise
+#   a new zip is written next to the old one and moved into place. Only changed members
+#   are read from the directory and compressed; unchanged members are copied from the old
+#   zip as their raw compressed bytes (copy_member), without being decompressed. This
+#   writes through the internals of CPython's zipfile, so it is only done when they are 
+#   present and the member's local header checks out; otherwise the member is copied
+#   through the public API (decompressed and compressed again). The whole zip is still
+#   rewritten, as a zip cannot be edited in place.
+#
+# unpack_archive:
+#   Extracts only the members whose hash differs from the local manifest (or whose
+#   file was modified or removed since), and removes files that are no longer in the zip.
+#   Members with absolute names, drive letters or '..' components, which would be written
+#   outside the archive directory, are skipped (as shutil.unpack_archive does).
+#
+# Files and directories whose names start with '.' are local state (manifests, locks,
+# indexes, caches) and are never packed.
+#
+import os
+import json
+import struct
+import zipfile
+import hashlib
+
+MANIFEST_NAME = ".manifest.json"
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+FILE_MODE = 0o644
+
+# Returns the sorted relative paths ('/' separated) of all files in the archive directory
+def archive_files(archive_dir):
+    files = []
+    for root, dirs, names in os.walk(archive_dir):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in names:
+            if name.startswith('.'):
+                continue
+            rel = os.path.relpath(os.path.join(root, name), archive_dir)
+            files.append(rel.replace(os.sep, '/'))
+    return sorted(files)
+
+# sha256 of a file on disk
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+# Reads the local manifest of an extracted archive, or an empty one
+def read_local_manifest(archive_dir):
+    try:
+        with open(os.path.join(archive_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"files" : {}}
+
+# Writes the local manifest of an extracted archive
+def write_local_manifest(archive_dir, manifest):
+    path = os.path.join(archive_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, sort_keys=True, indent=1)
+    os.replace(path + ".tmp", path)
+
+# Reads the manifest of a zipped archive, or None if there is no zip or no manifest
+def read_zip_manifest(zip_path):
+    if not os.path.exists(zip_path):
+        return None
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        try:
+            return json.loads(zf.read(MANIFEST_NAME).decode("utf-8"))
+        except KeyError:
+            return None
+
+# Returns {rel : sha256} for every file in the archive directory, rehashing only the
+# files whose size or modification time differ from the local manifest
+def hash_archive(archive_dir, local=None):
+    if local is None:
+        local = read_local_manifest(archive_dir)
+    hashes = {}
+    entries = {}
+    for rel in archive_files(archive_dir):
+        path = os.path.join(archive_dir, *rel.split('/'))
+        stat = os.stat(path)
+        entry = local["files"].get(rel)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            entry = {"sha256" : file_hash(path), "size" : stat.st_size, "mtime_ns" : stat.st_mtime_ns}
+        hashes[rel] = entry["sha256"]
+        entries[rel] = entry
+    return hashes, {"files" : entries}
+
+# ZipInfo with the fixed timestamp and permissions
+def fixed_info(rel):
+    info = zipfile.ZipInfo(rel, date_time=FIXED_DATE_TIME)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.external_attr = FILE_MODE << 16
+    return info
+
+# True if a member name stays inside the directory it is extracted to
+def safe_member(rel):
+    parts = rel.replace('\\', '/').split('/')
+    return ':' not in parts[0] and all(part not in ('', '.', '..') for part in parts)
+
+# True if the open zip dst has the internals that copy_member relies on (those of
+# CPython's zipfile, which has no public way of writing precompressed data)
+def raw_copy_supported(dst):
+    return (all(hasattr(dst, name) for name in ('fp', 'start_dir', 'filelist', 'NameToInfo', '_didModify')) and
+            getattr(dst, '_writing', True) is False and hasattr(zipfile.ZipInfo, 'FileHeader'))
+
+# Returns the raw compressed bytes of a member of the zip file at src_path (with ZipInfo 
+# info), or None if its local header is not the one expected
+def read_raw_member(src_path, info):
+    if info.flag_bits & 0x1:
+        return None
+    with open(src_path, "rb") as f:
+        f.seek(info.header_offset)
+        header = f.read(30)
+        if len(header) != 30 or header[:4] != b'PK\x03\x04':
+            return None
+        name_length, extra_length = struct.unpack("<HH", header[26:30])
+        f.seek(name_length + extra_length, 1)
+        raw = f.read(info.compress_size)
+    return raw if len(raw) == info.compress_size else None
+
+# Copies a member of the open zip src (ZipInfo info) into the open zip dst, with the 
+# fixed timestamp and permissions. The raw compressed bytes are copied when possible;
+# otherwise the member is decompressed and written again through the public API
+def copy_member(src, info, dst):
+    raw = read_raw_member(src.filename, info) if raw_copy_supported(dst) else None
+    if raw is None:
+        with src.open(info) as f:
+            dst.writestr(fixed_info(info.filename), f.read(), compress_type=info.compress_type)
+        return
+
+    new = fixed_info(info.filename)
+    new.compress_type = info.compress_type
+    new.CRC = info.CRC
+    new.compress_size = info.compress_size
+    new.file_size = info.file_size
+
+    #as ZipFile.writestr does, but with the sizes and CRC already known
+    dst.fp.seek(dst.start_dir)
+    new.header_offset = dst.fp.tell()
+    dst.fp.write(new.FileHeader(new.file_size * 1.05 > zipfile.ZIP64_LIMIT))
+    dst.fp.write(raw)
+    dst.start_dir = dst.fp.tell()
+    dst.filelist.append(new)
+    dst.NameToInfo[new.filename] = new
+    dst._didModify = True
+
+# Zip the archive directory into zip_path, returns True if the zip was (re)written
+def pack_archive(archive_dir, zip_path, verbose=True):
+    hashes, local = hash_archive(archive_dir)
+    old = read_zip_manifest(zip_path)
+    old_hashes = old["files"] if old is not None else {}
+
+    changed = [rel for rel in hashes if old_hashes.get(rel) != hashes[rel]]
+    removed = [rel for rel in old_hashes if rel not in hashes]
+    write_local_manifest(archive_dir, local)
+
+    if old is not None and not changed and not removed:
+        if verbose:
+            print("{zip} is up to date".format(zip=zip_path))
+        return False
+
+    tmp_path = zip_path + ".tmp"
+    old_zip = zipfile.ZipFile(zip_path, "r") if old is not None else None
+    try:
+        with zipfile.ZipFile(tmp_path, "w") as zf:
+            for rel in sorted(hashes):
+                if rel in changed:
+                    with open(os.path.join(archive_dir, *rel.split('/')), "rb") as f:
+                        zf.writestr(fixed_info(rel), f.read())
+                    if verbose:
+                        print("Packing   {rel}".format(rel=rel))
+                else:
+                    copy_member(old_zip, old_zip.getinfo(rel), zf)
+            manifest = json.dumps({"files" : hashes}, sort_keys=True, indent=1)
+            zf.writestr(fixed_info(MANIFEST_NAME), manifest.encode("utf-8"))
+    finally:
+        if old_zip is not None:
+            old_zip.close()
+    os.replace(tmp_path, zip_path)
+
+    if verbose:
+        for rel in removed:
+            print("Removed   {rel}".format(rel=rel))
+    return True
+
+# Unzip zip_path into the archive directory, returns the list of files extracted
+def unpack_archive(zip_path, archive_dir, verbose=True):
+    os.makedirs(archive_dir, exist_ok=True)
+    local = read_local_manifest(archive_dir)
+    extracted = []
+
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        try:
+            manifest = json.loads(zf.read(MANIFEST_NAME).decode("utf-8"))["files"]
+        except KeyError:
+            manifest = None
+        members = [info.filename for info in zf.infolist() if not info.is_dir() and info.filename != MANIFEST_NAME]
+        for rel in [rel for rel in members if not safe_member(rel)]:
+            members.remove(rel)
+            if verbose:
+                print("Skipped   {rel} (outside {dir})".format(rel=rel, dir=archive_dir))
+
+        for rel in members:
+            path = os.path.join(archive_dir, *rel.split('/'))
+            entry = local["files"].get(rel)
+
+            #skip files we extracted before, that have not changed in the zip or on disk
+            if manifest is not None and entry is not None and entry["sha256"] == manifest.get(rel) and os.path.exists(path):
+                stat = os.stat(path)
+                if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                    continue
+
+            data = zf.read(rel)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+            stat = os.stat(path)
+            local["files"][rel] = {"sha256" : hashlib.sha256(data).hexdigest(), "size" : stat.st_size, "mtime_ns" : stat.st_mtime_ns}
+            extracted.append(rel)
+            if verbose:
+                print("Extracted {rel}".format(rel=rel))
+
+    #remove files that were extracted from a previous zip, but are no longer in it
+    # (files modified on disk since are left alone)
+    for rel in [rel for rel in local["files"] if rel not in members]:
+        if not safe_member(rel):
+            local["files"].pop(rel)
+            continue
+        path = os.path.join(archive_dir, *rel.split('/'))
+        entry = local["files"].pop(rel)
+        if os.path.exists(path):
+            stat = os.stat(path)
+            if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                os.remove(path)
+                if verbose:
+                    print("Removed   {rel}".format(rel=rel))
+
+    write_local_manifest(archive_dir, local)
+    if verbose and not extracted:
+        print("{dir} is up to date".format(dir=archive_dir))
+    return extracted
@@ -0,0 +1,148 @@
+# archive_source.py
+#
+# Contains the classes that give the sub-archives (e.g. the Constants_Archive) access
+# to the files of the archive, whether the archive is an extracted directory or
+# still zipped up as archive.zip
+#
+# NOTES:
+# October 19, 2026 : created
+#
+
+# Every file in the archive is addressed by its path relative to the top level of the
+# archive, with '/' as the separator, e.g. "constants/constarc.json". A sub-archive only
+# ever talks to a source through these relative paths:
+#
+#   exists(rel)    : True if the file is in the archive
+#   open(rel)      : returns a text file object (utf-8) to read the file
+#   read_bytes(rel): returns the raw contents of the file
+#   read_lines_at(rel, offsets) : returns the lines (bytes) starting at each byte offset
+#   map_bytes(rel) : returns the contents as a read-only bytes-like object, memory mapped if possible
+#   stat_key(rel)  : returns a tuple that changes whenever the file changes, used for caching
+#   read_only      : True if the source cannot be written to
+#
+# Directory_Source
+#   An extracted archive on disk. Supports writing, through the full path given by path(rel)
+#
+# Zip_Source
+#   A zipped archive (such as archive.zip at the top of this repository). The central
+#   directory of the zip is read once when the source is opened, and each file is
+#   then read directly from its member in the zip, so loading a single constants set
+#   never extracts anything else. Zip sources are read-only.
+#
+import os
+import io
+import mmap
+import zipfile
+
+# Directory_Source class
+class Directory_Source:
+
+    read_only = False
+
+    def __init__(self, top_archive_path):
+        self.top = top_archive_path
+
+    #full path on disk of a file in the archive
+    def path(self, rel):
+        return os.path.join(self.top, *rel.split('/'))
+
+    def exists(self, rel):
+        return os.path.exists(self.path(rel))
+
+    def open(self, rel):
+        return open(self.path(rel), "r", encoding="utf-8")
+
+    def read_bytes(self, rel):
+        with open(self.path(rel), "rb") as f:
+            return f.read()
+
+    def read_lines_at(self, rel, offsets):
+        with open(self.path(rel), "rb") as f:
+            return _read_lines_at(f, offsets)
+
+    #empty files cannot be mapped
+    def map_bytes(self, rel):
+        with open(self.path(rel), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    #changes whenever the file is modified or replaced
+    def stat_key(self, rel):
+        stat = os.stat(self.path(rel))
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def describe(self):
+        return self.top
+
+
+# Zip_Source class
+#
+# index : dictionary of relative path -> ZipInfo, built from the central directory
+#
+class Zip_Source:
+
+    read_only = True
+
+    def __init__(self, zip_path):
+        self.zip_path = zip_path
+        self.zip = zipfile.ZipFile(zip_path, "r")
+
+        #Archives zipped with their top level directory have every member under "archive/"
+        names = [info.filename for info in self.zip.infolist() if not info.is_dir()]
+        prefix = ""
+        if names and all(name.startswith("archive/") for name in names):
+            prefix = "archive/"
+
+        self.index = {}
+        for info in self.zip.infolist():
+            if not info.is_dir():
+                self.index[info.filename[len(prefix):]] = info
+
+    def path(self, rel):
+        raise RuntimeError("{zip} is a zipped archive, and has no files on disk".format(zip=self.zip_path))
+
+    def exists(self, rel):
+        return rel in self.index
+
+    def open(self, rel):
+        return io.TextIOWrapper(self.zip.open(self.index[rel], "r"), encoding="utf-8")
+
+    def read_bytes(self, rel):
+        return self.zip.read(self.index[rel])
+
+    def read_lines_at(self, rel, offsets):
+        with self.zip.open(self.index[rel], "r") as f:
+            return _read_lines_at(f, offsets)
+
+    #members may be compressed, so they are read rather than mapped
+    def map_bytes(self, rel):
+        return self.read_bytes(rel)
+
+    #the CRC and size of the member identify its contents
+    def stat_key(self, rel):
+        info = self.index[rel]
+        return (info.CRC, info.file_size, info.date_time)
+
+    def describe(self):
+        return self.zip_path
+
+    def close(self):
+        self.zip.close()
+
+
+# Reads the lines starting at the byte offsets from a binary file. Offsets are visited in
+# increasing order, so a compressed zip member is only ever read forwards
+def _read_lines_at(f, offsets):
+    lines = {}
+    for offset in sorted(set(offsets)):
+        f.seek(offset)
+        lines[offset] = f.readline()
+    return [lines[offset] for offset in offsets]
+
+# Returns the appropriate source for a path to either an archive directory or a zipped archive
+def open_archive_source(top_archive_path):
+    top_archive_path = os.fspath(top_archive_path)
+    if os.path.isfile(top_archive_path) and zipfile.is_zipfile(top_archive_path):
+        return Zip_Source(top_archive_path)
+    return Directory_Source(top_archive_path)
@@ -0,0 +1,119 @@
+# columnar.py
+#
+# Contains the functions that store a table of data as binary columns, which can be
+# memory mapped instead of parsed, for use as an optional backend of the sub-archives
+#
+# NOTES:
+# October 19, 2026 : created
+#
+
+# The newline delimited json files stay the human-readable format of the archive (and the
+# only one that is zipped and committed). A columnar copy of a table is a directory:
+#
+#   <table>/columns.json   : manifest, {"version", "nrows", "source", "columns" : {name : kind}}
+#   <table>/<name>.npy     : one numeric (or bool) column, read with mmap_mode='r'
+#   <table>/<name>.json    : one string column, a json list, read only when it is accessed
+#
+# "source" is any json value given by the writer to identify what the table was built
+# from (e.g. the stat key of the set file), so readers can tell whether it is stale.
+#
+# Numeric columns are mapped zero-copy: the arrays returned by Columnar_Table point
+# straight into the page cache, are read-only, and only the pages that are touched are
+# ever read from disk. Every file is written to a temporary file and renamed into place,
+# and the manifest is written last, so a table without a manifest (or with a manifest of
+# another source) is simply rebuilt.
+#
+import os
+import json
+import numpy as np
+from superHEAT.archive_manager.archive_lock import atomic_write
+
+COLUMNAR_VERSION = 1
+MANIFEST_NAME = "columns.json"
+
+# Write a table, columns is a dictionary of column name -> sequence of equal length
+def write_columns(directory, columns, source=None):
+    os.makedirs(directory, exist_ok=True)
+    nrows = None
+    kinds = {}
+    for name, column in columns.items():
+        array = np.asarray(column)
+        if nrows is None:
+            nrows = len(array)
+        assert len(array) == nrows, "ERROR : column {name} has {n} rows, not {nrows}".format(name=name, n=len(array), nrows=nrows)
+
+        if array.dtype.kind in "biuf":
+            path = os.path.join(directory, name + ".npy")
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            kinds[name] = "numeric"
+        else:
+            with atomic_write(os.path.join(directory, name + ".json")) as f:
+                json.dump([None if value is None else str(value) for value in column], f, ensure_ascii=False)
+            kinds[name] = "string"
+
+    with atomic_write(os.path.join(directory, MANIFEST_NAME)) as f:
+        json.dump({"version" : COLUMNAR_VERSION, "nrows" : nrows or 0, "source" : source, "columns" : kinds}, f, sort_keys=True)
+
+# Read the manifest of a table, or None if there is no (current) table
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != COLUMNAR_VERSION:
+        return None
+    return manifest
+
+# Columnar_Table class
+#
+# A table read from a columnar directory. Columns are opened on first access:
+#   table["value"] -> read-only memory mapped array
+#   table["name"]  -> list of strings
+#
+# directory : the table directory
+# nrows     : number of rows
+# source    : the source recorded by the writer
+# kinds     : column name -> "numeric" or "string"
+#
+class Columnar_Table:
+
+    def __init__(self, directory, manifest=None):
+        if manifest is None:
+            manifest = read_manifest(directory)
+        assert manifest is not None, "ERROR : no columnar table in {dir}".format(dir=directory)
+        self.directory = directory
+        self.nrows  = manifest["nrows"]
+        self.source = manifest["source"]
+        self.kinds  = manifest["columns"]
+        self.loaded = {}
+
+    def __len__(self):
+        return self.nrows
+
+    def __contains__(self, name):
+        return name in self.kinds
+
+    def __getitem__(self, name):
+        if name not in self.loaded:
+            if self.kinds[name] == "numeric":
+                self.loaded[name] = np.load(os.path.join(self.directory, name + ".npy"), mmap_mode='r', allow_pickle=False)
+            else:
+                with open(os.path.join(self.directory, name + ".json"), "r", encoding="utf-8") as f:
+                    self.loaded[name] = json.load(f)
+        return self.loaded[name]
+
+    def columns(self):
+        return list(self.kinds.keys())
+
+# Opens a table if it exists and was built from source, otherwise returns None
+def open_columns(directory, source=None):
+    manifest = read_manifest(directory)
+    if manifest is None or manifest["source"] != source:
+        return None
+    return Columnar_Table(directory, manifest)
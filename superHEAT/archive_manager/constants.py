@@ -6,14 +6,25 @@
 #
 # NOTES:
 # March 25, 2025 @ ANL : JHT created. 
+# October 19, 2026 : read-only (frozen) constants and sets, so loaded sets can be shared
+# October 19, 2026 : __slots__ constants, and compiled array-backed sets for hot-path lookups
+# October 19, 2026 : content digests, keyed comparison and diffs of sets
+# October 19, 2026 : compiled sets can be stored as, and mapped from, binary columns
+# October 19, 2026 : constants are built without going through the frozen check
+# October 19, 2026 : frozen sets can be pickled
 # 
 
 from datetime import datetime
 from decimal import Decimal
+import types
 import json
+import sys
+import hashlib
+import numpy as np
+from multiprocessing import shared_memory
 
 # Constant class
-# Tracks the value of some constant
+# Tracks the value of some constant. Uses __slots__, as sets hold many of these
 # name     : name for lookup
 # date     : the date this value was added/modified (year_month_day)
 # note     : string containing details of constant
@@ -23,24 +34,51 @@ import json
 # unit     : units
 # is_exact : bool for if a constant is exact
 #
+# A constant can be frozen, after which any attempt to modify it raises an
+# AttributeError. Frozen constants are shared between all users of a cached
+# Constants_Set, so copy() must be used to get a modifiable constant. __init__ and
+# freeze() set the slots directly, so only assignments from outside pay for the check
+#
 # TODO : make pretty printing...
 class Constant:
+
+    __slots__ = ('name', 'date', 'note', 'value', 'unc', 'rel_unc', 'unit', 'is_exact', '_frozen')
     
     def __init__(self, name, date, note, value, unc, rel_unc, unit, is_exact):
-        self.name     = name
-        self.date     = date
-        self.note     = note
-        self.value    = value
-        self.unc      = unc
-        self.rel_unc  = rel_unc
-        self.unit     = unit
-        self.is_exact = is_exact
+        set_slot = object.__setattr__
+        set_slot(self, '_frozen' , False)
+        set_slot(self, 'name'    , name)
+        set_slot(self, 'date'    , date)
+        set_slot(self, 'note'    , note)
+        set_slot(self, 'value'   , value)
+        set_slot(self, 'unc'     , unc)
+        set_slot(self, 'rel_unc' , rel_unc)
+        set_slot(self, 'unit'    , unit)
+        set_slot(self, 'is_exact', is_exact)
 
         #All the rest can be buggered up, but the name and value and "exactness" cannot be
         assert(self.name is not None)
         assert(self.value is not None)
         assert(self.value is not None)
 
+    #block modification of frozen constants
+    def __setattr__(self, key, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("Constant {name} is read-only, use copy() to modify it".format(name=self.name))
+        object.__setattr__(self, key, value)
+
+    #make this constant read-only
+    def freeze(self):
+        object.__setattr__(self, '_frozen', True)
+        return self
+
+    #returns a modifiable copy
+    def copy(self):
+        return Constant.from_dict(self.to_dict())
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
     #returns a string to print
     def print_string(self):
         if not self.is_exact:
@@ -105,44 +143,142 @@ class Constant:
 # set_name : name of this set
 # set_date : date this set was generated (year_month_day)
 # set_note : notes on this set
+# set_digest : digest of the constants recorded in the archive metadata (None if not recorded)
+# file_digest : sha256 of the bytes of the set file when set_digest was recorded (None if not recorded)
 # constants : dictionary of constants in the set
 #
+# digest() returns the sha256 of the constants themselves (not the metadata), which does
+# not depend on the order the constants were added in. Two sets with the same digest 
+# contain the same constants, so the archive records it to skip full comparisons.
+#
+# A set can be frozen, which freezes every constant and makes the constants 
+# dictionary a read-only view. Sets loaded from a Constants_Archive are frozen, 
+# as they are shared through the archive's cache; use copy() to modify one 
+#
 class Constants_Set:
 
     #Initialize the set from metadata (name, nate, note). NOTE that this is performed
     # separately from the file load. The file name is just the set name
-    def __init__(self, set_name, set_date, set_note): 
+    def __init__(self, set_name, set_date, set_note, set_digest=None, file_digest=None): 
+        self._frozen  = False
         self.set_name = set_name.upper()
         self.set_date = set_date
         self.set_note = set_note
+        self.set_digest = set_digest
+        self.file_digest = file_digest
         self.constants = {}
 
+    #block modification of frozen sets
+    def __setattr__(self, key, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("Constants set {name} is read-only, use copy() to modify it".format(name=self.set_name))
+        object.__setattr__(self, key, value)
+
+    #make this set, and every constant in it, read-only
+    def freeze(self):
+        for constant in self.constants.values():
+            constant.freeze()
+        self.constants = types.MappingProxyType(dict(self.constants))
+        self._frozen = True
+        return self
+
+    #pickle the constants as a plain dictionary (a read-only view cannot be pickled),
+    # and freeze the set again when it is unpickled
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['constants'] = dict(self.constants)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _frozen=False)
+        if state.get('_frozen', False):
+            self.freeze()
+
+    #returns a modifiable copy of the set and its constants
+    def copy(self):
+        new_set = Constants_Set.meta_from_dict(self.meta_to_dict())
+        for key, constant in self.constants.items():
+            new_set.constants[key] = constant.copy()
+        return new_set
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
     #Read from a .json file, takes file name as arguement
     def json_load(self, file_name):
         with open(file_name, 'r', encoding="utf-8") as f:
-            for line in f:
-                const = Constant.from_dict(json.loads(line))
-                self.constants[const.name] = const
+            self.json_read(f)
+
+    #Read from an open file object (e.g. a member of a zipped archive)
+    def json_read(self, f):
+        for line in f:
+            const = Constant.from_dict(json.loads(line))
+            self.constants[const.name] = const
 
     #Write to a .json file, with newline as delimination between json objects
     def json_dump(self, file_name):
         with open(file_name, 'w', encoding="utf-8") as f:
-            for key, constant in self.constants.items():
-                json.dump(constant.to_dict(), f, sort_keys=True, ensure_ascii=False)
-                f.write('\n')
+            self.json_write(f)
+
+    #Write to an open file object
+    def json_write(self, f):
+        for key, constant in self.constants.items():
+            json.dump(constant.to_dict(), f, sort_keys=True, ensure_ascii=False)
+            f.write('\n')
 
     #add a constant to the set
     def add_constant(self, constant):
+        assert not self._frozen, "ERROR : {name} constants set is read-only".format(name = self.set_name)
         assert not constant.name in self.constants, \
                 "ERROR : {key} already exists in {name} constants set".format(key = constant.name, name = self.set_name)
         self.constants[constant.name] = constant
 
     #update the constants set
     def update(self, constant):
+        assert not self._frozen, "ERROR : {name} constants set is read-only".format(name = self.set_name)
         assert constant.name in self.constants, \
                 "ERROR : {key} not found in {name} constants set".format(key = constant.name, name = self.set_name)
         self.constants[constant.name] = constant
 
+    #returns the constants as columns (see columnar.py), missing uncertainties are NaN
+    def to_columns(self):
+        consts = list(self.constants.values())
+        nan = float('nan')
+        return {"name"     : [c.name for c in consts],
+                "date"     : [c.date for c in consts],
+                "note"     : [c.note for c in consts],
+                "unit"     : [c.unit for c in consts],
+                "value"    : np.array([c.value for c in consts], dtype=np.float64),
+                "unc"      : np.array([c.unc if c.unc is not None else nan for c in consts], dtype=np.float64),
+                "rel_unc"  : np.array([c.rel_unc if c.rel_unc is not None else nan for c in consts], dtype=np.float64),
+                "is_exact" : np.array([bool(c.is_exact) for c in consts], dtype=np.bool_)}
+
+    #sha256 of the constants, as canonical json sorted by name
+    def digest(self):
+        h = hashlib.sha256()
+        for key in sorted(self.constants):
+            h.update(json.dumps(self.constants[key].to_dict(), sort_keys=True, ensure_ascii=False).encode('utf-8'))
+            h.update(b'\n')
+        return h.hexdigest()
+
+    #returns the differences with another set, as a dictionary of
+    # added   : names of constants only in other
+    # removed : names of constants only in this set
+    # changed : name -> list of the fields that differ
+    def diff(self, other):
+        added   = [key for key in other.constants if key not in self.constants]
+        removed = [key for key in self.constants if key not in other.constants]
+        changed = {}
+        for key, constant in self.constants.items():
+            if key in other.constants and constant != other.constants[key]:
+                mine, theirs = constant.to_dict(), other.constants[key].to_dict()
+                changed[key] = [field for field in mine if mine[field] != theirs[field]]
+        return {'added' : added, 'removed' : removed, 'changed' : changed}
+
+    #returns a compiled, array-backed copy of the set for fast lookups
+    def compile(self):
+        return Compiled_Constants_Set.from_set(self)
+
     #return string for printing constants
     def print_string(self):
         s  = "Constants set : " + self.set_name + '\n'
@@ -156,16 +292,23 @@ class Constants_Set:
 
     #returns a dictionary of the metadata
     def meta_to_dict(self):
-        return {'set_name' : self.set_name, 
-                'set_date' : self.set_date, 
-                'set_note' : self.set_note} 
+        d = {'set_name' : self.set_name, 
+             'set_date' : self.set_date, 
+             'set_note' : self.set_note} 
+        if self.set_digest is not None:
+            d['set_digest'] = self.set_digest
+        if self.file_digest is not None:
+            d['file_digest'] = self.file_digest
+        return d
 
     #creates metadata from dictionary
     @classmethod
     def meta_from_dict(cls, d):
         return cls(set_name = d['set_name'], 
                    set_date = d['set_date'], 
-                   set_note = d['set_note']) 
+                   set_note = d['set_note'],
+                   set_digest = d.get('set_digest'),
+                   file_digest = d.get('file_digest')) 
 
     #Compare two sets of constants
     # NOTE THAT THIS DOES NOT COMPARE THE METADATA! 
@@ -177,18 +320,143 @@ class Constants_Set:
         if len(self.constants) != len(other.constants):
             return False
 
-        #An intelligent way to do this would be to sort first, but these sets are so small that it doesn't matter
+        #Constants are keyed by name, so each one only needs to be compared with its namesake
         for skey, svalue in self.constants.items():
-            matches = False
-
-            for okey, ovalue in other.constants.items():
-                if ovalue == svalue:
-                    matches = True
-                    break
-
-            if not matches:
+            ovalue = other.constants.get(skey)
+            if ovalue is None or ovalue != svalue:
                 return False
 
         return True
 
 
+# Compiled_Constants_Set
+# A compact, read-only view of a Constants_Set for hot-path lookups. The values and 
+# uncertainties of all constants are packed into contiguous float64 arrays, with a 
+# name -> index map, so conversions read straight from the arrays:
+#
+#   compiled = cset.compile()
+#   compiled.get("a0 (m)")                     -> float
+#   compiled.values[compiled.indices(names)]   -> array
+#
+# set_name  : name of the set
+# names     : tuple of the constant names, in array order
+# index     : dictionary of name -> position in the arrays
+# values    : float64 array of values
+# uncs      : float64 array of standard uncertainties (NaN if not given)
+# rel_uncs  : float64 array of relative uncertainties (NaN if not given)
+# is_exact  : bool array
+#
+# share() copies the arrays into a named block of shared memory. Worker processes then 
+# attach() to that block by its name, and read the same memory without any pickling or
+# copying of the arrays. The process that called share() is responsible for unlink().
+#
+class Compiled_Constants_Set:
+
+    def __init__(self, set_name, names, values, uncs, rel_uncs, is_exact, shm=None):
+        self.set_name = set_name
+        self.names    = tuple(names)
+        self.index    = {name : i for i, name in enumerate(self.names)}
+        self.values   = values
+        self.uncs     = uncs
+        self.rel_uncs = rel_uncs
+        self.is_exact = is_exact
+        self.shm      = shm
+        for array in (self.values, self.uncs, self.rel_uncs, self.is_exact):
+            array.flags.writeable = False
+
+    #build from a Constants_Set, through its columns
+    @classmethod
+    def from_set(cls, cset):
+        return cls.from_columns(cset.set_name, cset.to_columns())
+
+    #build from the columns of a Columnar_Table (or a dictionary of columns). The
+    # numeric columns are used as they are, so memory mapped columns are not copied
+    @classmethod
+    def from_columns(cls, set_name, table):
+        return cls(set_name = set_name,
+                   names    = table["name"],
+                   values   = table["value"],
+                   uncs     = table["unc"],
+                   rel_uncs = table["rel_unc"],
+                   is_exact = table["is_exact"])
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    #value of a single constant
+    def get(self, name):
+        return float(self.values[self.index[name]])
+
+    #array positions of a list of names
+    def indices(self, names):
+        return np.fromiter((self.index[name] for name in names), dtype=np.intp, count=len(names))
+
+    #Shared memory layout:
+    #  8 bytes : length of the json header (little endian)
+    #  header  : json with the set name and the constant names, padded to 8 bytes
+    #  values, uncs, rel_uncs : n float64 each
+    #  is_exact: n bytes
+    def share(self):
+        n = len(self.names)
+        header = json.dumps({'set_name' : self.set_name, 'names' : self.names}).encode('utf-8')
+        start = 8 + len(header) + (-(8 + len(header)) % 8)
+        shm = shared_memory.SharedMemory(create=True, size=start + 25*n + 1)
+        shm.buf[:8] = len(header).to_bytes(8, 'little')
+        shm.buf[8:8 + len(header)] = header
+        shared = Compiled_Constants_Set._from_buffer(shm, start, self.set_name, self.names, writeable=True)
+        shared.values[:]   = self.values
+        shared.uncs[:]     = self.uncs
+        shared.rel_uncs[:] = self.rel_uncs
+        shared.is_exact[:] = self.is_exact
+        return Compiled_Constants_Set._from_buffer(shm, start, self.set_name, self.names)
+
+    #name of the shared memory block, to pass to attach()
+    @property
+    def shm_name(self):
+        return self.shm.name if self.shm is not None else None
+
+    #attach to a set shared by another process
+    @classmethod
+    def attach(cls, shm_name):
+        #the block belongs to the process that shared it, so it is not tracked here. Before
+        # python 3.13 it always is, so attach from worker processes started by the sharing 
+        # process, which share its resource tracker
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=shm_name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=shm_name)
+        length = int.from_bytes(bytes(shm.buf[:8]), 'little')
+        header = json.loads(bytes(shm.buf[8:8 + length]).decode('utf-8'))
+        start = 8 + length + (-(8 + length) % 8)
+        return cls._from_buffer(shm, start, header['set_name'], header['names'])
+
+    @classmethod
+    def _from_buffer(cls, shm, start, set_name, names, writeable=False):
+        n = len(names)
+        arrays = [np.ndarray((n,), dtype=np.float64, buffer=shm.buf, offset=start + 8*n*k) for k in range(3)]
+        is_exact = np.ndarray((n,), dtype=np.bool_, buffer=shm.buf, offset=start + 24*n)
+        compiled = cls.__new__(cls)
+        compiled.set_name = set_name
+        compiled.names    = tuple(names)
+        compiled.index    = {name : i for i, name in enumerate(compiled.names)}
+        compiled.values, compiled.uncs, compiled.rel_uncs = arrays
+        compiled.is_exact = is_exact
+        compiled.shm      = shm
+        if not writeable:
+            for array in (compiled.values, compiled.uncs, compiled.rel_uncs, compiled.is_exact):
+                array.flags.writeable = False
+        return compiled
+
+    #release this process' view of the shared memory
+    def close(self):
+        if self.shm is not None:
+            self.values = self.uncs = self.rel_uncs = self.is_exact = None
+            self.shm.close()
+
+    #destroy the shared memory, once every process is done with it
+    def unlink(self):
+        if self.shm is not None:
+            self.shm.unlink()
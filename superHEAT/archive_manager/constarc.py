@@ -5,6 +5,13 @@
 #
 # NOTES:
 # March 27, 2025 @ ANL : JHT created. 
+# October 19, 2026 : loaded sets are cached, and returned read-only
+# October 19, 2026 : the archive can be read directly from archive.zip
+# October 19, 2026 : locked, atomic writes so concurrent processes stay consistent
+# October 19, 2026 : inverted index of constant names across sets
+# October 19, 2026 : content digests of the sets are recorded in the metadata
+# October 19, 2026 : optional columnar (memory mapped) storage of compiled sets
+# October 19, 2026 : lazy, read-only open for fast startup
 # 
 #
 
@@ -17,7 +24,8 @@
 # values from within the archive file structure.
 # 
 # Initialization requires an os.path object that directs the function to the 
-# top level archive directory 
+# top level archive directory, or to a zipped archive (e.g. archive.zip). A zipped
+# archive is read in place, one member at a time, and is read-only (see archive_source.py)
 #
 # The constants archive is constructed on two levels. The archive and "metadata" regarding
 # the sets constained are listed in archive/constants/constarc.json", which are read in first. 
@@ -28,22 +36,138 @@
 #
 # These json files are newline deliminated json objects
 #
+# The metadata of each set also records the digest of its constants (set_digest, see 
+# Constants_Set.digest()) when it is added, or when record_digests() is called, so a set
+# can be checked against another without loading it. The sha256 of the bytes of the set
+# file is recorded with it (file_digest), and file_digest(name) hashes the file as it is
+# now, so a set file edited after its digest was recorded is detected without parsing it.
+#
+# Loaded sets are kept in a bounded, least-recently-used cache keyed by set name. 
+# A cache entry is reused only while the set's file is unchanged on disk (same 
+# modification time, size and inode), and the sets handed out are frozen
+# (read-only) and shared between callers. Use Constants_Set.copy() to obtain a 
+# set that can be modified. load_compiled_set() returns the array-backed 
+# Compiled_Constants_Set of a set, cached along with it (a set mapped from its columnar
+# copy is cached on its own, without the parsed set).
+#
+# Several processes may share one archive directory. Writers (add_constants_set and 
+# delete_constants_set) hold an exclusive lock on constants/.constarc.lock while they
+# re-read the metadata, write the set file and update constarc.json. Set files and
+# rewrites of constarc.json are written to a temporary file and renamed into place, and
+# reads of constarc.json take a shared lock, so readers never see a partial write and 
+# never block each other. Threads sharing one Constants_Archive are serialized on its RLock.
+#
+# To compare a constant across sets without loading them, the archive keeps an inverted
+# index (constants/.constarc_index.json) from each normalized constant name, and its 
+# aliases, to the sets and byte offsets of the records holding it. For instance "a0 (m)" is
+# found under both "a0 (m)" and "a0". The index is brought up to date on the first query, 
+# re-indexing only the sets whose files changed, and lookup() and lookup_values() then 
+# read just the matching records.
+#
+# With columnar=True, load_compiled_set() keeps a binary, columnar copy of each set it 
+# compiles in constants/.columnar/<SET_NAME>/ (see columnar.py), and later loads (in any 
+# process) map its arrays straight from disk instead of parsing the json file. The copy 
+# records the stat key of the set file it was built from, and is rebuilt when that file
+# changes. The json files remain the contents of the archive; the columnar copies are local
+# and never zipped. Zipped archives cannot be memory mapped, so they ignore columnar.
+#
+# Constants_Archive.open_read_only(path) opens an archive for reading only, for short 
+# scripts that need a few constants. It prints nothing, creates nothing and never writes
+# (no index, columnar copies or lock files). constarc.json is memory mapped and only 
+# scanned for the line of each set; the metadata of a set (including its long note) is
+# only parsed when that set is accessed, through a Lazy_Metadata mapping.
+#
 # NOTE :
 #   All constants and constants sets are converted to uppercase names to support case-insensitive file systems
 #
 import os
 import json
 import sys
+import hashlib
 import copy
+import threading
+import contextlib
+import collections
+import re
+import collections.abc
+import numpy as np
 from superHEAT.archive_manager import constants
+from superHEAT.archive_manager.archive_lock import File_Lock, atomic_write
+from superHEAT.archive_manager.archive_source import open_archive_source
+from superHEAT.archive_manager import columnar as columnar_store
+
+INDEX_VERSION = 1
+
+# Normalized form of a constant name used as a key in the index: lowercase, single spaces
+def normalize_constant_name(name):
+    return " ".join(name.lower().split())
+
+# All index keys of a constant: its normalized name, and the name without a trailing unit,
+# e.g. "a0 (m)" -> ["a0 (m)", "a0"]
+def constant_aliases(name):
+    key = normalize_constant_name(name)
+    keys = [key]
+    bare = re.sub(r"\s*\([^()]*\)$", "", key)
+    if bare and bare != key:
+        keys.append(bare)
+    return keys
+
+# Lazy_Metadata class
+#
+# Read-only mapping of set name -> Constants_Set (metadata only), built from the bytes of
+# constarc.json. The lines are only scanned for their set name, and each line is parsed
+# the first time its set is accessed. Lines that are not complete (no newline yet) are
+# ignored, as they are still being appended by a writer
+#
+_SET_NAME_PATTERN = re.compile(rb'"set_name"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+class Lazy_Metadata(collections.abc.Mapping):
+
+    def __init__(self, data):
+        self.data = data
+        self.lines = {}
+        self.parsed = {}
+        start = 0
+        while True:
+            end = data.find(b'\n', start)
+            if end < 0:
+                break
+            match = _SET_NAME_PATTERN.search(data, start, end)
+            if match is not None:
+                self.lines[json.loads(b'"' + match.group(1) + b'"').upper()] = (start, end)
+            start = end + 1
+
+    def __getitem__(self, name):
+        if name not in self.parsed:
+            start, end = self.lines[name]
+            self.parsed[name] = constants.Constants_Set.meta_from_dict(json.loads(self.data[start:end])).freeze()
+        return self.parsed[name]
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __contains__(self, name):
+        return name in self.lines
 
 class Constants_Archive:
     
     # Initialize archive based on if the top path is set or not 
-    def __init__(self, top_archive_path):
+    # cache_size is the maximum number of loaded sets that are kept in memory
+    # columnar enables the columnar copies of compiled sets
+    def __init__(self, top_archive_path, cache_size=8, columnar=False):
         self.path = os.path.join(top_archive_path, "constants")
         self.archive_file_name = os.path.join(self.path, "constarc.json")
+        self.lock_file_name = os.path.join(self.path, ".constarc.lock")
         self.constants_sets = {}
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.lock = threading.RLock()
+        self.index = None
+        self.columnar = columnar
+        self.read_only = False
 
         #Check if the top path is valid
         try: 
@@ -53,26 +177,146 @@ class Constants_Archive:
             print("ERROR", error)
             sys.exit(1)
 
+        #Directory or zipped archive
+        self.source = open_archive_source(top_archive_path)
+        self.read_only = self.source.read_only
+        if self.source.read_only:
+            self.archive_file_name = self.source.describe() + ":constants/constarc.json"
+
+        #A zipped archive cannot be created, so it must contain the constants archive
+        if self.source.read_only and not self.source.exists("constants/constarc.json"):
+            print("ERROR", "No constants archive in {path}".format(path=self.source.describe()))
+            sys.exit(1)
+
         #Check if the constants path exists or if this needs to be created 
-        if not os.path.exists(self.archive_file_name):
+        if not self.source.exists("constants/constarc.json"):
             print("WARNING : No constants archive detected, generating now...")
-            if not os.path.exists(self.path):
-                os.makedirs(self.path)
-            with open(self.archive_file_name, 'w', encoding='utf-8') as f:
-                os.utime(self.archive_file_name, None)
+            os.makedirs(self.path, exist_ok=True)
+            with File_Lock(self.lock_file_name):
+                with open(self.archive_file_name, 'a', encoding='utf-8') as f:
+                    pass
 
         #If the archive exists, we load it 
         else:
             print("Loading constants archive metadata from {path}".format(path=self.archive_file_name))
-            with open(self.archive_file_name, "r", encoding="utf-8") as f:
+            self.constants_sets = self.read_metadata()
+
+    # Open an archive (directory or zip) lazily and read-only, see the notes above
+    @classmethod
+    def open_read_only(cls, top_archive_path, cache_size=8):
+        carc = cls.__new__(cls)
+        carc.path = os.path.join(top_archive_path, "constants")
+        carc.lock_file_name = os.path.join(carc.path, ".constarc.lock")
+        carc.cache_size = cache_size
+        carc.cache = collections.OrderedDict()
+        carc.lock = threading.RLock()
+        carc.index = None
+        carc.columnar = False
+        carc.read_only = True
+
+        carc.source = open_archive_source(top_archive_path)
+        assert carc.source.exists("constants/constarc.json"), \
+                "No constants archive in {path}".format(path=carc.source.describe())
+        carc.archive_file_name = carc.source.describe() + ":constants/constarc.json" if carc.source.read_only else \
+                os.path.join(carc.path, "constarc.json")
+        with carc.read_lock():
+            carc.constants_sets = Lazy_Metadata(carc.source.map_bytes("constants/constarc.json"))
+        return carc
+
+    # Read constarc.json into a dictionary of Constants_Sets (metadata only)
+    # have_lock must be True if the caller already holds the exclusive lock
+    def read_metadata(self, have_lock=False):
+        sets = {}
+        with (contextlib.nullcontext() if have_lock else self.read_lock()):
+            with self.source.open("constants/constarc.json") as f:
                 for line in f:
                     new_set = constants.Constants_Set.meta_from_dict(json.loads(line))
-                    self.constants_sets[new_set.set_name] = new_set 
+                    sets[new_set.set_name] = new_set 
+        return sets
 
-    # Aquire a copy of a Constants_Set
+    # Shared lock for reading the archive (nothing to lock in a zipped archive)
+    # (a read-only archive does not create the lock file, if no writer ever has)
+    def read_lock(self):
+        if self.source.read_only or (self.read_only and not os.path.exists(self.lock_file_name)):
+            return contextlib.nullcontext()
+        return File_Lock(self.lock_file_name, shared=True)
+
+    # Aquire a read-only Constants_Set, from the cache if its file has not changed
     def load_constants_set(self, name):
-        self.constants_sets[name].json_load(os.path.join(self.path, self.constants_sets[name].set_name + ".json"))
-        return copy.deepcopy(self.constants_sets[name])
+        rel = "constants/" + self.constants_sets[name].set_name + ".json"
+        key = self.source.stat_key(rel)
+
+        with self.lock:
+            entry = self.cache.get(name)
+            if entry is not None and entry[0] == key and entry[1] is not None:
+                self.cache.move_to_end(name)
+                return entry[1]
+
+        #Parse into a fresh set, so the archive metadata is never modified. 
+        # Set files are replaced atomically, so this needs no file lock
+        cset = constants.Constants_Set.meta_from_dict(self.constants_sets[name].meta_to_dict())
+        with self.source.open(rel) as f:
+            cset.json_read(f)
+        cset.freeze()
+
+        self.cache_entry(name, key, cset=cset)
+        return cset
+
+    # Store a parsed set and/or its compiled set in the cache, keeping what is cached for
+    # the same stat key, and dropping the least recently used entries
+    def cache_entry(self, name, key, cset=None, compiled=None):
+        with self.lock:
+            entry = self.cache.get(name)
+            if entry is None or entry[0] != key:
+                entry = [key, None, None]
+            entry[1] = cset if cset is not None else entry[1]
+            entry[2] = compiled if compiled is not None else entry[2]
+            self.cache[name] = entry
+            self.cache.move_to_end(name)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    # Aquire a Compiled_Constants_Set (array-backed view) of a set, cached along with the set
+    def load_compiled_set(self, name):
+        if self.columnar and not self.read_only:
+            return self.load_columnar_set(name)
+
+        cset = self.load_constants_set(name)
+        with self.lock:
+            entry = self.cache.get(name)
+            if entry is not None and entry[1] is cset and entry[2] is not None:
+                return entry[2]
+        compiled = cset.compile()
+        with self.lock:
+            entry = self.cache.get(name)
+            if entry is not None and entry[1] is cset:
+                entry[2] = compiled
+        return compiled
+
+    # Aquire a Compiled_Constants_Set mapped from the columnar copy of a set, which is
+    # (re)built from the json file first if it is missing or stale. The mapped set is
+    # cached while the set file is unchanged
+    def load_columnar_set(self, name):
+        set_name = self.constants_sets[name].set_name
+        directory = os.path.join(self.path, ".columnar", set_name)
+        key = self.source.stat_key("constants/" + set_name + ".json")
+
+        with self.lock:
+            entry = self.cache.get(name)
+            if entry is not None and entry[0] == key and entry[2] is not None:
+                self.cache.move_to_end(name)
+                return entry[2]
+
+        table = columnar_store.open_columns(directory, list(key))
+        if table is None:
+            columnar_store.write_columns(directory, self.load_constants_set(name).to_columns(), list(key))
+            table = columnar_store.open_columns(directory, list(key))
+            #the set file changed while the copy was written, compile it directly instead
+            if table is None:
+                return self.load_constants_set(name).compile()
+        compiled = constants.Compiled_Constants_Set.from_columns(set_name, table)
+        self.cache_entry(name, key, compiled=compiled)
+        return compiled
 
     # Print a list of Constants_Sets
     def print_string(self):
@@ -87,35 +331,222 @@ class Constants_Archive:
     #Add a new constants set to the archive
     def add_constants_set(self, new_set): 
 
-        assert not new_set.set_name in self.constants_sets, \
-                "A set called {name} already exists in the Constants Archive".format(name=new_set.set_name)
-        assert not os.path.exists(os.path.join(self.path, new_set.set_name + ".json")), \
-                "{name}.json already exists in the archive".format(namnew_set.set_name)
+        assert not self.read_only, "The archive {path} is open read-only".format(path=self.source.describe())
+
+        with self.lock, File_Lock(self.lock_file_name):
 
-        #All checks have passed, add to the set
-        self.constants_sets[new_set.set_name] = new_set
+            #Another process may have changed the archive since we read it
+            self.constants_sets = self.read_metadata(have_lock=True)
 
-        #All checks have passed, write the .json file first (just in case) and then append to the archive metadata file
-        new_set.json_dump(os.path.join(self.path, new_set.set_name + ".json"))
+            assert not new_set.set_name in self.constants_sets, \
+                    "A set called {name} already exists in the Constants Archive".format(name=new_set.set_name)
+            assert not os.path.exists(os.path.join(self.path, new_set.set_name + ".json")), \
+                    "{name}.json already exists in the archive".format(name=new_set.set_name)
 
-        #APPEND to constarc.json
-        with open(self.archive_file_name, "a", encoding='utf-8') as f:
-            json.dump(new_set.meta_to_dict(), f, sort_keys=True, ensure_ascii=False)
-            f.write('\n')
+            #All checks have passed, write the .json file first (just in case) and then append to the archive metadata file
+            with atomic_write(os.path.join(self.path, new_set.set_name + ".json")) as f:
+                new_set.json_write(f)
+
+            #APPEND to constarc.json
+            meta = new_set.meta_to_dict()
+            meta['set_digest'] = new_set.digest()
+            meta['file_digest'] = self.file_digest(new_set.set_name)
+            with open(self.archive_file_name, "a", encoding='utf-8') as f:
+                json.dump(meta, f, sort_keys=True, ensure_ascii=False)
+                f.write('\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+            #All checks have passed, add to the set
+            self.constants_sets[new_set.set_name] = constants.Constants_Set.meta_from_dict(meta)
 
     #Delete a set of constants from the archive
     def delete_constants_set(self, old_set_name):
 
-        #Check that the old set actually exists 
-        if old_set_name in self.constants_sets:
-            #remove set from dict
-            self.constants_sets.remove(old_set_name)
+        assert not self.read_only, "The archive {path} is open read-only".format(path=self.source.describe())
+
+        with self.lock, File_Lock(self.lock_file_name):
+
+            #Another process may have changed the archive since we read it
+            self.constants_sets = self.read_metadata(have_lock=True)
 
-            #Remove the .json file for this set
-            os.remove(os.path.join(self.path, old_set_name + '.json'))
- 
-            #update the metadata file without this set
-            with open(self.archive_file_name, "w", encodint='utf-8') as f:
+            #Check that the old set actually exists 
+            if old_set_name in self.constants_sets:
+                #remove set from dict
+                del self.constants_sets[old_set_name]
+                self.cache.pop(old_set_name, None)
+
+                #update the metadata file without this set, then remove the .json file for this set
+                with atomic_write(self.archive_file_name) as f:
+                    for name, cset in self.constants_sets.items():
+                        json.dump(cset.meta_to_dict(), f, sort_keys=True, ensure_ascii=False)
+                        f.write('\n')
+                os.remove(os.path.join(self.path, old_set_name + '.json'))
+
+    #sha256 of the bytes of the file of a set, as it is now
+    def file_digest(self, name):
+        return hashlib.sha256(self.source.read_bytes("constants/" + name.upper() + ".json")).hexdigest()
+
+    #Record the digests of sets in the metadata, digests is a dictionary of set name -> digest
+    # and file_digests of set name -> file digest (by default, that of each file as it is now)
+    def record_digests(self, digests, file_digests=None):
+
+        assert not self.read_only, "The archive {path} is open read-only".format(path=self.source.describe())
+
+        with self.lock, File_Lock(self.lock_file_name):
+            self.constants_sets = self.read_metadata(have_lock=True)
+            for name, digest in digests.items():
+                assert name in self.constants_sets, "{name} is not in the Constants Archive".format(name=name)
+                self.constants_sets[name].set_digest = digest
+                self.constants_sets[name].file_digest = self.file_digest(name) if file_digests is None else file_digests[name]
+
+            with atomic_write(self.archive_file_name) as f:
                 for name, cset in self.constants_sets.items():
                     json.dump(cset.meta_to_dict(), f, sort_keys=True, ensure_ascii=False)
                     f.write('\n')
+
+    # Stat keys of the files of every set, name -> stat key
+    def stat_keys(self):
+        return {name : self.source.stat_key("constants/" + name + ".json") for name in self.constants_sets}
+
+    # Returns the inverted index, re-indexing only the sets that changed since it was built
+    # keys are the stat keys of the set files, if the caller already has them
+    #
+    # index["sets"]  : set name -> stat key of the set file when it was indexed
+    # index["names"] : normalized name or alias -> list of [set name, byte offset, constant name]
+    def constants_index(self, keys=None):
+        if keys is None:
+            keys = self.stat_keys()
+        with self.lock:
+            if self.index is None:
+                self.index = self.read_index()
+
+            stale = {}
+            for name in self.constants_sets:
+                key = list(keys[name])
+                if self.index["sets"].get(name) != key:
+                    stale[name] = key
+            removed = [name for name in self.index["sets"] if name not in self.constants_sets]
+            if not stale and not removed:
+                return self.index
+
+            #drop the entries of changed and removed sets, and index the changed sets again
+            dropped = set(stale) | set(removed)
+            names = {}
+            for key, records in self.index["names"].items():
+                records = [record for record in records if record[0] not in dropped]
+                if records:
+                    names[key] = records
+            for name in removed:
+                del self.index["sets"][name]
+
+            for name, key in stale.items():
+                offset = 0
+                for line in self.source.read_bytes("constants/" + name + ".json").splitlines(keepends=True):
+                    if line.strip():
+                        cname = json.loads(line)["name"]
+                        for alias in constant_aliases(cname):
+                            names.setdefault(alias, []).append([name, offset, cname])
+                    offset += len(line)
+                self.index["sets"][name] = key
+            self.index["names"] = names
+
+            self.write_index()
+            return self.index
+
+    # Reads the index from disk, or returns an empty one
+    def read_index(self):
+        empty = {"version" : INDEX_VERSION, "sets" : {}, "names" : {}}
+        if not self.source.exists("constants/.constarc_index.json"):
+            return empty
+        try:
+            with self.source.open("constants/.constarc_index.json") as f:
+                index = json.load(f)
+        except ValueError:
+            return empty
+        return index if index.get("version") == INDEX_VERSION else empty
+
+    # Writes the index to disk, if the archive is writable. The index is derived data, so
+    # concurrent writers only need the atomic replace
+    def write_index(self):
+        if self.read_only:
+            return
+        try:
+            with atomic_write(os.path.join(self.path, ".constarc_index.json")) as f:
+                json.dump(self.index, f, sort_keys=True)
+        except OSError as error:
+            print("WARNING : could not write the constants index :", error)
+
+    # Returns a list of (set name, Constant) for every constant matching name (or an alias),
+    # reading only those records. sets optionally restricts the search to some sets
+    def lookup(self, name, sets=None):
+        keys = self.stat_keys()
+        return self._lookup(self.constants_index(keys), keys, name, sets)
+
+    # lookup() in an index that is up to date with the stat keys of the set files, so that
+    # several names can be looked up with the set files checked only once
+    def _lookup(self, index, keys, name, sets):
+        records = index["names"].get(normalize_constant_name(name), [])
+        if sets is not None:
+            sets = [s.upper() for s in sets]
+            records = [record for record in records if record[0] in sets]
+
+        #group by set, so each set file is opened once
+        by_set = collections.OrderedDict()
+        for set_name, offset, cname in records:
+            by_set.setdefault(set_name, []).append((offset, cname))
+
+        found = []
+        for set_name, entries in by_set.items():
+            rel = "constants/" + set_name + ".json"
+
+            #a fresh cached copy of the set saves reading the file
+            with self.lock:
+                cached = self.cache.get(set_name)
+            if cached is not None and cached[1] is not None and cached[0] == keys[set_name]:
+                found += [(set_name, cached[1].constants[cname]) for offset, cname in entries]
+                continue
+
+            lines = self.source.read_lines_at(rel, [offset for offset, cname in entries])
+            found += [(set_name, constants.Constant.from_dict(json.loads(line))) for line in lines]
+        return found
+
+    # Bulk lookup of the values of constants across sets. Returns 
+    #   (set_names, values, uncs, rel_uncs)
+    # where set_names are the sets searched, and values, uncs and rel_uncs are arrays of 
+    # shape (len(names), len(set_names)); NaN where a set has no such constant, or where
+    # the uncertainty is not given. A single name gives 1D arrays instead. Where a name
+    # matches several constants of a set through an alias (e.g. "a0" for "a0 (m)" and 
+    # "a0 (bohr)"), the constant with exactly that name is used, or an error is raised
+    def lookup_values(self, names, sets=None):
+        single = isinstance(names, str)
+        if single:
+            names = [names]
+        set_names = list(self.constants_sets.keys()) if sets is None else [s.upper() for s in sets]
+        column = {set_name : j for j, set_name in enumerate(set_names)}
+
+        values   = np.full((len(names), len(set_names)), np.nan)
+        uncs     = np.full((len(names), len(set_names)), np.nan)
+        rel_uncs = np.full((len(names), len(set_names)), np.nan)
+        #the set files are checked once, for all the names
+        keys = self.stat_keys()
+        index = self.constants_index(keys)
+        for i, name in enumerate(names):
+            hits = collections.OrderedDict()
+            for set_name, constant in self._lookup(index, keys, name, set_names):
+                hits.setdefault(set_name, []).append(constant)
+            for set_name, found in hits.items():
+                #an alias may match several constants of a set, the exact name is preferred
+                if len(found) > 1:
+                    found = [c for c in found if normalize_constant_name(c.name) == normalize_constant_name(name)]
+                assert len(found) == 1, "ERROR : {name} is ambiguous in {set_name}, it matches {matches}".format(
+                        name=name, set_name=set_name, matches=", ".join(c.name for c in hits[set_name]))
+                constant = found[0]
+                j = column[set_name]
+                values[i, j]   = constant.value
+                uncs[i, j]     = constant.unc if constant.unc is not None else np.nan
+                rel_uncs[i, j] = constant.rel_unc if constant.rel_unc is not None else np.nan
+
+        if single:
+            return set_names, values[0], uncs[0], rel_uncs[0]
+        return set_names, values, uncs, rel_uncs
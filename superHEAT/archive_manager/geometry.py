@@ -6,11 +6,44 @@
 #
 # NOTES:
 # March 25, 2025 @ ANL : JHT created. Discrepancy between dihedral here and in CFOUR? 
+# October 19, 2026 : vectorized tables of internal coordinates (distance matrix, bonded angles and dihedrals)
+# October 19, 2026 : Geometry_Batch, many frames of one molecule in a single (optionally memory mapped) array
+# October 19, 2026 : canonical fingerprints of geometries, for deduplication and cache keys
+# October 19, 2026 : neighbor lists (k-d tree or cell list), bond graphs and fragments, for large geometries
 # 
 #
 
 import numpy as np
 import math
+import re
+import hashlib
+import itertools
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+#Covalent radii in Bohr, from the Angstrom values of Cordero et al., Dalton Trans. 2832 (2008)
+BOHR_PER_ANGSTROM = 1.0 / 0.529177210544
+COVALENT_RADII = {key : value * BOHR_PER_ANGSTROM for key, value in {
+    'H'  : 0.31, 'HE' : 0.28, 'LI' : 1.28, 'BE' : 0.96, 'B'  : 0.84, 'C'  : 0.76, 'N'  : 0.71, 'O'  : 0.66, 
+    'F'  : 0.57, 'NE' : 0.58, 'NA' : 1.66, 'MG' : 1.41, 'AL' : 1.21, 'SI' : 1.11, 'P'  : 1.07, 'S'  : 1.05, 
+    'CL' : 1.02, 'AR' : 1.06, 'K'  : 2.03, 'CA' : 1.76, 'SC' : 1.70, 'TI' : 1.60, 'V'  : 1.53, 'CR' : 1.39, 
+    'MN' : 1.39, 'FE' : 1.32, 'CO' : 1.26, 'NI' : 1.24, 'CU' : 1.32, 'ZN' : 1.22, 'GA' : 1.22, 'GE' : 1.20, 
+    'AS' : 1.19, 'SE' : 1.20, 'BR' : 1.20, 'KR' : 1.16, 'RB' : 2.20, 'SR' : 1.95, 'Y'  : 1.90, 'ZR' : 1.75, 
+    'NB' : 1.64, 'MO' : 1.54, 'TC' : 1.47, 'RU' : 1.46, 'RH' : 1.42, 'PD' : 1.39, 'AG' : 1.45, 'CD' : 1.44, 
+    'IN' : 1.42, 'SN' : 1.39, 'SB' : 1.39, 'TE' : 1.38, 'I'  : 1.39, 'XE' : 1.40}.items()}
+
+#Bonds are atoms closer than BOND_SCALE times the sum of their covalent radii
+BOND_SCALE = 1.2
+
+#Default tolerance of fingerprints, in Bohr
+FINGERPRINT_TOL = 1.0e-3
+
+#Up to this many atoms, contacts are found from the full distance matrix, which is faster
+# than building a neighbor list
+DENSE_ATOMS = 64
 
 #---------------------------------------
 # Geometry Class
@@ -23,17 +56,34 @@ import math
 #   Angle between three atoms  : angle(i,j,k)
 #   Diheydral between four atoms : diheydral(i,j,k,l)
 #
+# Tables of internal coordinates, each computed with a single broadcast:
+#   Distance matrix : distance_matrix()
+#   Distances, angles or dihedrals of an (m,2), (m,3) or (m,4) array of atom indices : 
+#       dists(idx), angles(idx), dihedrals(idx, signed=False)
+#   Without idx, angles() and dihedrals() are those of the bonded atoms, given by 
+#       bonded_angles() and bonded_dihedrals() (bonds from the covalent radii, see bonds())
+#
+# Neighbor lists, which scale linearly with the number of atoms:
+#   Pairs of atoms within a cutoff : neighbors(cutoff)
+#   Bond graph (CSR arrays indptr, indices) : bond_graph()
+#   Fragment (bonded component) of each atom : fragments()
+#
+# Canonical fingerprint (a hex string, usable as a dictionary or index key): fingerprint(tol)
+#
 # Datastructure:
 #   name  - string 
 #   atoms - array of atom names (case insensitive)
 #   xyz   - np array of the x,y,z coordinates of each atom in Bohrs 
 #
+# With copy=False, xyz is used as it is (no copy) if it is already an array, e.g. to
+# view one frame of a Geometry_Batch
+#
 class Geometry:
 
-    def __init__(self, name=None, atoms=None, xyz=None):
+    def __init__(self, name=None, atoms=None, xyz=None, copy=True):
         self.name = name
         self.atoms = atoms
-        self.xyz = np.array(xyz)
+        self.xyz = np.array(xyz) if copy else np.asanyarray(xyz)
 
         for i, atom in enumerate(self.atoms): 
             self.atoms[i] = atom.upper() 
@@ -59,10 +109,148 @@ class Geometry:
         kl = np.subtract(self.xyz[l], self.xyz[k])
         return dihedral_(ji, jk, kl)
 
+    #Returns the (n,n) matrix of distances in Bohrs
+    def distance_matrix(self):
+        return distance_matrix_(self.xyz)
+
+    #Returns the covalent radii of the atoms in Bohrs
+    def radii(self):
+        return covalent_radii_(self.atoms)
+
+    #Returns the (m,2) array of bonded pairs i<j
+    def bonds(self, scale=BOND_SCALE):
+        return contact_pairs_(self.xyz, self.radii(), scale)
+
+    #Returns the (m,2) array of pairs i<j closer than cutoff (Bohr)
+    def neighbors(self, cutoff):
+        return neighbor_pairs_(self.xyz, cutoff)
+
+    #Returns the bond graph, as the CSR arrays (indptr, indices) of the bonded atoms of each atom
+    def bond_graph(self, scale=BOND_SCALE):
+        return bond_graph_(self.bonds(scale), len(self.atoms))
+
+    #Returns the fragment of each atom, numbered from 0 in the order of their first atoms
+    def fragments(self, scale=BOND_SCALE):
+        return fragments_(self.bonds(scale), len(self.atoms))
+
+    #Returns the (m,3) array of angles i-j-k between bonded atoms, with i<k
+    def bonded_angles(self, scale=BOND_SCALE):
+        return bonded_angles_(self.bonds(scale), len(self.atoms))
+
+    #Returns the (m,4) array of dihedrals i-j-k-l between bonded atoms, with j<k
+    def bonded_dihedrals(self, scale=BOND_SCALE):
+        return bonded_dihedrals_(self.bonds(scale), len(self.atoms))
+
+    #Returns the distances of an (m,2) array of indices in Bohrs
+    def dists(self, idx):
+        return distances_(self.xyz, idx)
+
+    #Returns the angles of an (m,3) array of indices in radians, the bonded angles by default
+    def angles(self, idx=None):
+        return angles_(self.xyz, self.bonded_angles() if idx is None else idx)
+
+    #Returns the dihedrals of an (m,4) array of indices in radians, the bonded dihedrals by default
+    # signed dihedrals are in (-pi, pi], otherwise [0, pi] like dihedral()
+    def dihedrals(self, idx=None, signed=False):
+        return dihedrals_(self.xyz, self.bonded_dihedrals() if idx is None else idx, signed)
+
+    #Returns the canonical fingerprint, see fingerprints_()
+    def fingerprint(self, tol=FINGERPRINT_TOL):
+        return fingerprints_(self.atoms, self.xyz[None, :, :], tol)[0]
+
+#---------------------------------------
+# Geometry_Batch Class
+#
+# Many frames (a scan, finite difference displacements, conformers...) of the same atoms,
+# in a single (n_frames, n_atoms, 3) float64 array. NOTE: always in Bohr
+#
+# The coordinate tables are computed for every frame at once, and have shape (n_frames, m):
+#   distance_matrix(), dists(idx), angles(idx), dihedrals(idx, signed=False)
+# Without idx, the bonded angles and dihedrals of the first frame are used.
+# fingerprints(tol) returns the canonical fingerprint of every frame.
+#
+# Indexing does not copy:
+#   batch[k]      : Geometry that is a view of frame k
+#   batch[a:b:c]  : Geometry_Batch that is a view of those frames
+#
+# A batch can be backed by a .npy file that is memory mapped, so batches larger than
+# memory can be filled and read a few frames at a time:
+#   batch = Geometry_Batch.create_memmap("frames.npy", atoms, n_frames)   #new file
+#   batch = Geometry_Batch.open_memmap("frames.npy", atoms)               #read-only
+#
+# Datastructure:
+#   name  - string
+#   atoms - list of atom names (upper case)
+#   xyz   - np array of shape (n_frames, n_atoms, 3)
+#
+class Geometry_Batch:
+
+    def __init__(self, name=None, atoms=None, xyz=None, copy=True):
+        self.name = name
+        self.atoms = [atom.upper() for atom in atoms]
+        self.xyz = np.array(xyz, dtype=np.float64) if copy else np.asanyarray(xyz, dtype=np.float64)
+        assert self.xyz.ndim == 3 and self.xyz.shape[1:] == (len(self.atoms), 3), \
+                "ERROR : batch coordinates must have shape (n_frames, {n}, 3)".format(n=len(self.atoms))
+
+    #Stack a list of Geometries of the same atoms
+    @classmethod
+    def from_geometries(cls, geoms, name=None):
+        assert len(geoms) > 0, "ERROR : no geometries to batch"
+        for geom in geoms:
+            assert geom.atoms == geoms[0].atoms, "ERROR : geometries in a batch must have the same atoms"
+        return cls(name=name, atoms=geoms[0].atoms, xyz=np.stack([geom.xyz for geom in geoms]), copy=False)
+
+    #Create a new .npy file of zeros, memory mapped for writing
+    @classmethod
+    def create_memmap(cls, file_name, atoms, n_frames, name=None):
+        xyz = np.lib.format.open_memmap(file_name, mode='w+', dtype=np.float64, shape=(n_frames, len(atoms), 3))
+        return cls(name=name, atoms=atoms, xyz=xyz, copy=False)
+
+    #Open a .npy file memory mapped, read-only by default
+    @classmethod
+    def open_memmap(cls, file_name, atoms, mode='r', name=None):
+        return cls(name=name, atoms=atoms, xyz=np.load(file_name, mmap_mode=mode), copy=False)
+
+    #Save the coordinates to a .npy file
+    def save(self, file_name):
+        np.save(file_name, self.xyz)
+
+    def __len__(self):
+        return self.xyz.shape[0]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return Geometry_Batch(name=self.name, atoms=self.atoms, xyz=self.xyz[key], copy=False)
+        return Geometry(name=self.name, atoms=list(self.atoms), xyz=self.xyz[key], copy=False)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+    #Returns the (n_frames,n,n) distance matrices in Bohrs
+    def distance_matrix(self):
+        return distance_matrix_(self.xyz)
+
+    #Returns the (n_frames,m) distances of an (m,2) array of indices in Bohrs
+    def dists(self, idx):
+        return distances_(self.xyz, idx)
+
+    #Returns the (n_frames,m) angles of an (m,3) array of indices in radians
+    def angles(self, idx=None):
+        return angles_(self.xyz, self[0].bonded_angles() if idx is None else idx)
+
+    #Returns the (n_frames,m) dihedrals of an (m,4) array of indices in radians
+    def dihedrals(self, idx=None, signed=False):
+        return dihedrals_(self.xyz, self[0].bonded_dihedrals() if idx is None else idx, signed)
+
+    #Returns the list of the canonical fingerprints of the frames
+    def fingerprints(self, tol=FINGERPRINT_TOL):
+        return fingerprints_(self.atoms, self.xyz, tol)
+
 #Molecule Class
 
 
-#Molecule_Archive Class
+#Molecule_Archive Class : see molarc.py
 
 d80_xyz = np.array([[-0.14063595,    -0.08271057,    -0.00000000], [ 0.78861218,    -1.66274672,    -0.00000000], [ 0.44295800,    1.32378367,     1.02039617], [ 0.44295800,     1.32378367,    -1.02039617]])
 
@@ -70,14 +258,216 @@ d150_xyz = np.array([[-0.05447514, 0.00843423,0.00000000],[ 0.22598679, 1.819885
 
 dtest = np.array([[-0.01426719251500,        -0.05324588734734,        -0.00000000000000], [-0.01426719251500,        -0.05324588734734,         1.83303472504763],  [ 1.57318744539527,        -0.05324588734734,        -0.91651736252381], [-1.38904323630072,         0.74048143160779,        -0.91651736252381]])
 
-#angle between two vectors
+#angle between two vectors, or between the vectors along the last axis of two arrays
 def angle_(v, w):
-    return np.arccos(np.clip(np.dot(v, w)/(np.linalg.norm(v) * np.linalg.norm(w)), -1.0, 1.0)) 
+    v = np.asarray(v, dtype=np.float64)
+    w = np.asarray(w, dtype=np.float64)
+    cos = np.sum(v * w, axis=-1) / (np.linalg.norm(v, axis=-1) * np.linalg.norm(w, axis=-1))
+    return np.arccos(np.clip(cos, -1.0, 1.0)) 
 
 #dihedral between three vectors assuming b contains a common point with a and c
 def dihedral_(a, b, c):
     axb = np.cross(a, b)
     bxc = np.cross(b, c)
     return angle_(axb, bxc)
+
+#signed dihedral between three vectors, in (-pi, pi]
+def signed_dihedral_(a, b, c):
+    axb = np.cross(a, b)
+    bxc = np.cross(b, c)
+    y = np.linalg.norm(b, axis=-1) * np.sum(a * bxc, axis=-1)
+    x = np.sum(axb * bxc, axis=-1)
+    return np.arctan2(y, x)
+
+#The functions below take coordinates of shape (..., n, 3), so they work on a single 
+# geometry or on a batch of them, and return arrays of shape (..., m)
+
+#distance matrix, (..., n, n)
+def distance_matrix_(xyz):
+    xyz = np.asarray(xyz, dtype=np.float64)
+    return np.linalg.norm(xyz[..., :, None, :] - xyz[..., None, :, :], axis=-1)
+
+#distances of the pairs in idx (m,2)
+def distances_(xyz, idx):
+    xyz = np.asarray(xyz, dtype=np.float64)
+    idx = np.asarray(idx, dtype=np.intp).reshape(-1, 2)
+    return np.linalg.norm(xyz[..., idx[:, 0], :] - xyz[..., idx[:, 1], :], axis=-1)
+
+#angles i-j-k of the triples in idx (m,3)
+def angles_(xyz, idx):
+    xyz = np.asarray(xyz, dtype=np.float64)
+    idx = np.asarray(idx, dtype=np.intp).reshape(-1, 3)
+    ji = xyz[..., idx[:, 0], :] - xyz[..., idx[:, 1], :]
+    jk = xyz[..., idx[:, 2], :] - xyz[..., idx[:, 1], :]
+    return angle_(ji, jk)
+
+#dihedrals i-j-k-l of the quadruples in idx (m,4)
+def dihedrals_(xyz, idx, signed=False):
+    xyz = np.asarray(xyz, dtype=np.float64)
+    idx = np.asarray(idx, dtype=np.intp).reshape(-1, 4)
+    ij = xyz[..., idx[:, 1], :] - xyz[..., idx[:, 0], :]
+    jk = xyz[..., idx[:, 2], :] - xyz[..., idx[:, 1], :]
+    kl = xyz[..., idx[:, 3], :] - xyz[..., idx[:, 2], :]
+    return signed_dihedral_(ij, jk, kl) if signed else dihedral_(ij, jk, kl)
+
+#element of an atom label, e.g. 'C1' -> 'C'
+def element_(label):
+    match = re.match(r"[A-Za-z]+", label)
+    return match.group(0).upper() if match is not None else label.upper()
+
+#covalent radii of a list of atom labels, in Bohrs
+def covalent_radii_(atoms):
+    elements = [element_(atom) for atom in atoms]
+    for element in elements:
+        assert element in COVALENT_RADII, "ERROR : no covalent radius for {atom}".format(atom=element)
+    return np.array([COVALENT_RADII[element] for element in elements])
+
+#bonded pairs i<j (m,2), from a distance matrix and covalent radii
+def bonds_(dmat, radii, scale=BOND_SCALE):
+    bonded = dmat < scale * (radii[:, None] + radii[None, :])
+    return np.argwhere(np.triu(bonded, k=1))
+
+#concatenated ranges start[s], ..., start[s] + counts[s] - 1 of every s
+def _ranges(starts, counts):
+    counts = np.asarray(counts, dtype=np.intp)
+    return np.repeat(np.asarray(starts, dtype=np.intp) - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+#pairs i<j (m,2) of the atoms of one frame xyz (n,3) closer than cutoff (Bohr), sorted.
+# With scipy, from a k-d tree (method "kdtree"), otherwise from a cell list (method "cells"):
+# the atoms are binned into cubic cells of side cutoff, and only atoms in the same or
+# neighboring cells are compared, so both take O(n) time for a fixed density
+def neighbor_pairs_(xyz, cutoff, method=None):
+    xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+    assert cutoff > 0, "ERROR : the neighbor cutoff must be positive, not {cutoff}".format(cutoff=cutoff)
+    if method is None:
+        method = "kdtree" if cKDTree is not None else "cells"
+    if xyz.shape[0] < 2:
+        return np.zeros((0, 2), dtype=np.intp)
+    if method == "kdtree":
+        assert cKDTree is not None, "ERROR : k-d tree neighbor lists need scipy"
+        pairs = cKDTree(xyz).query_pairs(cutoff, output_type='ndarray').astype(np.intp).reshape(-1, 2)
+    else:
+        assert method == "cells", "ERROR : unknown neighbor list method {method}".format(method=method)
+        pairs = _cell_pairs(xyz, cutoff)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+#pairs i<j closer than cutoff, from a cell list
+def _cell_pairs(xyz, cutoff):
+    n = xyz.shape[0]
+    #cells are padded by one on each side, so the neighbors of every cell exist
+    cells = np.floor((xyz - xyz.min(axis=0)) / cutoff).astype(np.int64) + 1
+    dims = cells.max(axis=0) + 2
+    def key(c):
+        return (c[:, 0] * dims[1] + c[:, 1]) * dims[2] + c[:, 2]
+    order = np.argsort(key(cells), kind='stable')
+    sorted_keys = key(cells)[order]
+
+    pairs = []
+    for offset in itertools.product((-1, 0, 1), repeat=3):
+        neighbor = key(cells + np.array(offset))
+        start = np.searchsorted(sorted_keys, neighbor, side='left')
+        counts = np.searchsorted(sorted_keys, neighbor, side='right') - start
+        i = np.repeat(np.arange(n), counts)
+        j = order[_ranges(start, counts)]
+        keep = i < j
+        i, j = i[keep], j[keep]
+        keep = np.linalg.norm(xyz[i] - xyz[j], axis=-1) <= cutoff
+        pairs.append(np.stack([i[keep], j[keep]], axis=-1))
+    return np.concatenate(pairs).astype(np.intp)
+
+#pairs i<j (m,2) of the atoms of one frame xyz (n,3) closer than scale times the sum of
+# their covalent radii (the bonds, for scale=BOND_SCALE), sorted like bonds_()
+def contact_pairs_(xyz, radii, scale=BOND_SCALE):
+    xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, 3)
+    radii = np.asarray(radii, dtype=np.float64)
+    if xyz.shape[0] <= DENSE_ATOMS:
+        return bonds_(distance_matrix_(xyz), radii, scale)
+    pairs = neighbor_pairs_(xyz, scale * 2.0 * radii.max())
+    keep = distances_(xyz, pairs) < scale * (radii[pairs[:, 0]] + radii[pairs[:, 1]])
+    return pairs[keep]
+
+#bond graph of the bonded pairs, as the CSR arrays (indptr, indices): the atoms bonded to
+# atom i are indices[indptr[i]:indptr[i+1]], sorted
+def bond_graph_(bonds, natoms):
+    bonds = np.asarray(bonds, dtype=np.intp).reshape(-1, 2)
+    i = np.concatenate([bonds[:, 0], bonds[:, 1]])
+    j = np.concatenate([bonds[:, 1], bonds[:, 0]])
+    order = np.lexsort((j, i))
+    indptr = np.zeros(natoms + 1, dtype=np.intp)
+    indptr[1:] = np.cumsum(np.bincount(i, minlength=natoms))
+    return indptr, j[order]
+
+#fragment (connected component of the bond graph) of each atom (natoms,), numbered from 0
+# in the order of their first atoms. Each atom takes the smallest label of its neighbors,
+# with pointer jumping, until nothing changes
+def fragments_(bonds, natoms):
+    bonds = np.asarray(bonds, dtype=np.intp).reshape(-1, 2)
+    labels = np.arange(natoms)
+    while True:
+        new = labels.copy()
+        np.minimum.at(new, bonds[:, 0], labels[bonds[:, 1]])
+        np.minimum.at(new, bonds[:, 1], labels[bonds[:, 0]])
+        new = new[new]
+        if np.array_equal(new, labels):
+            break
+        labels = new
+    return np.unique(labels, return_inverse=True)[1].reshape(-1)
+
+#bonded angles i-j-k (m,3) with i<k, from the bonded pairs
+def bonded_angles_(bonds, natoms):
+    indptr, indices = bond_graph_(bonds, natoms)
+    degree = np.diff(indptr)
+    #each bond j-i, paired with every bond j-k
+    center = np.repeat(np.arange(natoms), degree)
+    edge = np.repeat(np.arange(len(indices)), degree[center])
+    k = indices[_ranges(indptr[center], degree[center])]
+    i, j = indices[edge], center[edge]
+    keep = i < k
+    return np.stack([i[keep], j[keep], k[keep]], axis=-1)
+
+#bonded dihedrals i-j-k-l (m,4) about each bond j<k, from the bonded pairs
+def bonded_dihedrals_(bonds, natoms):
+    bonds = np.asarray(bonds, dtype=np.intp).reshape(-1, 2)
+    indptr, indices = bond_graph_(bonds, natoms)
+    degree = np.diff(indptr)
+    j, k = bonds[:, 0], bonds[:, 1]
+    #each bond j-k with every atom i bonded to j, then every atom l bonded to k
+    b = np.repeat(np.arange(len(bonds)), degree[j])
+    i = indices[_ranges(indptr[j], degree[j])]
+    bi = np.repeat(np.arange(len(b)), degree[k[b]])
+    l = indices[_ranges(indptr[k[b]], degree[k[b]])]
+    b, i = b[bi], i[bi]
+    keep = (i != k[b]) & (l != j[b]) & (i != l)
+    b, i, l = b[keep], i[keep], l[keep]
+    return np.stack([i, j[b], k[b], l], axis=-1)
         
 
+#Canonical fingerprints of frames of the same atoms, xyz of shape (n_frames, n, 3)
+#
+# The fingerprint is the sha256 of the element counts, the tolerance, and the spectrum of
+# interatomic distances: every distance rounded to a multiple of tol, labelled by the 
+# (sorted) elements of its pair, and sorted. It does not depend on translation, rotation,
+# reflection or the order of the atoms, so two geometries of the same structure have the
+# same fingerprint. Note that
+#   - mirror images (enantiomers) have the same fingerprint
+#   - distances within tol of a rounding boundary may round either way, so geometries that
+#     differ by less than tol usually, but not always, share a fingerprint
+def fingerprints_(atoms, xyz, tol=FINGERPRINT_TOL):
+    xyz = np.asarray(xyz, dtype=np.float64)
+    elements = [element_(atom) for atom in atoms]
+    kinds = sorted(set(elements))
+    codes = np.array([kinds.index(element) for element in elements], dtype=np.int64)
+    header = ",".join("{e}{n}".format(e=e, n=elements.count(e)) for e in kinds) + ";{tol!r};".format(tol=float(tol))
+
+    n = len(atoms)
+    i, j = np.triu_indices(n, k=1)
+    pair = np.minimum(codes[i], codes[j]) * len(kinds) + np.maximum(codes[i], codes[j])
+    dist = np.linalg.norm(xyz[:, i, :] - xyz[:, j, :], axis=-1)
+    keys = np.sort((pair[None, :] << 40) + np.rint(dist / tol).astype(np.int64), axis=-1)
+
+    prints = []
+    for frame_keys in keys:
+        h = hashlib.sha256(header.encode('utf-8'))
+        h.update(np.ascontiguousarray(frame_keys, dtype='<i8').tobytes())
+        prints.append(h.hexdigest())
+    return prints
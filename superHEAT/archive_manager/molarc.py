@@ -0,0 +1,319 @@
+# molarc.py
+#
+# Contains the Molecule_Archive class, which manages the storage and retrieval of
+# molecular geometries
+#
+# NOTES:
+# October 19, 2026 : created
+# October 19, 2026 : hashes are canonical geometry fingerprints
+# October 19, 2026 : compact on-disk index, records are parsed on demand
+#
+#
+
+# Molecule_Archive class
+#
+# The molecule archive sits next to the constants archive, in the molecules directory of
+# the top level archive (an extracted directory, or a zipped archive, which is read-only):
+#
+#   archive/molecules/molarc.json  : newline delimited json, one record per molecule
+#   archive/molecules/coords.bin   : the coordinates of every molecule, as one contiguous
+#                                    array of float64 (x, y, z) rows, in Bohr
+#
+# Each record holds the name, formula, hash, atoms and note of a molecule, and the row
+# (offset) of its first atom in coords.bin. coords.bin is memory mapped, so loading one
+# geometry reads only its own rows, whatever the size of the archive. 
+#
+# Opening the archive does not parse the records. A compact index of molarc.json is kept
+# next to it (molecules/.molarc_index.json, local and never zipped), holding the byte range
+# of the record of each name, the names of each formula and hash, and the number of rows 
+# in use. As molarc.json is only ever appended to, the index is brought up to date by 
+# parsing just the records added since it was written. molarc.json is memory mapped, and
+# a record is only parsed (once) when get() or note() needs its atoms or note, so that
+#   get(name), find_formula(formula), find_hash(hash)
+# are dictionary lookups. Zipped archives have no index on disk, and build it in memory.
+#
+# Names are unique, and are converted to uppercase like the names of constants sets.
+# Formulas are in Hill order (e.g. "CH3", "CH4O", "ClH"). The hash of a geometry is its
+# canonical fingerprint (see geometry.fingerprints_), so find_geometry() finds a structure
+# whatever its position, orientation and atom order.
+#
+# Molecules are only ever appended. A writer holds an exclusive lock on
+# molecules/.molarc.lock, re-reads the records, appends the coordinates to coords.bin,
+# and only then appends the records to molarc.json, so a reader never sees a record
+# whose coordinates are not written yet. Readers take a shared lock to read molarc.json.
+#
+import os
+import sys
+import json
+import copy
+import hashlib
+import threading
+import contextlib
+import collections
+import numpy as np
+from superHEAT.archive_manager import geometry
+from superHEAT.archive_manager.archive_lock import File_Lock, atomic_write
+from superHEAT.archive_manager.archive_source import open_archive_source
+
+INDEX_VERSION = 1
+
+# Formula of a list of atom labels, in Hill order
+def hill_formula(atoms):
+    counts = collections.Counter(geometry.element_(atom).capitalize() for atom in atoms)
+    order = []
+    if "C" in counts:
+        order = ["C"] + (["H"] if "H" in counts else [])
+    order += sorted(element for element in counts if element not in order)
+    return "".join(element + (str(counts[element]) if counts[element] > 1 else "") for element in order)
+
+# Hash of a geometry, its canonical fingerprint
+def geometry_hash(geom):
+    return geometry.fingerprints_(geom.atoms, np.asarray(geom.xyz, dtype=np.float64)[None, :, :])[0]
+
+# An index of no records
+#   source  : stat key of molarc.json when it was indexed (None if it ended in a partial line)
+#   size    : number of bytes of molarc.json indexed (complete lines only)
+#   tail    : digest of the last indexed bytes, to tell an append from a replaced file
+#   nrows   : number of rows of coords.bin used by the records
+#   names   : name -> [start, end] byte range of its record
+#   formula : formula -> names, hash : hash -> names
+def empty_index():
+    return {"version" : INDEX_VERSION, "source" : None, "size" : 0, "tail" : tail_digest(b'', 0), 
+            "nrows" : 0, "names" : {}, "formula" : {}, "hash" : {}}
+
+# sha256 of the (up to 4096) bytes before size
+def tail_digest(data, size):
+    return hashlib.sha256(data[max(0, size - 4096):size]).hexdigest()
+
+class Molecule_Archive:
+
+    # Initialize from the top level archive directory (or zipped archive)
+    def __init__(self, top_archive_path):
+        self.path = os.path.join(top_archive_path, "molecules")
+        self.archive_file_name = os.path.join(self.path, "molarc.json")
+        self.coords_file_name = os.path.join(self.path, "coords.bin")
+        self.lock_file_name = os.path.join(self.path, ".molarc.lock")
+        self.lock = threading.RLock()
+        self.index = empty_index()
+        self.data = b''
+        self.parsed = {}
+        self.nrows = 0
+        self.coords = None
+
+        #Check if the top path is valid
+        try:
+            if not os.path.exists(top_archive_path):
+                raise RuntimeError("Top level archive path not valid, are you use you unzipped it?")
+        except RuntimeError as error:
+            print("ERROR", error)
+            sys.exit(1)
+
+        self.source = open_archive_source(top_archive_path)
+        self.read_only = self.source.read_only
+        if self.source.read_only:
+            self.archive_file_name = self.source.describe() + ":molecules/molarc.json"
+
+        if not self.source.exists("molecules/molarc.json"):
+            #an empty, zipped archive has no molecules
+            if not self.source.read_only:
+                print("WARNING : No molecule archive detected, generating now...")
+                os.makedirs(self.path, exist_ok=True)
+                with File_Lock(self.lock_file_name):
+                    for file_name in (self.archive_file_name, self.coords_file_name):
+                        with open(file_name, 'a', encoding='utf-8') as f:
+                            pass
+        else:
+            print("Loading molecule archive metadata from {path}".format(path=self.archive_file_name))
+            self.read_metadata()
+
+    # Map molarc.json and bring the index up to date, parsing only the records appended
+    # since it was written (or all of them, if it is missing or molarc.json was replaced)
+    # have_lock must be True if the caller already holds the exclusive lock
+    def read_metadata(self, have_lock=False):
+        rel = "molecules/molarc.json"
+        with self.lock:
+            index = self.index if self.index["size"] > 0 else self.read_index()
+            with (contextlib.nullcontext() if have_lock else self.read_lock()):
+                key = list(self.source.stat_key(rel))
+                data = self.source.map_bytes(rel)
+            if index["source"] == key:
+                self.index, self.data, self.nrows = index, data, index["nrows"]
+                return
+
+            #start over if molarc.json was replaced, rather than appended to
+            if index["size"] > len(data) or index["tail"] != tail_digest(data, index["size"]):
+                index = empty_index()
+                self.parsed = {}
+            else:
+                index = copy.deepcopy(index)
+
+            #only complete lines, a writer may still be appending
+            start = index["size"]
+            while True:
+                end = data.find(b'\n', start)
+                if end < 0:
+                    break
+                if data[start:end].strip():
+                    record = json.loads(data[start:end])
+                    index["names"][record["name"]] = [start, end]
+                    index["formula"].setdefault(record["formula"], []).append(record["name"])
+                    index["hash"].setdefault(record["hash"], []).append(record["name"])
+                    index["nrows"] = max(index["nrows"], record["offset"] + len(record["atoms"]))
+                start = end + 1
+            index["size"] = start
+            index["tail"] = tail_digest(data, start)
+            index["source"] = key if start == len(data) else None
+
+            self.index, self.data, self.nrows = index, data, index["nrows"]
+            self.write_index()
+
+    # Reads the index from disk, or returns an empty one
+    def read_index(self):
+        rel = "molecules/.molarc_index.json"
+        if not self.source.exists(rel):
+            return empty_index()
+        try:
+            with self.source.open(rel) as f:
+                index = json.load(f)
+        except ValueError:
+            return empty_index()
+        return index if index.get("version") == INDEX_VERSION else empty_index()
+
+    # Writes the index to disk, if the archive is writable. The index is derived data, so
+    # concurrent writers only need the atomic replace
+    def write_index(self):
+        if self.read_only:
+            return
+        try:
+            with atomic_write(os.path.join(self.path, ".molarc_index.json")) as f:
+                json.dump(self.index, f)
+        except OSError as error:
+            print("WARNING : could not write the molecule index :", error)
+
+    # The record of a molecule, parsed from molarc.json the first time it is needed
+    def record(self, name):
+        name = name.upper()
+        with self.lock:
+            if name not in self.parsed:
+                start, end = self.index["names"][name]
+                self.parsed[name] = json.loads(self.data[start:end])
+            return self.parsed[name]
+
+    # Shared lock for reading the archive (nothing to lock in a zipped archive)
+    def read_lock(self):
+        if self.source.read_only:
+            return contextlib.nullcontext()
+        return File_Lock(self.lock_file_name, shared=True)
+
+    # The (rows, 3) coordinate array, memory mapped (or read from a zipped archive).
+    # Remapped when the archive has grown past the current mapping
+    def coords_array(self):
+        with self.lock:
+            if self.coords is None or self.coords.shape[0] < self.nrows:
+                if self.source.read_only:
+                    data = self.source.read_bytes("molecules/coords.bin")
+                    self.coords = np.frombuffer(data, dtype=np.float64).reshape(-1, 3)
+                elif self.nrows == 0:
+                    self.coords = np.zeros((0, 3))
+                else:
+                    self.coords = np.memmap(self.coords_file_name, dtype=np.float64, mode='r', shape=(self.nrows, 3))
+            return self.coords
+
+    def __len__(self):
+        return len(self.index["names"])
+
+    def __contains__(self, name):
+        return name.upper() in self.index["names"]
+
+    # Names of all molecules, in the order they were added
+    def names(self):
+        names = self.index["names"]
+        return sorted(names, key=lambda name: names[name][0])
+
+    # Returns the Geometry of a molecule
+    def get(self, name):
+        record = self.record(name)
+        natoms = len(record["atoms"])
+        xyz = np.array(self.coords_array()[record["offset"]:record["offset"] + natoms])
+        return geometry.Geometry(name=record["name"], atoms=list(record["atoms"]), xyz=xyz)
+
+    # Returns the note of a molecule
+    def note(self, name):
+        return self.record(name)["note"]
+
+    # Names of the molecules with a formula (e.g. "CH4O")
+    def find_formula(self, formula):
+        return list(self.index["formula"].get(formula, []))
+
+    # Names of the molecules with a hash
+    def find_hash(self, hash_key):
+        return list(self.index["hash"].get(hash_key, []))
+
+    # Names of the molecules with the same hash as a geometry
+    def find_geometry(self, geom):
+        return self.find_hash(geometry_hash(geom))
+
+    # Add a molecule to the archive
+    def add_molecule(self, geom, note=""):
+        self.add_molecules([geom], notes=[note])
+
+    # Add a list of molecules to the archive (with an optional list of notes)
+    def add_molecules(self, geoms, notes=None):
+
+        assert not self.read_only, "The archive {path} is read-only".format(path=self.source.describe())
+        if notes is None:
+            notes = [""] * len(geoms)
+
+        with self.lock, File_Lock(self.lock_file_name):
+
+            #Another process may have changed the archive since we read it
+            self.read_metadata(have_lock=True)
+
+            names = [geom.name.upper() for geom in geoms]
+            assert len(set(names)) == len(names), "Molecules added together must have different names"
+            for name in names:
+                assert not name in self.index["names"], "A molecule called {name} already exists in the Molecule Archive".format(name=name)
+
+            #rows are appended after the last complete record, dropping anything left by a failed writer
+            records = []
+            offset = self.nrows
+            blocks = []
+            for geom, name, note in zip(geoms, names, notes):
+                xyz = np.asarray(geom.xyz, dtype=np.float64).reshape(-1, 3)
+                assert xyz.shape[0] == len(geom.atoms), "Molecule {name} has {n} atoms but {m} coordinates".format(name=name, n=len(geom.atoms), m=xyz.shape[0])
+                records.append({"name" : name,
+                                "formula" : hill_formula(geom.atoms),
+                                "hash" : geometry_hash(geom),
+                                "atoms" : [atom.upper() for atom in geom.atoms],
+                                "offset" : offset,
+                                "note" : note})
+                blocks.append(np.ascontiguousarray(xyz).tobytes())
+                offset += xyz.shape[0]
+
+            #coordinates first
+            with open(self.coords_file_name, "r+b") as f:
+                f.truncate(self.nrows * 24)
+                f.seek(self.nrows * 24)
+                for block in blocks:
+                    f.write(block)
+                f.flush()
+                os.fsync(f.fileno())
+
+            #then the records
+            with open(self.archive_file_name, "a", encoding='utf-8') as f:
+                for record in records:
+                    json.dump(record, f, sort_keys=True, ensure_ascii=False)
+                    f.write('\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+            self.read_metadata(have_lock=True)
+            self.coords = None
+
+    # Print a list of the molecules
+    def print_string(self):
+        s = "Molecules available on the archive\n"
+        for name in self.names():
+            record = self.record(name)
+            s += "{name: <20} {formula: <12} {note}\n".format(name=name, formula=record["formula"], note=record["note"])
+        return s
@@ -0,0 +1,395 @@
+# symmetry.py
+#
+# Contains the functions that find the point group of geometries, the atoms that are
+# unique by symmetry, and the totally symmetric displacements
+#
+# NOTES:
+# October 19, 2026 : created
+#
+
+# The point group of a geometry is found from its moment of inertia tensor and a search
+# for symmetry operations:
+#   1. the geometry is centered on its center of mass, and the principal moments classify
+#      it as an atom, a linear molecule, or an asymmetric, symmetric or spherical top
+#   2. candidate axes are collected. Every symmetry element of an asymmetric top lies
+#      along its principal axes, and every element of a symmetric top is parallel or
+#      perpendicular to its unique axis. Otherwise, each shell of equivalent atoms (same
+#      element, same distance from the center) is mapped onto itself, so a rotation axis
+#      goes through the first atom a of a shell, the midpoint of a and another atom, or
+#      the normal of the plane of a and two others (searched in the smallest shell only),
+#      and a mirror plane has all its atoms inside it (a principal plane) or exchanges
+#      two atoms of a shell (normal along their difference: every pair for shells of up
+#      to SMALL_SHELL atoms, the pairs with a otherwise)
+#   3. the rotations C2..C<MAX_ORDER> about every candidate axis, the reflections through
+#      every candidate plane and the inversion are applied to the geometry all at once,
+#      as one (K, 3, 3) stack of matrices, and an operation is kept if it moves every atom
+#      to within tol (Bohr) of a distinct atom of the same element. S2n about the proper
+#      axes are then tested the same way
+#   4. the Schoenflies symbol follows from the operations found, e.g. 'C2v', 'D3d', 'Td'
+#      (and 'Kh', 'Cinfv', 'Dinfh' for atoms and linear molecules)
+#
+# The orbits of the atoms under the operations found are the sets of symmetry equivalent
+# atoms, and their first atoms are the symmetry unique ones.
+#
+#   pg = point_group(geom)          #Point_Group, for a Geometry
+#   pgs = point_groups(batch)       #list of Point_Group, the inertia tensors of every
+#                                   # frame of a Geometry_Batch being found at once
+#   symmetric_coordinates(geom)     #(m, 3N) orthonormal totally symmetric displacements
+#
+# The gradient at a symmetric geometry is totally symmetric, so finite differences along
+# symmetric_coordinates() are enough to find it (see script_generator/displacement.py).
+#
+import numpy as np
+from superHEAT.archive_manager import geometry
+
+#Standard atomic weights
+ATOMIC_MASSES = {
+    'H'  :   1.008, 'HE' :   4.0026, 'LI' :   6.94, 'BE' :   9.0122, 'B'  :  10.81, 'C'  :  12.011,
+    'N'  :  14.007, 'O'  :  15.999, 'F'  :  18.998, 'NE' :  20.180, 'NA' :  22.990, 'MG' :  24.305,
+    'AL' :  26.982, 'SI' :  28.085, 'P'  :  30.974, 'S'  :  32.06, 'CL' :  35.45, 'AR' :  39.95,
+    'K'  :  39.098, 'CA' :  40.078, 'SC' :  44.956, 'TI' :  47.867, 'V'  :  50.942, 'CR' :  51.996,
+    'MN' :  54.938, 'FE' :  55.845, 'CO' :  58.933, 'NI' :  58.693, 'CU' :  63.546, 'ZN' :  65.38,
+    'GA' :  69.723, 'GE' :  72.630, 'AS' :  74.922, 'SE' :  78.971, 'BR' :  79.904, 'KR' :  83.798,
+    'RB' :  85.468, 'SR' :  87.62, 'Y'  :  88.906, 'ZR' :  91.224, 'NB' :  92.906, 'MO' :  95.95,
+    'TC' :  97.907, 'RU' : 101.07, 'RH' : 102.91, 'PD' : 106.42, 'AG' : 107.87, 'CD' : 112.41,
+    'IN' : 114.82, 'SN' : 118.71, 'SB' : 121.76, 'TE' : 127.60, 'I'  : 126.90, 'XE' : 131.29}
+
+#Default tolerance, in Bohr, of the distance between an atom moved by an operation and
+# its image
+SYMMETRY_TOL = 5.0e-2
+
+#Relative tolerance of equal principal moments of inertia. Too loose only costs time
+# (more candidate axes), too tight could miss symmetry
+MOMENT_TOL = 1.0e-2
+
+#Highest order of the proper rotations that are searched for
+MAX_ORDER = 8
+
+#Angle (radians) within which two axes are the same, or perpendicular
+AXIS_TOL = 0.05
+
+#Shells of up to this many atoms give every pair of their atoms as candidate axes
+SMALL_SHELL = 16
+
+#Candidate operations are first tested on about this many atoms, see _match()
+PREFILTER_ATOMS = 32
+
+#masses of a list of atom labels
+def masses_(atoms):
+    elements = [geometry.element_(atom) for atom in atoms]
+    for element in elements:
+        assert element in ATOMIC_MASSES, "ERROR : no mass for {atom}".format(atom=element)
+    return np.array([ATOMIC_MASSES[element] for element in elements])
+
+#centers of mass (..., 3), principal moments (..., 3, ascending) and principal axes
+# (..., 3, 3, as columns) of coordinates (..., n, 3)
+def inertia_(atoms, xyz):
+    xyz = np.asarray(xyz, dtype=np.float64)
+    m = masses_(atoms)
+    center = np.einsum('n,...na->...a', m, xyz) / m.sum()
+    X = xyz - center[..., None, :]
+    r2 = np.einsum('n,...na,...na->...', m, X, X)
+    I = r2[..., None, None] * np.eye(3) - np.einsum('n,...na,...nb->...ab', m, X, X)
+    moments, axes = np.linalg.eigh(I)
+    return center, moments, axes
+
+#rotations (..., 3, 3) by angle about the unit vectors u (..., 3)
+def rotation_(u, angle):
+    u = np.asarray(u, dtype=np.float64)
+    angle = np.asarray(angle, dtype=np.float64)[..., None, None]
+    cross = np.zeros(u.shape[:-1] + (3, 3))
+    cross[..., 0, 1], cross[..., 0, 2], cross[..., 1, 2] = -u[..., 2], u[..., 1], -u[..., 0]
+    cross = cross - np.swapaxes(cross, -1, -2)
+    outer = u[..., :, None] * u[..., None, :]
+    return np.cos(angle) * np.eye(3) + np.sin(angle) * cross + (1.0 - np.cos(angle)) * outer
+
+#reflections (..., 3, 3) through the planes of unit normals u (..., 3)
+def reflection_(u):
+    u = np.asarray(u, dtype=np.float64)
+    return np.eye(3) - 2.0 * u[..., :, None] * u[..., None, :]
+
+#unit vectors of the rows of v longer than tol, with the largest component positive, and
+# without repeats
+def _directions(v, tol):
+    v = np.asarray(v, dtype=np.float64).reshape(-1, 3)
+    norms = np.linalg.norm(v, axis=-1)
+    v = v[norms > tol] / norms[norms > tol, None]
+    v = v * np.sign(v[np.arange(len(v)), np.argmax(np.abs(v), axis=-1)])[:, None]
+    first = np.unique(np.round(v, 4), axis=0, return_index=True)[1]
+    return v[np.sort(first)]
+
+#groups of atoms of the same element at the same distance (within tol) from the center
+def _shells(X, codes, tol):
+    r = np.linalg.norm(X, axis=-1)
+    shells = []
+    for code in np.unique(codes):
+        group = np.nonzero(codes == code)[0]
+        group = group[np.argsort(r[group], kind='stable')]
+        breaks = np.nonzero(np.diff(r[group]) > tol)[0] + 1
+        shells += np.split(group, breaks)
+    return shells
+
+#candidate axes (rows) of the rotations and normals of the mirror planes of centered
+# coordinates X
+def _candidate_axes(X, codes, axes, top, unique_axis, tol):
+    if top == 'asymmetric':
+        return axes.T.copy()
+    dirs = [axes.T]
+    shells = [shell for shell in _shells(X, codes, tol) if np.linalg.norm(X[shell[0]]) > tol]
+    for shell in shells:
+        if len(shell) > SMALL_SHELL:
+            a, b = np.zeros(len(shell) - 1, dtype=np.intp), np.arange(1, len(shell))
+        else:
+            a, b = np.triu_indices(len(shell), k=1)
+        P, Q = X[shell[a]], X[shell[b]]
+        dirs += [X[shell[:1]], P + Q, P - Q]
+    shells = [shell for shell in shells if len(shell) >= 3]
+    if shells:
+        shell = min(shells, key=len)
+        b, c = np.triu_indices(len(shell) - 1, k=1)
+        first = X[shell[0]]
+        dirs.append(np.cross(X[shell[1:]][b] - first, X[shell[1:]][c] - first))
+    dirs = _directions(np.concatenate(dirs), tol)
+    if top == 'symmetric':
+        dots = np.abs(dirs @ unique_axis)
+        dirs = dirs[(dots > np.cos(AXIS_TOL)) | (dots < np.sin(AXIS_TOL))]
+    return dirs
+
+#whether each operation (K, 3, 3) maps the centered coordinates X (n, 3) onto themselves,
+# (K,) bool, and the (K, n) image of each atom under each operation. Images are matched
+# within each element, with a k-d tree for large elements when scipy is there, and the
+# operations are applied chunk operations at a time
+def match_operations_(X, codes, ops, tol, chunk=None):
+    X = np.asarray(X, dtype=np.float64)
+    ops = np.asarray(ops, dtype=np.float64).reshape(-1, 3, 3)
+    K, n = ops.shape[0], X.shape[0]
+    chunk = max(1, 2**20 // max(n, 1)) if chunk is None else chunk
+    if K > chunk:
+        parts = [match_operations_(X, codes, ops[start:start + chunk], tol, chunk) for start in range(0, K, chunk)]
+        return np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts])
+    images = np.einsum('kab,nb->kna', ops, X)
+    valid = np.ones(K, dtype=bool)
+    perms = np.zeros((K, n), dtype=np.intp)
+    for code in np.unique(codes):
+        group = np.nonzero(codes == code)[0]
+        g = len(group)
+        if geometry.cKDTree is not None and g > geometry.DENSE_ATOMS:
+            dist, idx = geometry.cKDTree(X[group]).query(images[:, group].reshape(-1, 3))
+            dist, idx = dist.reshape(K, g), idx.reshape(K, g)
+        else:
+            dist, idx = np.zeros((K, g)), np.zeros((K, g), dtype=np.intp)
+            chunk = max(1, 2**22 // (g * g))
+            for start in range(0, K, chunk):
+                d = np.linalg.norm(images[start:start + chunk, group][:, :, None, :] - X[group][None, None, :, :], axis=-1)
+                idx[start:start + chunk] = np.argmin(d, axis=-1)
+                dist[start:start + chunk] = np.min(d, axis=-1)
+        valid &= np.all(dist < tol, axis=-1) & np.all(np.sort(idx, axis=-1) == np.arange(g), axis=-1)
+        perms[:, group] = group[idx]
+    return valid, perms
+
+#match_operations_(), testing the operations first on the atoms of the smallest shells
+# (up to PREFILTER_ATOMS of them), which every symmetry operation maps onto themselves, so
+# that most candidates are rejected without moving every atom
+def _match(X, codes, ops, tol):
+    shells = sorted(_shells(X, codes, tol), key=len)
+    sizes = np.cumsum([len(shell) for shell in shells])
+    subset = np.concatenate(shells[:max(1, int(np.searchsorted(sizes, PREFILTER_ATOMS, side='right')))])
+    keep = np.arange(len(ops))
+    if len(subset) < X.shape[0]:
+        keep = np.nonzero(match_operations_(X[subset], codes[subset], ops, tol)[0])[0]
+    valid = np.zeros(len(ops), dtype=bool)
+    perms = np.zeros((len(ops), X.shape[0]), dtype=np.intp)
+    valid[keep], perms[keep] = match_operations_(X, codes, ops[keep], tol)
+    return valid, perms
+
+#---------------------------------------
+# Point_Group Class
+#
+# Datastructure:
+#   name       - Schoenflies symbol, e.g. 'C2v'
+#   center     - center of mass (3,), in Bohr
+#   operations - list of (label, R, perm) of the operations found (not the whole group, but
+#                enough to generate it): R is the (3,3) matrix about the center of mass, and
+#                atom i is moved onto atom perm[i]. Labels are 'C<n>', 'S<n>', 'sigma', 'i'
+#   orbits     - list of the arrays of symmetry equivalent atoms, in the order of their first atoms
+#
+class Point_Group:
+
+    def __init__(self, name, center, operations, orbits):
+        self.name = name
+        self.center = center
+        self.operations = operations
+        self.orbits = orbits
+
+    #Returns the first atom of each orbit
+    def unique_atoms(self):
+        return np.array([orbit[0] for orbit in self.orbits], dtype=np.intp)
+
+    #Returns the (natoms,) orbit of each atom
+    def orbit_of(self):
+        natoms = sum(len(orbit) for orbit in self.orbits)
+        out = np.zeros(natoms, dtype=np.intp)
+        for k, orbit in enumerate(self.orbits):
+            out[orbit] = k
+        return out
+
+    def print_string(self):
+        s = "Point group {name}\n".format(name=self.name)
+        for k, orbit in enumerate(self.orbits):
+            s += "  orbit {k: <4} atoms {atoms}\n".format(k=k + 1, atoms=" ".join(str(i + 1) for i in orbit))
+        return s
+
+#clusters of (nearly) parallel axes, as a list of (axis, members)
+def _cluster_axes(u):
+    clusters = []
+    for k in range(len(u)):
+        for axis, members in clusters:
+            if abs(np.dot(axis, u[k])) > np.cos(AXIS_TOL):
+                members.append(k)
+                break
+        else:
+            clusters.append((u[k], [k]))
+    return clusters
+
+#Schoenflies symbol from the operations found
+def _schoenflies(rotations, mirrors, improper, inversion):
+    #rotations : list of (axis, order) of distinct proper axes, mirrors : normals,
+    # improper : list of (axis, order)
+    def parallel(u, v):
+        return abs(np.dot(u, v)) > np.cos(AXIS_TOL)
+    def perpendicular(u, v):
+        return abs(np.dot(u, v)) < np.sin(AXIS_TOL)
+
+    if len(rotations) == 0:
+        return 'Cs' if len(mirrors) else 'Ci' if inversion else 'C1'
+
+    orders = [order for axis, order in rotations]
+    if sum(1 for order in orders if order % 3 == 0) >= 2:
+        if any(order % 5 == 0 for order in orders):
+            return 'Ih' if inversion else 'I'
+        if any(order % 4 == 0 for order in orders):
+            return 'Oh' if inversion else 'O'
+        return 'Th' if inversion else 'Td' if len(mirrors) else 'T'
+
+    #the main axis has the highest order, preferring an S2n axis, then a mirror perpendicular to it
+    n = max(orders)
+    def rank(axis):
+        return (any(parallel(axis, u) and m == 2*n for u, m in improper), any(parallel(axis, u) for u in mirrors))
+    main = max((axis for axis, order in rotations if order == n), key=rank)
+
+    sigma_h = any(parallel(main, u) for u in mirrors)
+    sigma_v = any(perpendicular(main, u) for u in mirrors)
+    if any(order % 2 == 0 and perpendicular(main, axis) for axis, order in rotations):
+        return 'D{n}h'.format(n=n) if sigma_h else 'D{n}d'.format(n=n) if sigma_v else 'D{n}'.format(n=n)
+    if sigma_h:
+        return 'C{n}h'.format(n=n)
+    if sigma_v:
+        return 'C{n}v'.format(n=n)
+    if any(parallel(main, u) and m == 2*n for u, m in improper):
+        return 'S{m}'.format(m=2*n)
+    return 'C{n}'.format(n=n)
+
+#Point_Group of one frame, from its center, principal moments and axes
+def _point_group(atoms, codes, xyz, center, moments, axes, tol):
+    n = len(atoms)
+    X = xyz - center
+    if n == 1:
+        return Point_Group('Kh', center, [], [np.arange(1)])
+
+    scale = moments[2]
+    operations = []
+    if moments[0] < MOMENT_TOL * scale:
+        #linear, every rotation about the axis leaves each atom in place
+        axis = axes[:, 0]
+        operations.append(('C2', rotation_(axis, np.pi), np.arange(n)))
+        valid, perms = match_operations_(X, codes, -np.eye(3)[None], tol)
+        name = 'Cinfv'
+        if valid[0]:
+            name = 'Dinfh'
+            operations.append(('i', -np.eye(3), perms[0]))
+    else:
+        deg01 = moments[1] - moments[0] < MOMENT_TOL * scale
+        deg12 = moments[2] - moments[1] < MOMENT_TOL * scale
+        top = 'spherical' if deg01 and deg12 else 'symmetric' if deg01 or deg12 else 'asymmetric'
+        unique_axis = axes[:, 2] if deg01 else axes[:, 0]
+        cands = _candidate_axes(X, codes, axes, top, unique_axis, tol)
+
+        #proper rotations, reflections and the inversion, all tested at once
+        orders = [2] if top == 'asymmetric' else list(range(2, MAX_ORDER + 1))
+        kinds = [('C', k, order) for k in range(len(cands)) for order in orders] + [('sigma', k, 1) for k in range(len(cands))] + [('i', -1, 1)]
+        ops = np.concatenate([rotation_(np.repeat(cands, len(orders), axis=0), np.tile(2.0 * np.pi / np.array(orders), len(cands))),
+                              reflection_(cands), -np.eye(3)[None]])
+        valid, perms = _match(X, codes, ops, tol)
+
+        best = {}
+        for (kind, k, order), ok, R, perm in zip(kinds, valid, ops, perms):
+            if not ok:
+                continue
+            if kind == 'C':
+                if order > best.get(k, (0, None, None))[0]:
+                    best[k] = (order, R, perm)
+            else:
+                operations.append((kind, R, perm))
+        mirrors = [cands[k] for (kind, k, order), ok in zip(kinds, valid) if ok and kind == 'sigma']
+        inversion = bool(valid[-1])
+
+        #one rotation per distinct axis, the highest order found on it
+        rot_axes = sorted(best.keys())
+        rotations = []
+        for axis, members in _cluster_axes(cands[rot_axes]):
+            k = max((rot_axes[m] for m in members), key=lambda k: best[k][0])
+            order, R, perm = best[k]
+            rotations.append((cands[k], order))
+            operations.append(('C{n}'.format(n=order), R, perm))
+
+        #improper rotations S2n about the proper axes
+        improper = []
+        if rotations:
+            u = np.array([axis for axis, order in rotations])
+            m = np.array([2 * order for axis, order in rotations])
+            S = reflection_(u) @ rotation_(u, 2.0 * np.pi / m)
+            ok_s, perms_s = _match(X, codes, S, tol)
+            for k in np.nonzero(ok_s)[0]:
+                improper.append((u[k], int(m[k])))
+                operations.append(('S{m}'.format(m=m[k]), S[k], perms_s[k]))
+
+        mirrors = [axis for axis, members in _cluster_axes(np.array(mirrors).reshape(-1, 3))]
+        name = _schoenflies(rotations, mirrors, improper, inversion)
+
+    pairs = [np.stack([np.arange(n), perm], axis=-1) for label, R, perm in operations]
+    labels = geometry.fragments_(np.concatenate(pairs) if pairs else np.zeros((0, 2), dtype=np.intp), n)
+    orbits = [np.nonzero(labels == k)[0] for k in range(labels.max() + 1)]
+    return Point_Group(name, center, operations, orbits)
+
+#Point_Group of every frame of a Geometry_Batch (or of a Geometry, or a list of Geometry)
+def point_groups(geoms, tol=SYMMETRY_TOL):
+    if isinstance(geoms, geometry.Geometry_Batch):
+        xyz, atoms = np.asarray(geoms.xyz, dtype=np.float64), geoms.atoms
+    elif isinstance(geoms, geometry.Geometry):
+        xyz, atoms = np.asarray(geoms.xyz, dtype=np.float64)[None, :, :], geoms.atoms
+    else:
+        batch = geometry.Geometry_Batch.from_geometries(list(geoms))
+        xyz, atoms = batch.xyz, batch.atoms
+    elements = [geometry.element_(atom) for atom in atoms]
+    codes = np.array([sorted(set(elements)).index(element) for element in elements], dtype=np.intp)
+    centers, moments, axes = inertia_(atoms, xyz)
+    return [_point_group(atoms, codes, xyz[f], centers[f], moments[f], axes[f], tol) for f in range(xyz.shape[0])]
+
+#Point_Group of a Geometry
+def point_group(geom, tol=SYMMETRY_TOL):
+    return point_groups(geom, tol)[0]
+
+#(m, 3N) orthonormal basis of the Cartesian displacements of a Geometry that are unchanged
+# by its symmetry operations (the totally symmetric ones), the null space of D(g) - 1 for
+# every operation g found
+def symmetric_coordinates(geom, tol=SYMMETRY_TOL):
+    n = len(geom.atoms)
+    pg = point_group(geom, tol)
+    A = np.zeros((3 * n, 3 * n))
+    for label, R, perm in pg.operations:
+        D = np.zeros((n, 3, n, 3))
+        D[perm, :, np.arange(n), :] = R
+        M = D.reshape(3 * n, 3 * n) - np.eye(3 * n)
+        A += M.T @ M
+    w, v = np.linalg.eigh(A)
+    return v[:, w < 1.0e-8].T
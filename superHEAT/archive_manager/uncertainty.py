@@ -0,0 +1,102 @@
+# uncertainty.py
+#
+# Contains the functions used to propagate the standard uncertainties of archived
+# constants through quantities derived from them
+#
+# NOTES:
+# October 19, 2026 : created
+#
+
+# A derived quantity is given as a function of the constants it uses, written with
+# NumPy operations so that it can be evaluated on arrays, e.g. the conversion of a
+# whole table of energies from Hartree to kJ/mol:
+#
+#   names = ["Eh (J)", "NA (mol-1)"]
+#   value, unc = propagate_constants(lambda Eh, NA: table * Eh * NA / 1000, cset, names)
+#
+# The uncertainty is propagated to first order (GUM, law of propagation of uncertainty):
+#
+#   u(f)^2 = J S J^T,   S_ij = u_i r_ij u_j
+#
+# where J is the Jacobian of f with respect to the constants, and r is their correlation
+# matrix (the identity, if none is given). The Jacobian is found by central differences,
+# and every displaced evaluation is done in one call of the function: each constant is
+# passed as an array over the 2n+1 displacements, with an extra leading axis, so the
+# function is evaluated for all displacements (and every entry of the table) at once.
+#
+# Constants without an uncertainty (exact, or not given) have a standard uncertainty of
+# zero. When only a relative uncertainty is given, u = rel_unc*|value| is used.
+#
+import numpy as np
+
+# Returns the values and standard uncertainties of the named constants, as float64
+# arrays, from a Constants_Set or a Compiled_Constants_Set
+def constants_values(cset, names):
+    if hasattr(cset, 'constants'):
+        consts = [cset.constants[name] for name in names]
+        nan = float('nan')
+        values   = np.array([c.value for c in consts], dtype=np.float64)
+        uncs     = np.array([c.unc if c.unc is not None else nan for c in consts], dtype=np.float64)
+        rel_uncs = np.array([c.rel_unc if c.rel_unc is not None else nan for c in consts], dtype=np.float64)
+        is_exact = np.array([bool(c.is_exact) for c in consts], dtype=np.bool_)
+    else:
+        idx = cset.indices(names)
+        values, uncs, rel_uncs, is_exact = cset.values[idx], cset.uncs[idx], cset.rel_uncs[idx], cset.is_exact[idx]
+
+    uncs = np.where(np.isnan(uncs), rel_uncs * np.abs(values), uncs)
+    uncs = np.where(np.isnan(uncs) | is_exact, 0.0, uncs)
+    return values, uncs
+
+# Propagates the standard uncertainties of values through func
+#
+# func     : function of len(values) arguments, written with NumPy operations
+# values   : values of the arguments
+# uncs     : standard uncertainties of the arguments
+# corr     : optional correlation matrix of the arguments
+# rel_step : central difference step, relative to the value of each argument
+# full     : also return the covariance matrix of the (flattened) outputs
+#
+# Returns (value, unc) arrays with the shape of func(*values), plus the covariance if full
+def propagate(func, values, uncs, corr=None, rel_step=1e-6, full=False):
+    values = np.asarray(values, dtype=np.float64)
+    uncs   = np.asarray(uncs, dtype=np.float64)
+    n = values.shape[0]
+    assert values.shape == (n,) and uncs.shape == (n,), "ERROR : values and uncs must be 1D arrays of the same length"
+    assert np.all(uncs >= 0), "ERROR : standard uncertainties must be positive"
+
+    if corr is None:
+        cov = np.diag(uncs**2)
+    else:
+        corr = np.asarray(corr, dtype=np.float64)
+        assert corr.shape == (n, n), "ERROR : correlation matrix must be {n}x{n}".format(n=n)
+        assert np.allclose(corr, corr.T) and np.allclose(np.diag(corr), 1.0), \
+                "ERROR : correlation matrix must be symmetric, with ones on the diagonal"
+        cov = uncs[:, None] * corr * uncs[None, :]
+
+    #displacements: row 0 is the reference, rows 1+2i and 2+2i displace argument i by -h and +h
+    step = rel_step * np.where(values != 0, np.abs(values), 1.0)
+    points = np.repeat(values[None, :], 2*n + 1, axis=0)
+    rows = np.arange(n)
+    points[1 + 2*rows, rows] -= step
+    points[2 + 2*rows, rows] += step
+
+    #evaluate every displacement at once, each argument gets a leading axis of length 2n+1
+    probe = func(*values)
+    shape = np.shape(probe)
+    args = [points[:, i].reshape((2*n + 1,) + (1,)*len(shape)) for i in range(n)]
+    results = np.broadcast_to(func(*args), (2*n + 1,) + shape).reshape(2*n + 1, -1)
+
+    value = results[0]
+    jac = (results[2::2] - results[1::2]) / (2 * step[:, None])
+    var = np.einsum('ik,ij,jk->k', jac, cov, jac)
+    unc = np.sqrt(np.maximum(var, 0.0))
+
+    if full:
+        return value.reshape(shape), unc.reshape(shape), jac.T @ cov @ jac
+    return value.reshape(shape), unc.reshape(shape)
+
+# Propagates the uncertainties of the named constants of a set through func, which
+# takes the constants as arguments in the order of names
+def propagate_constants(func, cset, names, corr=None, rel_step=1e-6, full=False):
+    values, uncs = constants_values(cset, names)
+    return propagate(func, values, uncs, corr=corr, rel_step=rel_step, full=full)
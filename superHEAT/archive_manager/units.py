@@ -0,0 +1,135 @@
+# units.py
+#
+# Contains the Unit_Converter class, which converts values between units using the
+# constants of an archived Constants_Set
+#
+# NOTES:
+# October 19, 2026 : created
+#
+
+# Unit_Converter
+#
+# Builds a graph of units from the names of the constants in a set. Two naming
+# conventions are used in the archive, and both give an edge of the graph:
+#
+#   "X to Y"  : 1 X = value * Y      e.g. "cm-1 to kcal/mol", "D to C m" (CFOUR_OLD)
+#   "X (Y)"   : 1 X = value * Y      e.g. "Eh (J)", "a0 (m)", "e (C)"     (CODATA-2022)
+#
+# Every edge can also be walked backwards, with the inverse factor. All other constants
+# (e.g. "mp/me", "H u") are not conversions and are ignored.
+#
+# The shortest conversion path (fewest steps) between every pair of connected units, and
+# its composite factor, are precomputed when the converter is built, so that converting
+# a whole NumPy array is a single multiplication:
+#
+#   conv = unit_converter(carc.load_constants_set("CFOUR_OLD"))
+#   conv.factor("Eh", "kJ/mol")                  -> float
+#   conv.convert(energies, "Eh", "kcal/mol")     -> np.ndarray
+#   conv.path("Eh", "kcal/mol")                  -> ["Eh to cm-1", "cm-1 to kcal/mol"]
+#
+# unit_converter() keeps one converter per set object, so the factors are cached per
+# (set, from, to). Sets loaded from a Constants_Archive are shared, read-only objects, so
+# every user of a set gets the same converter.
+#
+import re
+import weakref
+import collections
+import numpy as np
+
+_TO_PATTERN    = re.compile(r"^\s*(.+?)\s+to\s+(.+?)\s*$")
+_PAREN_PATTERN = re.compile(r"^\s*([^()]+?)\s*\(([^()]+)\)\s*$")
+
+# Returns (from, to) if the name of a constant describes a conversion, otherwise None
+def parse_conversion(name):
+    match = _TO_PATTERN.match(name)
+    if match is None:
+        match = _PAREN_PATTERN.match(name)
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+# Unit_Converter class
+#
+# set_name : name of the set the graph was built from
+# edges    : unit -> list of (unit, factor, constant name, inverse)
+# paths    : (from, to) -> (factor, list of steps), for every connected pair
+#
+class Unit_Converter:
+
+    def __init__(self, cset):
+        self.set_name = cset.set_name
+        self.edges = collections.defaultdict(list)
+
+        #Constants_Set or Compiled_Constants_Set
+        if hasattr(cset, 'constants'):
+            items = [(c.name, c.value) for c in cset.constants.values()]
+        else:
+            items = zip(cset.names, cset.values)
+
+        for name, value in items:
+            units = parse_conversion(name)
+            if units is None or value == 0:
+                continue
+            a, b = units
+            if a == b or any(edge[0] == b for edge in self.edges[a]):
+                continue
+            self.edges[a].append((b, float(value), name, False))
+            self.edges[b].append((a, 1.0 / float(value), name, True))
+
+        self.paths = {}
+        for unit in self.edges:
+            self.paths.update(self._shortest_paths(unit))
+
+    #breadth first search from one unit, returns {(start, unit) : (factor, steps)}
+    def _shortest_paths(self, start):
+        found = {start : (1.0, [])}
+        queue = collections.deque([start])
+        while queue:
+            unit = queue.popleft()
+            factor, steps = found[unit]
+            for other, edge_factor, name, inverse in self.edges[unit]:
+                if other not in found:
+                    found[other] = (factor * edge_factor, steps + [("1/" + name) if inverse else name])
+                    queue.append(other)
+        return {(start, unit) : path for unit, path in found.items()}
+
+    #all units known to this converter
+    def units(self):
+        return sorted(self.edges.keys())
+
+    #composite factor, such that 1 from_unit = factor * to_unit
+    def factor(self, from_unit, to_unit):
+        if from_unit == to_unit:
+            return 1.0
+        assert (from_unit, to_unit) in self.paths, \
+                "No conversion from {a} to {b} in the {name} constants set".format(a=from_unit, b=to_unit, name=self.set_name)
+        return self.paths[(from_unit, to_unit)][0]
+
+    #the constants used to convert, inverse steps are written "1/name"
+    def path(self, from_unit, to_unit):
+        self.factor(from_unit, to_unit)
+        return list(self.paths[(from_unit, to_unit)][1]) if from_unit != to_unit else []
+
+    #converts a value or an array of values
+    def convert(self, values, from_unit, to_unit):
+        return np.asarray(values, dtype=np.float64) * self.factor(from_unit, to_unit)
+
+
+#id(set) -> Unit_Converter, entries are dropped when the set is garbage collected
+# (Constants_Set defines __eq__, so sets are not hashable and cannot be weak keys)
+_CONVERTERS = {}
+
+# Returns the (cached) Unit_Converter of a constants set
+def unit_converter(cset):
+    key = id(cset)
+    try:
+        return _CONVERTERS[key]
+    except KeyError:
+        converter = Unit_Converter(cset)
+        _CONVERTERS[key] = converter
+        weakref.finalize(cset, _CONVERTERS.pop, key, None)
+        return converter
+
+# Converts a value or array of values between units, using the constants in cset
+def convert(values, from_unit, to_unit, cset):
+    return unit_converter(cset).convert(values, from_unit, to_unit)
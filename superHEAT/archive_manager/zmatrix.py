@@ -0,0 +1,196 @@
+# zmatrix.py
+#
+# Contains the functions that convert between Cartesian geometries and Z-matrices (internal
+# coordinates), for single geometries or batches of them
+#
+# NOTES:
+# October 19, 2026 : created
+#
+
+# A Z-matrix is given by the atoms, an (n,3) array of reference atoms (refs), and the
+# internal coordinates of each atom i, which has
+#   a bond length  r[i] to atom refs[i,0]                        (i >= 1)
+#   an angle       a[i] i-refs[i,0]-refs[i,1]                    (i >= 2)
+#   a dihedral     d[i] i-refs[i,0]-refs[i,1]-refs[i,2], signed  (i >= 3)
+# Unused references are -1, and unused coordinates are 0. Indices start at 0 here, and
+# at 1 in the text of a Z-matrix. Internally, lengths are in Bohr and angles in radians.
+#
+# The coordinate arrays have shape (..., n), so every conversion works on a batch of
+# frames at once:
+#   zmatrix_refs_(xyz)                 : references chosen from the first frame
+#   cartesian_to_zmatrix_(xyz, refs)   : (r, a, d), each (..., n)
+#   zmatrix_to_cartesian_(refs, r, a, d) : xyz (..., n, 3), in the standard orientation of
+#                                          a Z-matrix (atom 1 at the origin, atom 2 on z,
+#                                          atom 3 in the xz plane)
+#
+# The text of a Z-matrix in the CFOUR format (with variables R<i>, A<i>, D<i>, in Angstrom
+# and degrees by default) is written by zmatrix_lines() and zmatrix_blocks(), and read by
+# parse_zmatrix(), e.g.
+#
+#   C
+#   H 1 R2
+#   H 1 R3 2 A3
+#   H 1 R4 2 A4 3 D4
+#
+#   R2 = 1.089000
+#   ...
+#
+import re
+import numpy as np
+from superHEAT.archive_manager import geometry
+
+UNITS = {"angstrom" : 1.0 / geometry.BOHR_PER_ANGSTROM, "bohr" : 1.0}
+
+#unit vectors along the last axis, replacing null vectors by any vector perpendicular to ref
+def _unit(v, ref):
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    small = norm[..., 0] < 1e-10
+    if np.any(small):
+        trial = np.cross(ref, [1.0, 0.0, 0.0])
+        trial = np.where(np.linalg.norm(trial, axis=-1, keepdims=True) < 1e-6, np.cross(ref, [0.0, 1.0, 0.0]), trial)
+        v = np.where(small[..., None], trial, v)
+        norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / norm
+
+#reference atoms (n,3) of a Z-matrix, from the first frame of xyz (..., n, 3). Each atom
+# is bonded to its nearest earlier atom, and the angle and dihedral use the atoms nearest
+# to that one, avoiding (nearly) linear dihedral references when possible
+def zmatrix_refs_(xyz):
+    xyz = np.asarray(xyz, dtype=np.float64).reshape(-1, *np.shape(xyz)[-2:])[0]
+    n = xyz.shape[0]
+    dmat = geometry.distance_matrix_(xyz)
+    refs = np.full((n, 3), -1, dtype=np.intp)
+    for i in range(1, n):
+        a = int(np.argmin(dmat[i, :i]))
+        refs[i, 0] = a
+        if i < 2:
+            continue
+        others = [j for j in np.argsort(dmat[a, :i]) if j != a]
+        b = int(others[0])
+        refs[i, 1] = b
+        if i < 3:
+            continue
+        candidates = [int(j) for j in np.argsort(dmat[b, :i]) if j != a and j != b]
+        c = candidates[0]
+        for j in candidates:
+            if np.sin(geometry.angle_(xyz[j] - xyz[b], xyz[a] - xyz[b])) > 1e-3:
+                c = j
+                break
+        refs[i, 2] = c
+    return refs
+
+#internal coordinates (r, a, d), each (..., n), of the frames xyz (..., n, 3)
+def cartesian_to_zmatrix_(xyz, refs):
+    xyz = np.asarray(xyz, dtype=np.float64)
+    refs = np.asarray(refs, dtype=np.intp)
+    n = xyz.shape[-2]
+    shape = xyz.shape[:-2] + (n,)
+    r, a, d = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    atoms = np.arange(n)
+    if n > 1:
+        r[..., 1:] = geometry.distances_(xyz, np.stack([atoms[1:], refs[1:, 0]], axis=-1))
+    if n > 2:
+        a[..., 2:] = geometry.angles_(xyz, np.stack([atoms[2:], refs[2:, 0], refs[2:, 1]], axis=-1))
+    if n > 3:
+        d[..., 3:] = geometry.dihedrals_(xyz, np.stack([atoms[3:], refs[3:, 0], refs[3:, 1], refs[3:, 2]], axis=-1), signed=True)
+    return r, a, d
+
+#Cartesian coordinates (..., n, 3) of the internal coordinates r, a, d (each (..., n)),
+# placing each atom from its references (natural extension reference frame), for every
+# frame at once
+def zmatrix_to_cartesian_(refs, r, a, d):
+    refs = np.asarray(refs, dtype=np.intp)
+    r = np.asarray(r, dtype=np.float64)
+    a = np.asarray(a, dtype=np.float64)
+    d = np.asarray(d, dtype=np.float64)
+    n = refs.shape[0]
+    xyz = np.zeros(r.shape + (3,))
+    if n > 1:
+        xyz[..., 1, 2] = r[..., 1]
+    if n > 2:
+        #atom 3 in the xz plane, at angle a from the bond to its reference
+        A, B = xyz[..., refs[2, 0], :], xyz[..., refs[2, 1], :]
+        u = _unit(B - A, np.array([0.0, 0.0, 1.0]))
+        perp = _unit(np.cross(u, [0.0, 1.0, 0.0]), u)
+        xyz[..., 2, :] = A + r[..., 2, None] * (np.cos(a[..., 2, None]) * u + np.sin(a[..., 2, None]) * perp)
+    for i in range(3, n):
+        A, B, C = xyz[..., refs[i, 0], :], xyz[..., refs[i, 1], :], xyz[..., refs[i, 2], :]
+        bc = _unit(A - B, np.array([0.0, 0.0, 1.0]))
+        normal = _unit(np.cross(B - C, bc), bc)
+        m = np.cross(normal, bc)
+        ri, ai, di = r[..., i, None], a[..., i, None], d[..., i, None]
+        xyz[..., i, :] = A + ri * (-np.cos(ai) * bc + np.sin(ai) * np.cos(di) * m + np.sin(ai) * np.sin(di) * normal)
+    return xyz
+
+#Lines of a Z-matrix (without a title), for one frame of internal coordinates, in the
+# units given for the lengths ('angstrom' or 'bohr') and degrees
+def zmatrix_lines(atoms, refs, r, a, d, units="angstrom", decimals=8):
+    scale = UNITS[units.lower()]
+    lines = []
+    variables = []
+    for i, atom in enumerate(atoms):
+        line = atom
+        if i >= 1:
+            line += " {a} R{i}".format(a=refs[i, 0] + 1, i=i + 1)
+            variables.append("R{i} = {v:.{p}f}".format(i=i + 1, v=r[i] * scale, p=decimals))
+        if i >= 2:
+            line += " {b} A{i}".format(b=refs[i, 1] + 1, i=i + 1)
+            variables.append("A{i} = {v:.{p}f}".format(i=i + 1, v=np.degrees(a[i]), p=decimals))
+        if i >= 3:
+            line += " {c} D{i}".format(c=refs[i, 2] + 1, i=i + 1)
+            variables.append("D{i} = {v:.{p}f}".format(i=i + 1, v=np.degrees(d[i]), p=decimals))
+        lines.append(line)
+    return lines + [""] + variables
+
+#Z-matrix lines of every frame of a Geometry or Geometry_Batch, the internal coordinates
+# of all frames being computed at once. Returns a list (one per frame) of lists of lines
+def zmatrix_blocks(geoms, refs=None, units="angstrom", decimals=8):
+    xyz = np.asarray(geoms.xyz, dtype=np.float64)
+    if xyz.ndim == 2:
+        xyz = xyz[None, :, :]
+    if refs is None:
+        refs = zmatrix_refs_(xyz)
+    r, a, d = cartesian_to_zmatrix_(xyz, refs)
+    return [zmatrix_lines(geoms.atoms, refs, r[k], a[k], d[k], units, decimals) for k in range(xyz.shape[0])]
+
+#Reads the lines of a Z-matrix (atoms, then a blank line and the variables, if any).
+# Returns (atoms, refs, r, a, d) in Bohr and radians. Values may be given directly in
+# the atom lines, or as variables
+def parse_zmatrix(lines, units="angstrom"):
+    scale = 1.0 / UNITS[units.lower()]
+    atom_lines, variables = [], {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        match = re.match(r"^(\S+)\s*=\s*(\S+)$", line)
+        if match is not None:
+            variables[match.group(1)] = float(match.group(2))
+        else:
+            atom_lines.append(line.split())
+
+    def value(token):
+        sign = -1.0 if token.startswith('-') else 1.0
+        token = token.lstrip('+-')
+        if token in variables:
+            return sign * variables[token]
+        return sign * float(token)
+
+    n = len(atom_lines)
+    atoms = [fields[0] for fields in atom_lines]
+    refs = np.full((n, 3), -1, dtype=np.intp)
+    r, a, d = np.zeros(n), np.zeros(n), np.zeros(n)
+    for i, fields in enumerate(atom_lines):
+        assert len(fields) == 1 + 2*min(i, 3), "ERROR : Z-matrix line {i} has the wrong number of fields : {line}".format(i=i + 1, line=" ".join(fields))
+        if i >= 1:
+            refs[i, 0], r[i] = int(fields[1]) - 1, value(fields[2]) * scale
+        if i >= 2:
+            refs[i, 1], a[i] = int(fields[3]) - 1, np.radians(value(fields[4]))
+        if i >= 3:
+            refs[i, 2], d[i] = int(fields[5]) - 1, np.radians(value(fields[6]))
+    return atoms, refs, r, a, d
+
+#Geometry of the lines of a Z-matrix
+def zmatrix_to_geometry(lines, name=None, units="angstrom"):
+    atoms, refs, r, a, d = parse_zmatrix(lines, units)
+    return geometry.Geometry(name=name, atoms=atoms, xyz=zmatrix_to_cartesian_(refs, r, a, d))
@@ -2,9 +2,12 @@
 
 from superHEAT.script_generator.basis import *
 from superHEAT.script_generator.calc import * 
+from superHEAT.script_generator.displacement import * 
 from superHEAT.script_generator.job import * 
 from superHEAT.script_generator.option import * 
+from superHEAT.script_generator.profiler import *
 from superHEAT.script_generator.recipe import * 
 from superHEAT.script_generator.runscript import * 
+from superHEAT.script_generator.scan import * 
 from superHEAT.script_generator.utility import * 
 from superHEAT.script_generator.zmat import * 
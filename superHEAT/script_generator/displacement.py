@@ -0,0 +1,195 @@
+#*************************************************************
+#
+# displacement.py
+#	October 19, 2026:
+#	- created
+#	- gradients along the totally symmetric coordinates only
+#	- the Zmat of each job is deep copied once, by its Job
+#
+# Defines the Displacements class, which generates the jobs of the
+# displaced geometries used to find gradients and Hessians by finite
+# differences of energies, and reassembles them from the energies
+#
+#*************************************************************
+
+import sys
+import copy
+import json
+import numpy as np
+from superHEAT.archive_manager import geometry
+from superHEAT.archive_manager import zmatrix
+from superHEAT.archive_manager import symmetry
+from superHEAT.script_generator.job import Joblist
+from superHEAT.script_generator.option import RUN_OPTIONS
+
+#*************************************************************
+# Displacements class
+#
+# Displaces a Geometry (in Bohr) by +-step along each of m coordinates,
+# the rows of an (m, 3N) array (the 3N Cartesian coordinates by default,
+# or e.g. orthonormal symmetry coordinates). With order=1 (gradients):
+#   2m points,        g_i  = (E(+i) - E(-i)) / 2h
+# With order=2 (Hessians, and gradients):
+#   1 + 2m^2 points,  H_ii = (E(+i) + E(-i) - 2E(0)) / h^2
+#                     H_ij = (E(+i+j) - E(+i-j) - E(-i+j) + E(-i-j)) / 4h^2
+#
+# Every displaced geometry is built in a single vectorized step. Points
+# whose geometries are the same up to translation, rotation, reflection
+# and permutation of atoms (same fingerprint, see geometry.fingerprints_,
+# with the tight tolerance dedup_tol) have the same energy, so only one
+# job is made for each. This removes the symmetry-equivalent displacements
+# of a symmetric geometry (and is conservative: a geometry that is only
+# nearly symmetric keeps all its jobs).
+#
+# The gradient at a symmetric geometry is totally symmetric, so with
+# symmetric=True (order 1 only) the geometry is displaced only along its
+# totally symmetric coordinates (symmetry.symmetric_coordinates, with the
+# operations found within symmetry_tol Bohr), e.g. 6 points instead of
+# 18 for water, and gradient(cartesian=True) is still the full gradient.
+#
+#   disp = Displacements(geom, step=0.005, order=2)
+#   disp.generate('water', zmat, run, zopts)
+#   H = disp.hessian(energies, cartesian=True)
+#
+# generate() writes the zmat.NNNN and run.NNNN files of the jobs, and
+# displacements.json, the reassembly map from the jobs to the points.
+# gradient() and hessian() take the energies of the jobs (in job order)
+# and return the derivatives along the coordinates, or in Cartesians.
+#
+# Member variables:
+#       geom            : the reference Geometry
+#       step            : the step h, in Bohr
+#       order           : 1 or 2
+#       coords          : (m, 3N) displacement coordinates
+#       labels          : names of the coordinates, e.g. 'x1', 'z3'
+#       disps           : (npoints, m) integer coefficients of each point (-1, 0, 1)
+#       xyz             : (npoints, N, 3) displaced geometries
+#       jobs            : point index of the representative of each job
+#       job_of          : (npoints,) job index of each point
+#
+class Displacements:
+
+    def __init__(self, geom, step=0.005, order=1, coords=None, dedup_tol=1.0e-7, symmetric=False, symmetry_tol=1.0e-4):
+        if order not in (1, 2):
+            print("ERROR : finite difference order must be 1 or 2, not", order)
+            sys.exit(1)
+        if symmetric and order != 1:
+            print("ERROR : only gradients (order 1) can use the totally symmetric coordinates alone")
+            sys.exit(1)
+        if symmetric:
+            coords = symmetry.symmetric_coordinates(geom, tol=symmetry_tol)
+        self.geom = geom
+        self.step = step
+        self.order = order
+        natoms = len(geom.atoms)
+        if coords is None:
+            self.coords = np.eye(3 * natoms)
+            self.labels = [axis + str(atom + 1) for atom in range(natoms) for axis in "xyz"]
+        else:
+            self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3 * natoms)
+            self.labels = ["q" + str(i + 1) for i in range(self.coords.shape[0])]
+        m = self.coords.shape[0]
+
+        #the coefficients of every point
+        eye = np.eye(m, dtype=np.int64)
+        if order == 1:
+            self.disps = np.concatenate([eye, -eye])
+        else:
+            i, j = np.triu_indices(m, k=1)
+            pairs = []
+            for si, sj in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+                block = np.zeros((len(i), m), dtype=np.int64)
+                block[np.arange(len(i)), i] = si
+                block[np.arange(len(i)), j] = sj
+                pairs.append(block)
+            self.disps = np.concatenate([np.zeros((1, m), dtype=np.int64), eye, -eye] + pairs)
+
+        #all displaced geometries at once
+        ref = np.asarray(geom.xyz, dtype=np.float64)
+        self.xyz = ref[None, :, :] + step * (self.disps @ self.coords).reshape(-1, natoms, 3)
+
+        #one job per distinct geometry, in the order the points first appear
+        prints = geometry.fingerprints_(geom.atoms, self.xyz, tol=dedup_tol)
+        first = {}
+        self.job_of = np.empty(len(prints), dtype=np.intp)
+        self.jobs = []
+        for p, key in enumerate(prints):
+            if key not in first:
+                first[key] = len(self.jobs)
+                self.jobs.append(p)
+            self.job_of[p] = first[key]
+
+    #number of points, and of jobs
+    def npoints(self):
+        return self.disps.shape[0]
+
+    def njobs(self):
+        return len(self.jobs)
+
+    #name of a point, e.g. '+x1-z2', or 'reference'
+    def point_name(self, p):
+        name = "".join(("+" if c > 0 else "-") + self.labels[i] for i, c in enumerate(self.disps[p]) if c != 0)
+        return name if name else "reference"
+
+    #the reassembly map, as a dictionary that can be saved as json
+    def reassembly(self):
+        return {"order"  : self.order,
+                "step"   : self.step,
+                "labels" : self.labels,
+                "coords" : self.coords.tolist(),
+                "jobs"   : [int(p) + 1 for p in self.jobs],
+                "points" : [{"point" : p + 1, "name" : self.point_name(p), "job" : int(self.job_of[p]) + 1}
+                            for p in range(self.npoints())]}
+
+    #energies of every point, from the energies of the jobs
+    def point_energies(self, energies):
+        energies = np.asarray(energies, dtype=np.float64)
+        assert energies.shape == (self.njobs(),), "ERROR : expected {n} energies, one per job".format(n=self.njobs())
+        return energies[self.job_of]
+
+    #gradient along the coordinates (m,), or in Cartesians (N, 3)
+    def gradient(self, energies, cartesian=False):
+        E = self.point_energies(energies)
+        m = self.coords.shape[0]
+        g = (E[1:1 + m] - E[1 + m:1 + 2*m]) if self.order == 2 else (E[:m] - E[m:2*m])
+        g = g / (2.0 * self.step)
+        return (g @ self.coords).reshape(-1, 3) if cartesian else g
+
+    #Hessian along the coordinates (m, m), or in Cartesians (3N, 3N)
+    def hessian(self, energies, cartesian=False):
+        if self.order != 2:
+            print("ERROR : a Hessian needs displacements of order 2")
+            sys.exit(1)
+        E = self.point_energies(energies)
+        m = self.coords.shape[0]
+        h2 = self.step**2
+        H = np.diag((E[1:1 + m] + E[1 + m:1 + 2*m] - 2.0 * E[0]) / h2)
+        i, j = np.triu_indices(m, k=1)
+        npair = len(i)
+        pp, pm, mp, mm = (E[1 + 2*m + k*npair:1 + 2*m + (k + 1)*npair] for k in range(4))
+        H[i, j] = H[j, i] = (pp - pm - mp + mm) / (4.0 * h2)
+        return self.coords.T @ H @ self.coords if cartesian else H
+
+    #returns the Joblist of the displaced geometries, one job per distinct geometry,
+    # with the ZMAT geometry block set to each (a Z-matrix sharing the references of
+    # the reference geometry), and the options (e.g. calc and basis) in zmat_options
+    def make_joblist(self, molecule, zmat, run, zmat_options, run_options=None):
+        run_options = RUN_OPTIONS if run_options is None else run_options
+        joblist = Joblist(molecule=molecule, zmat=zmat, run=run)
+        refs = zmatrix.zmatrix_refs_(self.geom.xyz)
+        r, a, d = zmatrix.cartesian_to_zmatrix_(self.xyz[self.jobs], refs)
+        for k, p in enumerate(self.jobs):
+            #set_geometry() replaces the lines of the Zmat rather than editing them, so a
+            # shallow copy leaves the template alone; the Job makes the one deep copy
+            job_zmat = copy.copy(zmat)
+            job_zmat.set_geometry(block=zmatrix.zmatrix_lines(self.geom.atoms, refs, r[k], a[k], d[k], decimals=10))
+            ropts = copy.deepcopy(run_options)
+            ropts.set('jobname', molecule + "_disp" + str(k + 1).zfill(4))
+            joblist.append(name=self.point_name(p), zmat_options=zmat_options, run_options=ropts, zmat=job_zmat)
+        return joblist
+
+    #writes the jobs (zmat.NNNN, run.NNNN, joblist.txt) and displacements.json to the current directory
+    def generate(self, molecule, zmat, run, zmat_options, run_options=None):
+        self.make_joblist(molecule, zmat, run, zmat_options, run_options).generate()
+        with open('displacements.json', 'w') as f:
+            json.dump(self.reassembly(), f, indent=1)
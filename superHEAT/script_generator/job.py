@@ -3,6 +3,8 @@
 #
 #	JHT, July 9, 2023, Dallas, TX
 #		- created
+#	October 19, 2026
+#		- jobs can be given their own ZMAT (e.g. displaced geometries)
 #
 # Defines the Job and Joblist classes
 #
@@ -13,10 +15,12 @@
 #	A list of jobs to be generated
 #*************************************************************
 import sys
+import os
 import copy
 from superHEAT.script_generator.zmat import *
 from superHEAT.script_generator.runscript import *
 from superHEAT.script_generator.option import *
+from superHEAT.script_generator.profiler import PROFILER
 
 #*************************************************************
 # Job class
@@ -38,12 +42,13 @@ from superHEAT.script_generator.option import *
 class Job:
 
     def __init__(self, num, name, zmat, zmat_options, run, run_options):
-        self.num            = copy.deepcopy(num)
-        self.name           = copy.deepcopy(name)
-        self.zmat           = copy.deepcopy(zmat) 
-        self.zmat_options   = copy.deepcopy(zmat_options)
-        self.run            = copy.deepcopy(run)
-        self.run_options    = copy.deepcopy(run_options)
+        with PROFILER.timer('construct', job=num):
+            self.num            = copy.deepcopy(num)
+            self.name           = copy.deepcopy(name)
+            self.zmat           = copy.deepcopy(zmat) 
+            self.zmat_options   = copy.deepcopy(zmat_options)
+            self.run            = copy.deepcopy(run)
+            self.run_options    = copy.deepcopy(run_options)
         self.zmat_name      = "zmat." + str(num).zfill(4)
         self.run_name       = "run."  + str(num).zfill(4)
 
@@ -55,11 +60,17 @@ class Job:
 
     #generate the run.xxx and zmat.xxx files
     def generate(self):
-        self.run_options.set('jobid', str(self.num).zfill(4))
-        self.zmat.set_options(self.zmat_options)
-        self.zmat.to_file(self.zmat_name)
-        self.run.set_options(self.run_options)
-        self.run.to_file(self.run_name)
+        with PROFILER.timer('render', job=self.num):
+            self.run_options.set('jobid', str(self.num).zfill(4))
+            self.zmat.set_options(self.zmat_options)
+            self.run.set_options(self.run_options)
+        with PROFILER.timer('write', job=self.num):
+            self.zmat.to_file(self.zmat_name)
+            self.run.to_file(self.run_name)
+        if PROFILER.enabled:
+            PROFILER.count('jobs_rendered')
+            PROFILER.count('files_written', 2)
+            PROFILER.count('bytes_written', os.path.getsize(self.zmat_name) + os.path.getsize(self.run_name))
 
 #*************************************************************
 # Joblist
@@ -97,11 +108,11 @@ class Joblist:
             job.generate()
 
 
-    #appends a new job with some set of options 
-    def append(self, name, zmat_options, run_options):
+    #appends a new job with some set of options, and optionally its own ZMAT
+    def append(self, name, zmat_options, run_options, zmat=None):
         self.jobs.append(Job( len(self.jobs)+1,
                                         name,
-                                   self.zmat,
+           self.zmat if zmat is None else zmat,
                                 zmat_options,
                                     self.run,
                                  run_options
@@ -114,11 +125,14 @@ class Joblist:
 
     #generate the jobs
     def generate(self):
-        f = open('joblist.txt', 'w')
-        idx = 1
-        for job in self.jobs:
-            job.generate()
-            f.write(str(idx).zfill(4) +  "  " +  job.name + "\n")
-            idx = idx + 1
-        f.close() 
+        with PROFILER.timer('generate'):
+            f = open('joblist.txt', 'w')
+            idx = 1
+            for job in self.jobs:
+                job.generate()
+                f.write(str(idx).zfill(4) +  "  " +  job.name + "\n")
+                idx = idx + 1
+            f.close() 
+        if PROFILER.enabled:
+            PROFILER.print_summary()
 
@@ -0,0 +1,144 @@
+#*************************************************************
+# profiler.py
+#
+#	October 19, 2026
+#		- created
+#
+# Defines the Profiler class and the global PROFILER object, used
+# to find out where the time in generating a joblist is spent
+#
+# Profiler:
+#	Accumulates wall time per phase (job construction, option
+#	resolution, rendering, and file I/O) and simple counters
+#	(jobs rendered, files and bytes written)
+#
+# PROFILER:
+#	A global Profiler object used by the script generator. It is
+#	switched off by default, and can be switched on with
+#		SUPERHEAT_PROFILE=1
+#	in the environment, or by calling PROFILER.enable() in a script.
+#	If SUPERHEAT_PROFILE_LOG=<file> is also set (or a log file is
+#	passed to enable), every timed event is appended to that file
+#	as newline delimited json
+#
+#*************************************************************
+
+import os
+import sys
+import time
+import json
+import contextlib
+
+#*************************************************************
+# Profiler class
+#
+# Member variables:
+#	enabled		- if False, timer() and count() do nothing
+#	log_file	- path of the JSONL event log, or None
+#	totals		- total seconds spent in each phase
+#	calls		- number of times each phase was timed
+#	counters	- dictionary of named counters
+#
+class Profiler:
+
+    def __init__(self, enabled=False, log_file=None):
+        self.enabled  = False
+        self.log_file = None
+        self.log      = None
+        self.reset()
+        if enabled:
+            self.enable(log_file)
+
+    #start collecting timings
+    def enable(self, log_file=None):
+        self.enabled = True
+        if log_file is not None:
+            self.log_file = log_file
+
+    #stop collecting timings and close the event log
+    def disable(self):
+        self.enabled = False
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    #forget everything collected so far
+    def reset(self):
+        self.totals   = {}
+        self.calls    = {}
+        self.counters = {}
+        self.start    = time.perf_counter()
+
+    #context manager that times the enclosed block as some phase. When the
+    # profiler is off this returns a shared do-nothing context
+    def timer(self, phase, **info):
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(phase, info)
+
+    @contextlib.contextmanager
+    def _timer(self, phase, info):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            self.totals[phase] = self.totals.get(phase, 0.0) + dt
+            self.calls[phase]  = self.calls.get(phase, 0) + 1
+            if self.log_file is not None:
+                event = {'phase' : phase, 'start' : t0 - self.start, 'duration' : dt}
+                event.update(info)
+                self.write_event(event)
+
+    #increment a counter
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    #append one event to the JSONL log
+    def write_event(self, event):
+        if self.log is None:
+            self.log = open(self.log_file, "a", encoding="utf-8")
+        json.dump(event, self.log, sort_keys=True)
+        self.log.write('\n')
+
+    #returns the summary table as a string
+    def summary_string(self):
+        elapsed = time.perf_counter() - self.start
+        s  = "Profile of script generation ({t:.3f} s elapsed)\n".format(t=elapsed)
+        s += '{phase: <16} {calls: >10} {total: >12} {mean: >12} {frac: >8}\n'.format(
+                phase='Phase', calls='Calls', total='Total (s)', mean='Mean (ms)', frac='%')
+        for phase in sorted(self.totals, key=self.totals.get, reverse=True):
+            total = self.totals[phase]
+            calls = self.calls[phase]
+            s += '{phase: <16} {calls: >10d} {total: >12.4f} {mean: >12.4f} {frac: >8.1f}\n'.format(
+                    phase=phase, calls=calls, total=total, mean=1000.0*total/calls,
+                    frac=100.0*total/elapsed if elapsed > 0 else 0.0)
+        for name, value in sorted(self.counters.items()):
+            s += '{name: <16} {value: >10d}\n'.format(name=name, value=value)
+        if 'bytes_written' in self.counters and 'write' in self.totals and self.totals['write'] > 0:
+            s += 'Write rate       {rate: >10.2f} MB/s\n'.format(
+                    rate=self.counters['bytes_written'] / self.totals['write'] / 1.0e6)
+        return s
+
+    #print the summary table, and flush the event log
+    def print_summary(self, file=sys.stdout):
+        print(self.summary_string(), file=file)
+        if self.log is not None:
+            self.log.flush()
+
+    #returns the collected data as a dictionary
+    def to_dict(self):
+        return {'totals' : dict(self.totals),
+                'calls' : dict(self.calls),
+                'counters' : dict(self.counters)}
+
+_NULL_TIMER = contextlib.nullcontext()
+
+#*************************************************************
+# PROFILER
+#
+# Global profiler used by the script generator, configured from the environment
+#
+PROFILER = Profiler(enabled  = os.environ.get('SUPERHEAT_PROFILE', '0') not in ('', '0'),
+                    log_file = os.environ.get('SUPERHEAT_PROFILE_LOG'))
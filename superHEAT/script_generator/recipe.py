@@ -4,52 +4,255 @@
 #	JHT, July 9, 2023, Dallas, TX
 #		- created
 #
-# Defines the Job, Recipe classes
+#	October 19, 2026
+#		- declarative recipe files, compiled plans cached on disk
+#		- the cache key includes the registries, naming rules are checked
 #
-# Job
-#	- this defines a job, which is a combination of options
+# Defines the Recipe class
 #
 # Recipe
-#	- a collection of jobs
+#	- a collection of jobs, read from a declarative recipe file
+#	  (JSON, or TOML if tomllib is available) instead of being
+#	  built imperatively in a copy of template.py
+#
+# Recipe file format (JSON shown, TOML uses the same keys):
+#
+#	{
+#	  "name"         : "my_recipe",
+#	  "zmat_options" : {"newnorm" : "ON"},
+#	  "run_options"  : {"xcfour" : "xcfour"},
+#	  "jobs" : [
+#	    {"calc"         : "scf",
+#	     "basis"        : ["TZ", "QZ"],
+#	     "name"         : "SCF/{basis.proper_name}",
+#	     "jobname"      : "{molecule}_scf_{basis.short_name}"},
+#	    {"calc"         : ["T", "pT"],
+#	     "basis"        : "TZ",
+#	     "zmat_options" : {"frzcore" : "ON"},
+#	     "name"         : "fc-{calc.proper_name}/{basis.proper_name}",
+#	     "jobname"      : "{molecule}_{calc.short_name}_{basis.short_name}"}
+#	  ]
+#	}
+#
+# Each entry in "jobs" is expanded over every combination of the
+# listed calcs and bases (short names from CALCS and BASIS). Either
+# may be left out, in which case the 'calc' and 'basis' ZMAT options
+# must be given explicitly in "zmat_options". The "name" and "jobname"
+# naming rules are python format strings, with the fields
+#	calc, basis	- the Calc and Basis_Set objects of the job
+#	molecule	- the molecule name, filled in when the joblist is made
+#
+# Compiling a recipe expands and validates every job once. The compiled
+# plan is cached on disk, keyed by the hash of the recipe file and of the
+# registries it is validated against (CALCS, BASIS and the option names),
+# so that repeated --joblist and generate calls skip the compilation
+# entirely, while a change to a registry compiles the recipe again.
 #
 #*************************************************************
 
 import sys
+import os
+import copy
+import json
+import string
+import hashlib
 from superHEAT.script_generator.job import *
+from superHEAT.script_generator.calc import CALCS
+from superHEAT.script_generator.basis import BASIS
+from superHEAT.script_generator.utility import set_calc, set_basis
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+# Bump this whenever the layout of a compiled plan changes, so that
+# stale cache files are never reused
+RECIPE_PLAN_VERSION = 1
 
 #*************************************************************
 # Recipe class
 #
+# Member variables:
+#	file		- path to the recipe file
+#	hash		- sha256 of the recipe file (plan version and registries)
+#	cache_dir	- directory holding the compiled plans
+#	name		- name of the recipe
+#	plan		- list of compiled job entries, each a dictionary with
+#			  name, calc, basis, zmat_options and run_options
+#
 class Recipe:
-    
-    def __init__(self, file): 
+
+    def __init__(self, file, cache_dir=None):
         self.file = file
-        self.jobs = []
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(file)), ".recipe_cache")
+        self.cache_dir = cache_dir
 
         #read the recipe from file
-        print("Reading recipe from ", self.file) 
-        f = open(file, "r")
-        self.all_lines = f.readlines()
-        f.close() 
+        with open(file, "rb") as f:
+            raw = f.read()
+        self.hash = hashlib.sha256(raw + str(RECIPE_PLAN_VERSION).encode() + _registry_fingerprint()).hexdigest()
+
+        #reuse the compiled plan if we have seen this exact recipe before
+        cached = self.load_plan()
+        if cached is not None:
+            self.name = cached['name']
+            self.plan = cached['plan']
+        else:
+            print("Compiling recipe from ", self.file)
+            self.compile(self.parse(raw))
+            self.save_plan()
+
+    #file holding the compiled plan for this recipe
+    def plan_file(self):
+        return os.path.join(self.cache_dir, self.hash + ".json")
+
+    #parse the raw recipe bytes, as TOML or JSON depending on the extension
+    def parse(self, raw):
+        if self.file.lower().endswith(".toml"):
+            if tomllib is None:
+                print("Reading TOML recipes requires python 3.11 or later, use JSON instead")
+                sys.exit(1)
+            return tomllib.loads(raw.decode("utf-8"))
+        return json.loads(raw.decode("utf-8"))
+
+    #expand and validate every job in the recipe
+    def compile(self, recipe):
+        self.name = recipe.get('name', os.path.basename(self.file))
+        self.plan = []
+
+        zmat_defaults = _check_options(recipe.get('zmat_options', {}), ZMAT_OPTIONS, self.file)
+        run_defaults  = _check_options(recipe.get('run_options', {}), RUN_OPTIONS, self.file)
+
+        for entry in recipe.get('jobs', []):
+            zopts = dict(zmat_defaults)
+            zopts.update(_check_options(entry.get('zmat_options', {}), ZMAT_OPTIONS, self.file))
+            ropts = dict(run_defaults)
+            ropts.update(_check_options(entry.get('run_options', {}), RUN_OPTIONS, self.file))
 
-        #add unique jobs based on the lines in the file 
-        for line in self.all_lines:
+            calcs = [_lookup(CALCS, c, 'calc', self.file) for c in _as_list(entry.get('calc'))]
+            bases = [_lookup(BASIS, b, 'basis', self.file) for b in _as_list(entry.get('basis'))]
 
-            njob = Job(line)
+            for calc in calcs:
+                for basis in bases:
+                    fields = {'calc' : calc, 'basis' : basis, 'molecule' : '{molecule}'}
+                    job_ropts = dict(ropts)
+                    if 'jobname' in entry:
+                        job_ropts['jobname'] = _format(entry['jobname'], fields, self.file)
 
-            found = False
-            for job in self.jobs:
-                if (njob == job):
-                    found = True
-                    break 
-            if (not found): 
-                self.jobs.add(njob)
+                    self.plan.append({'name'         : _format(entry.get('name', ''), fields, self.file),
+                                      'calc'         : calc.short_name if calc is not None else None,
+                                      'basis'        : basis.short_name if basis is not None else None,
+                                      'zmat_options' : zopts,
+                                      'run_options'  : job_ropts})
 
+    #returns the cached plan, or None if it does not exist
+    def load_plan(self):
+        try:
+            with open(self.plan_file(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    #write the compiled plan to the cache. Written to a temporary file first so
+    # that a concurrent reader never sees half a plan
+    def save_plan(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = self.plan_file() + "." + str(os.getpid()) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({'name' : self.name, 'plan' : self.plan}, f, sort_keys=True)
+            os.replace(tmp, self.plan_file())
+        except OSError as error:
+            print("WARNING : could not cache compiled recipe :", error)
+
+    #construct the Joblist for some molecule from the compiled plan
+    def make_joblist(self, molecule=None, zmat=None, run=None):
+        molecule = "" if molecule is None else molecule
+        joblist = Joblist(molecule=molecule, zmat=zmat, run=run)
+
+        zmat_options = copy.deepcopy(ZMAT_OPTIONS)
+        if (zmat != None):
+            zmat_options.set('ref', zmat.get_ref().strip())
+
+        for entry in self.plan:
+            zopts = copy.deepcopy(zmat_options)
+            ropts = copy.deepcopy(RUN_OPTIONS)
+
+            #the reference decides CC_PROG, so it must be set before the calc
+            if 'ref' in entry['zmat_options']:
+                zopts.set('ref', entry['zmat_options']['ref'])
+            if entry['calc'] is not None:
+                set_calc(CALCS.get(entry['calc']), zopts)
+            if entry['basis'] is not None:
+                set_basis(BASIS.get(entry['basis']), zopts)
+            for name, value in entry['zmat_options'].items():
+                zopts.set(name, value)
+            for name, value in entry['run_options'].items():
+                ropts.set(name, value.replace('{molecule}', molecule))
+            joblist.append(name=entry['name'].replace('{molecule}', molecule), zmat_options=zopts, run_options=ropts)
+
+        return joblist
 
     #print all jobs
     def print(self):
-        print("There are ", len(self.jobs), " jobs")
-        idx = 0
-        for job in self.jobs:
-            print("Job #", job, job.print()) 
- 
+        print("There are ", len(self.plan), " jobs in recipe", self.name)
+        for idx, entry in enumerate(self.plan):
+            print(str(idx+1).zfill(4), entry['name'])
+
+#*************************************************************
+# Helper functions for compiling recipes
+#
+
+#wraps a single value (or nothing) into a list
+def _as_list(value):
+    if value is None:
+        return [None]
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+#finds a short name in CALCS or BASIS, exiting with a useful message if it is missing
+def _lookup(registry, short_name, kind, file):
+    if short_name is None:
+        return None
+    if short_name not in registry.dict:
+        print("Recipe", file, "uses unknown", kind, short_name)
+        sys.exit(1)
+    return registry.get(short_name)
+
+#fingerprint of the registries a plan is validated against, so that a cached plan is
+# not reused once a calc or basis is renamed or changed, or an option is removed
+def _registry_fingerprint():
+    registries = {'calcs'        : {name : vars(calc) for name, calc in CALCS.dict.items()},
+                  'basis'        : {name : vars(basis) for name, basis in BASIS.dict.items()},
+                  'zmat_options' : sorted(ZMAT_OPTIONS.dict),
+                  'run_options'  : sorted(RUN_OPTIONS.dict)}
+    return json.dumps(registries, sort_keys=True, default=str).encode()
+
+#fills in a naming rule, exiting with a useful message if it uses a field the job does
+# not have (e.g. {calc.proper_name} in an entry without a calc)
+def _format(template, fields, file):
+    try:
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            if field is None:
+                continue
+            root = field.split('.')[0].split('[')[0]
+            if fields.get(root) is None:
+                print("Recipe", file, "naming rule", template, "uses", "{" + field + "}", "but the job has no", root)
+                sys.exit(1)
+        return template.format(**fields)
+    except (AttributeError, IndexError, KeyError, ValueError) as error:
+        print("Recipe", file, "has an invalid naming rule", template, ":", error)
+        sys.exit(1)
+
+#checks that every option in a recipe exists, and returns them as strings
+def _check_options(options, known, file):
+    checked = {}
+    for name, value in options.items():
+        if name not in known.dict:
+            print("Recipe", file, "sets unknown option", name)
+            sys.exit(1)
+        checked[name] = str(value)
+    return checked
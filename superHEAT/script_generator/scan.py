@@ -0,0 +1,155 @@
+#*************************************************************
+#
+# scan.py
+#	October 19, 2026:
+#	- created
+#	- clash checks of large molecules use neighbor lists
+#	- batches also yield their Cartesian geometries, built once
+#
+# Defines the Scan class, which generates the jobs of a scan of the
+# potential energy surface over internal coordinates of a Geometry
+#
+#*************************************************************
+
+import sys
+import os
+import copy
+import itertools
+import numpy as np
+from superHEAT.archive_manager import geometry
+from superHEAT.archive_manager import zmatrix
+
+#*************************************************************
+# Scan class
+#
+# Scans one or more internal coordinates of the Z-matrix of a Geometry
+# over a grid. The coordinates are named like the variables of the
+# Z-matrix written by zmatrix.zmatrix_lines() (R<i>, A<i>, D<i>, with
+# atoms numbered from 1), and their values are in Angstrom and degrees:
+#
+#   scan = Scan(geom, {'R2' : np.linspace(1.0, 1.4, 5), 'D4' : np.arange(0, 360, 30)})
+#   scan.generate(make_joblist, zmat, run, molecule='ch3')
+#
+# The grid is the product of the values of each coordinate, and is only
+# ever enumerated lazily, batch_size points at a time. The geometries of
+# a batch are built together (zmatrix.zmatrix_to_cartesian_), and points
+# where two atoms are closer than contact_scale times the sum of their
+# covalent radii are pruned as unphysical (found with neighbor lists for
+# molecules of more than geometry.DENSE_ATOMS atoms).
+#
+# generate() writes each remaining point to its own directory, point.NNNN
+# (NNNN counts every grid point, so pruned points leave gaps), with the
+# ZMAT geometry block set to the point, and the Joblist returned by the
+# usual make_joblist(molecule, zmat, run) generated inside it. scan.txt
+# lists every point, its coordinates, and whether it was pruned.
+#
+# Member variables:
+#       geom            : the Geometry (in Bohr) being scanned
+#       refs            : reference atoms of the Z-matrix, see zmatrix.py
+#       names           : names of the scanned coordinates
+#       values          : list of the arrays of values of each coordinate
+#       contact_scale   : fraction of the sum of covalent radii below which a contact is unphysical
+#
+class Scan:
+
+    def __init__(self, geom, coords, refs=None, contact_scale=0.5):
+        self.geom = geom
+        self.refs = zmatrix.zmatrix_refs_(geom.xyz) if refs is None else np.asarray(refs, dtype=np.intp)
+        self.names = list(coords.keys())
+        self.values = [np.atleast_1d(np.asarray(coords[name], dtype=np.float64)) for name in self.names]
+        self.contact_scale = contact_scale
+        self.radii = geometry.covalent_radii_(geom.atoms)
+        self.base = zmatrix.cartesian_to_zmatrix_(geom.xyz, self.refs)
+
+        #(kind, atom) of each coordinate, kind 0, 1, 2 for R, A, D
+        self.targets = []
+        natoms = len(geom.atoms)
+        for name in self.names:
+            kind = "RAD".find(name[:1].upper())
+            try:
+                atom = int(name[1:]) - 1
+            except ValueError:
+                atom = -1
+            if kind < 0 or atom < kind + 1 or atom >= natoms:
+                print("ERROR : cannot scan", name, "in a Z-matrix of", natoms, "atoms")
+                sys.exit(1)
+            self.targets.append((kind, atom))
+
+    #number of grid points
+    def __len__(self):
+        return int(np.prod([len(values) for values in self.values]))
+
+    #lazily enumerates the grid, yielding the value indices of each point
+    def points(self):
+        return itertools.product(*[range(len(values)) for values in self.values])
+
+    #yields (numbers, coords, internals, xyz, keep) for each batch of points, where
+    #   numbers   : (k,) numbers of the points in the grid, from 1
+    #   coords    : (k, ncoords) values of the scanned coordinates
+    #   internals : (r, a, d) of the points, each (k, natoms), in Bohr and radians
+    #   xyz       : (k, natoms, 3) Cartesian geometries of the points, in Bohr
+    #   keep      : (k,) bool, False for points with unphysical contacts
+    def batches(self, batch_size=1024):
+        points = self.points()
+        start = 0
+        while True:
+            idx = np.array(list(itertools.islice(points, batch_size)), dtype=np.intp).reshape(-1, len(self.values))
+            if idx.shape[0] == 0:
+                return
+            k = idx.shape[0]
+            coords = np.stack([self.values[c][idx[:, c]] for c in range(len(self.values))], axis=-1)
+
+            internals = [np.repeat(column[None, :], k, axis=0) for column in self.base]
+            for c, (kind, atom) in enumerate(self.targets):
+                internals[kind][:, atom] = coords[:, c] / zmatrix.UNITS["angstrom"] if kind == 0 else np.radians(coords[:, c])
+
+            xyz = zmatrix.zmatrix_to_cartesian_(self.refs, *internals)
+            keep = self.physical(xyz)
+            yield np.arange(start + 1, start + k + 1), coords, internals, xyz, keep
+            start += k
+
+    #(k,) bool, True for frames xyz (k, n, 3) without unphysical contacts. Small molecules
+    # are checked with the distance matrices of the whole batch, large ones with a neighbor
+    # list per frame
+    def physical(self, xyz):
+        if xyz.shape[-2] > geometry.DENSE_ATOMS:
+            return np.array([len(geometry.contact_pairs_(frame, self.radii, self.contact_scale)) == 0 for frame in xyz], dtype=bool)
+        dmat = geometry.distance_matrix_(xyz)
+        limit = self.contact_scale * (self.radii[:, None] + self.radii[None, :])
+        np.fill_diagonal(limit, 0.0)
+        return ~np.any(dmat < limit[None, :, :], axis=(-2, -1))
+
+    #yields (number, Geometry) for each point that is kept
+    def geometries(self, batch_size=1024):
+        for numbers, coords, internals, xyz, keep in self.batches(batch_size):
+            for p in np.nonzero(keep)[0]:
+                yield int(numbers[p]), geometry.Geometry(name=self.geom.name, atoms=list(self.geom.atoms), xyz=xyz[p])
+
+    #generates the jobs of every point that is kept, in directory/point.NNNN,
+    # returns the numbers of the points generated
+    def generate(self, make_joblist, zmat, run, molecule, directory='.', batch_size=1024):
+        os.makedirs(directory, exist_ok=True)
+        generated = []
+        cwd = os.getcwd()
+        with open(os.path.join(directory, 'scan.txt'), 'w') as f:
+            f.write("point  " + "  ".join("{name: >14}".format(name=name) for name in self.names) + "  status\n")
+            for numbers, coords, internals, xyz, keep in self.batches(batch_size):
+                for p in range(len(numbers)):
+                    num = str(numbers[p]).zfill(4)
+                    f.write(num + "   " + "  ".join("{v: >14.6f}".format(v=v) for v in coords[p]) +
+                            ("  generated\n" if keep[p] else "  pruned\n"))
+                    if not keep[p]:
+                        continue
+
+                    point_zmat = copy.deepcopy(zmat)
+                    point_zmat.set_geometry(block=zmatrix.zmatrix_lines(self.geom.atoms, self.refs,
+                                            internals[0][p], internals[1][p], internals[2][p]))
+                    path = os.path.join(directory, "point." + num)
+                    os.makedirs(path, exist_ok=True)
+                    os.chdir(path)
+                    try:
+                        make_joblist(molecule=molecule + "_" + num, zmat=point_zmat, run=run).generate()
+                    finally:
+                        os.chdir(cwd)
+                    generated.append(int(numbers[p]))
+        return generated
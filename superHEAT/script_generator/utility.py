@@ -18,6 +18,7 @@
 
 import copy
 import sys
+from superHEAT.script_generator.profiler import PROFILER
 
 #*************************************************************
 # set_calc
@@ -26,29 +27,30 @@ import sys
 # zopts		- Options object, copied from ZMAT_OPTIONS in option.py
 #
 def set_calc(calc, zopts):
-    
-    #set the calculation name
-    zopts.set('calc', calc.ZMAT_name)
+    with PROFILER.timer('options'):
+
+        #set the calculation name
+        zopts.set('calc', calc.ZMAT_name)
 
   
-    #set CC_PROG
-    ref = zopts.get('ref').strip().lower()
-    if ('RHF'.lower() == ref):
-        zopts.set('ccprog', calc.rhf_cc)
-    elif ('UHF'.lower() == ref):
-        zopts.set('ccprog', calc.uhf_cc)
-    elif ('ROHF'.lower() == ref): 
-        zopts.set('ccprog', calc.rohf_cc)
-    else:
-        print("set_calc did not recognize the reference type")
-        sys.exit(1)
+        #set CC_PROG
+        ref = zopts.get('ref').strip().lower()
+        if ('RHF'.lower() == ref):
+            zopts.set('ccprog', calc.rhf_cc)
+        elif ('UHF'.lower() == ref):
+            zopts.set('ccprog', calc.uhf_cc)
+        elif ('ROHF'.lower() == ref): 
+            zopts.set('ccprog', calc.rohf_cc)
+        else:
+            print("set_calc did not recognize the reference type")
+            sys.exit(1)
 
-    #Set ABCD to AOBASIS if possible
-    if (                 3 > calc.nbody    or
-          'CCSD(T)' == calc.proper_name    or
-        'CCSD(T)_L' == calc.proper_name    
-       ):
-        zopts.set('abcd', 'AOBASIS')
+        #Set ABCD to AOBASIS if possible
+        if (                 3 > calc.nbody    or
+              'CCSD(T)' == calc.proper_name    or
+            'CCSD(T)_L' == calc.proper_name    
+           ):
+            zopts.set('abcd', 'AOBASIS')
 
 #*************************************************************
 # set_basis
@@ -60,5 +62,6 @@ def set_calc(calc, zopts):
 # zopts		= Options object, copied from ZMAT_OPTIONS in option.py
 #
 def set_basis(basis, zopts):
-    zopts.set('basis',basis.GENBAS_name)
+    with PROFILER.timer('options'):
+        zopts.set('basis',basis.GENBAS_name)
 
@@ -3,6 +3,9 @@
 # zmat.py
 #	JHT, July 9, 2023, Dallas, TX:
 #	- created
+#	October 19, 2026:
+#	- geometry blocks can be set from (and read into) archived Geometry objects
+#	- set_geometry() rebuilds the special basis lines (BASIS=SPECIAL) for the new atoms
 #
 # Defines the Zmat class, which contains information and routines used
 # to process and create new ZMATs depending on the options used. 
@@ -10,12 +13,26 @@
 #*************************************************************
 
 import sys
+from collections import Counter
+from superHEAT.archive_manager import zmatrix
 
 #*************************************************************
 # ZMAT class
 # 
 # This contains all the lines of the user-supplied ZMAT
 #
+# The geometry block is everything between the title (the first line) and the 
+# options section (*CFOUR...). set_geometry() replaces it with the Z-matrix of a
+# Geometry, and get_geometry() reads it back into a Geometry. Lengths are written 
+# in Angstrom by default; use units='bohr' together with UNITS=BOHR in the options.
+# To render thousands of molecules, compute their blocks at once with
+# zmatrix.zmatrix_blocks(batch) and pass each one as block=
+#
+# With BASIS=SPECIAL, the options are followed by one LABEL:BASIS line per atom.
+# set_geometry() rebuilds these lines for the atoms of the new geometry: an atom whose
+# label has a line in the ZMAT keeps its basis (e.g. H:HYY), and the others take the 
+# basis of the remaining lines (e.g. YYY, from the ATOM1:YYY ATOM2:YYY of the templates)
+#
 class Zmat:
     #initialize from file
     def __init__(self, file):
@@ -61,6 +78,61 @@ class Zmat:
                 f.write(line)
         f.close()
 
+    #index of the first line of the options section
+    def options_start(self):
+        for idx, line in enumerate(self.all_lines):
+            if any(line.lstrip().upper().startswith(opt) for opt in self.opt_start_strs):
+                return idx
+        print("ERROR : no options section (", ", ".join(self.opt_start_strs), ") found in ZMAT")
+        sys.exit(1)
+
+    #index of the first line after the options section (the line closing *CFOUR(...))
+    def options_end(self):
+        for idx in range(self.options_start(), len(self.all_lines)):
+            if ')' in self.all_lines[idx]:
+                return idx + 1
+        print("ERROR : the options section of the ZMAT is not closed by ')'")
+        sys.exit(1)
+
+    #indices (start, end) of the special basis lines (LABEL:BASIS) after the options,
+    # start == end if there are none
+    def special_basis(self):
+        start = self.options_end()
+        while start < len(self.all_lines) and not self.all_lines[start].strip():
+            start += 1
+        end = start
+        while end < len(self.all_lines) and ':' in self.all_lines[end] and self.all_lines[end].strip():
+            end += 1
+        return start, end
+
+    #replace the geometry block with the Z-matrix of a Geometry (in Bohr), or with the 
+    # lines of a block from zmatrix.zmatrix_blocks(), and the special basis lines (if
+    # any) with one line for each of its atoms
+    def set_geometry(self, geom=None, refs=None, units="angstrom", block=None):
+        if block is None:
+            block = zmatrix.zmatrix_blocks(geom, refs=refs, units=units)[0]
+        end = self.options_start()
+        self.all_lines = self.all_lines[:1] + [line + '\n' for line in block] + ['\n'] + self.all_lines[end:]
+
+        start, end = self.special_basis()
+        if start == end:
+            return
+        #dummy atoms have no basis
+        atom_lines = block[:block.index("")] if "" in block else block
+        labels = [line.split()[0] for line in atom_lines if line.split()[0].upper() != 'X']
+        old = [line.strip().split(':', 1) for line in self.all_lines[start:end]]
+        basis = {label.upper() : value for label, value in old}
+        new = set(label.upper() for label in labels)
+        unmatched = [value for label, value in old if label.upper() not in new]
+        default = Counter(unmatched if unmatched else [value for label, value in old]).most_common(1)[0][0]
+        self.all_lines = self.all_lines[:start] + \
+                         [label + ':' + basis.get(label.upper(), default) + '\n' for label in labels] + \
+                         self.all_lines[end:]
+
+    #returns the Geometry (in Bohr) of the Z-matrix in the geometry block
+    def get_geometry(self, name=None, units="angstrom"):
+        return zmatrix.zmatrix_to_geometry(self.all_lines[1:self.options_start()], name=name, units=units)
+
     #returns the reference supplied in the file, or 'UHF' if none is found
     def get_ref(self):
         ref = 'UHF'
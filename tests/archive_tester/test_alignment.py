@@ -0,0 +1,48 @@
+from superHEAT.archive_manager.geometry import *
+from superHEAT.archive_manager.alignment import *
+import numpy as np
+
+#random proper rotation
+def rotation(rng):
+    q, r = np.linalg.qr(rng.normal(size=(3, 3)))
+    q = q * np.sign(np.diag(r))
+    return q if np.linalg.det(q) > 0 else -q
+
+def test_kabsch():
+    rng = np.random.default_rng(7)
+    ref = rng.normal(size=(6, 3))
+    rots = np.stack([rotation(rng) for k in range(10)])
+    moved = ref[None, :, :] @ np.swapaxes(rots, -1, -2) + rng.normal(size=(10, 1, 3))
+
+    assert np.allclose(rmsd_(moved, ref), 0.0, atol=1e-7)
+    assert np.allclose(align_(moved, ref), ref, atol=1e-7)
+    assert np.allclose(kabsch_(moved, ref) @ rots, np.eye(3), atol=1e-7)
+
+    #matches the RMSD of the aligned coordinates
+    noisy = moved + 0.05 * rng.normal(size=moved.shape)
+    direct = np.sqrt(np.mean(np.sum((align_(noisy, ref) - ref)**2, axis=-1), axis=-1))
+    assert np.allclose(rmsd_(noisy, ref), direct)
+
+    #mirror images are not superimposed
+    assert rmsd_(ref * [1, 1, -1], ref) > 1e-3
+
+    matrix = rmsd_matrix_(noisy, chunk=7)
+    assert matrix.shape == (10, 10) and np.allclose(matrix, matrix.T) and np.allclose(np.diag(matrix), 0.0)
+    assert np.isclose(matrix[2, 5], rmsd_(noisy[2], noisy[5]))
+
+def test_permuted_rmsd():
+    rng = np.random.default_rng(3)
+    ethane = Geometry('ethane', ['C', 'C', 'H', 'H', 'H', 'H', 'H', 'H'], 
+                      [[0, 0, 0], [2.9, 0, 0], [-0.7, 1.7, 0.5], [-0.7, -1.2, 1.3], [-0.7, -0.5, -1.7], [3.6, 1.7, 0.5], [3.6, -1.2, 1.3], [3.6, -0.5, -1.7]])
+    perm = [5, 0, 2, 7, 1, 3, 6, 4]
+    frames = []
+    for k in range(4):
+        frames.append(Geometry('frame', [ethane.atoms[p] for p in perm], (ethane.xyz @ rotation(rng).T + k)[perm]))
+
+    assert np.allclose(rmsd(ethane, frames, permute=True), 0.0, atol=1e-6)
+    aligned = align(ethane, frames, permute=True)
+    assert aligned.atoms == ethane.atoms and np.allclose(aligned.xyz, ethane.xyz[None], atol=1e-6)
+
+    batch = Geometry_Batch('batch', ethane.atoms, np.stack([ethane.xyz, ethane.xyz + 1.0, ethane.xyz * 1.1]))
+    assert np.allclose(rmsd(ethane, batch)[:2], 0.0, atol=1e-7) and rmsd(ethane, batch)[2] > 0.1
+    assert rmsd_matrix(batch).shape == (3, 3)
@@ -0,0 +1,99 @@
+from superHEAT.archive_manager.archive_pack import *
+from superHEAT.archive_manager import archive_pack
+import tempfile
+import zipfile
+import time
+import os
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+def test_archive_pack():
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "archive")
+        zip_path = os.path.join(tmp, "archive.zip")
+        write(os.path.join(src, "constants", "constarc.json"), "meta\n")
+        write(os.path.join(src, "constants", "A.json"), "set a\n")
+        write(os.path.join(src, "constants", ".lock"), "")
+
+        #first pack writes everything but local state, and repacking changes nothing
+        assert pack_archive(src, zip_path, verbose=False)
+        with open(zip_path, "rb") as f:
+            first = f.read()
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.namelist() == ["constants/A.json", "constants/constarc.json", MANIFEST_NAME]
+        assert not pack_archive(src, zip_path, verbose=False)
+
+        #the same content always gives the same zip
+        os.remove(zip_path)
+        os.remove(os.path.join(src, MANIFEST_NAME))
+        time.sleep(0.01)
+        os.utime(os.path.join(src, "constants", "A.json"))
+        assert pack_archive(src, zip_path, verbose=False)
+        with open(zip_path, "rb") as f:
+            assert f.read() == first
+
+        #unpacking only extracts what changed
+        dst = os.path.join(tmp, "extracted")
+        assert unpack_archive(zip_path, dst, verbose=False) == ["constants/A.json", "constants/constarc.json"]
+        assert unpack_archive(zip_path, dst, verbose=False) == []
+
+        write(os.path.join(src, "constants", "A.json"), "set a, changed\n")
+        os.remove(os.path.join(src, "constants", "constarc.json"))
+        assert pack_archive(src, zip_path, verbose=False)
+        assert unpack_archive(zip_path, dst, verbose=False) == ["constants/A.json"]
+        assert not os.path.exists(os.path.join(dst, "constants", "constarc.json"))
+        with open(os.path.join(dst, "constants", "A.json")) as f:
+            assert f.read() == "set a, changed\n"
+
+        #unchanged members are copied compressed, and give the same zip as packing from scratch
+        write(os.path.join(src, "constants", "B.json"), "set b\n" * 100)
+        assert pack_archive(src, zip_path, verbose=False)
+        with open(zip_path, "rb") as f:
+            incremental = f.read()
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.testzip() is None
+            assert zf.read("constants/A.json") == b"set a, changed\n"
+        os.remove(zip_path)
+        os.remove(os.path.join(src, MANIFEST_NAME))
+        assert pack_archive(src, zip_path, verbose=False)
+        with open(zip_path, "rb") as f:
+            assert f.read() == incremental
+
+        #without the zipfile internals, members are copied through the public API, to the same zip
+        with open(os.path.join(src, MANIFEST_NAME), "rb") as f:
+            manifest = f.read()
+        write(os.path.join(src, "constants", "C.json"), "set c\n")
+        assert pack_archive(src, zip_path, verbose=False)
+        with open(zip_path, "rb") as f:
+            raw = f.read()
+        with open(zip_path, "wb") as f:
+            f.write(incremental)
+        with open(os.path.join(src, MANIFEST_NAME), "wb") as f:
+            f.write(manifest)
+        supported = archive_pack.raw_copy_supported
+        archive_pack.raw_copy_supported = lambda dst: False
+        try:
+            assert pack_archive(src, zip_path, verbose=False)
+        finally:
+            archive_pack.raw_copy_supported = supported
+        with open(zip_path, "rb") as f:
+            assert f.read() == raw
+
+def test_unpack_unsafe_members():
+    with tempfile.TemporaryDirectory() as tmp:
+        zip_path = os.path.join(tmp, "archive.zip")
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            zf.writestr("constants/A.json", "set a\n")
+            zf.writestr("../escaped.txt", "outside\n")
+            zf.writestr("constants/../../escaped.txt", "outside\n")
+            zf.writestr("/absolute.txt", "outside\n")
+            zf.writestr("C:escaped.txt", "outside\n")
+
+        dst = os.path.join(tmp, "work", "extracted")
+        assert unpack_archive(zip_path, dst, verbose=False) == ["constants/A.json"]
+        assert sorted(os.listdir(os.path.join(tmp, "work"))) == ["extracted"]
+        assert not os.path.exists(os.path.join(tmp, "escaped.txt"))
+        assert sorted(os.listdir(dst)) == [MANIFEST_NAME, "constants"]
@@ -0,0 +1,57 @@
+from superHEAT.archive_manager.columnar import *
+from superHEAT.archive_manager.constarc import *
+from superHEAT.archive_manager.constants import *
+import tempfile
+import os
+import numpy as np
+
+def test_columnar_table():
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "table")
+        write_columns(directory, {"energy" : np.linspace(0.0, 1.0, 5), "label" : ["a", "b", "c", "d", "e"], "ok" : [True]*5}, source=[1, 2])
+        assert open_columns(directory, source=[1, 3]) is None
+
+        table = open_columns(directory, source=[1, 2])
+        assert len(table) == 5 and sorted(table.columns()) == ["energy", "label", "ok"]
+        assert table.kinds == {"energy" : "numeric", "label" : "string", "ok" : "numeric"}
+        assert isinstance(table["energy"], np.memmap) and not table["energy"].flags.writeable
+        assert np.array_equal(table["energy"], np.linspace(0.0, 1.0, 5))
+        assert table["label"][2] == "c" and table["ok"].dtype == np.bool_
+
+        try:
+            write_columns(directory, {"x" : [1.0, 2.0], "y" : [1.0]})
+        except AssertionError:
+            pass
+        else:
+            assert False, "columns of different lengths should not be written"
+
+def test_constarc_columnar():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "archive")
+        os.makedirs(path)
+        cset = Constants_Set(set_name = "test", set_date = "", set_note = "")
+        cset.add_constant(Constant(name = "a0 (m)", date = "", note = "", value = 5.29177210544e-11, unc = 8.2e-21, rel_unc = 1.6e-10, unit = "m", is_exact = False))
+        cset.add_constant(Constant(name = "c (m s-1)", date = "", note = "", value = 299792458, unc = None, rel_unc = None, unit = "m s-1", is_exact = True))
+        Constants_Archive(path).add_constants_set(cset)
+
+        compiled = Constants_Archive(path, columnar=True).load_compiled_set("TEST")
+        assert os.path.exists(os.path.join(path, "constants", ".columnar", "TEST", "value.npy"))
+        mapped = Constants_Archive(path, columnar=True).load_compiled_set("TEST")
+        assert isinstance(mapped.values, np.memmap)
+        assert mapped.names == compiled.names == ("a0 (m)", "c (m s-1)")
+        assert np.array_equal(mapped.values, cset.compile().values)
+        assert np.isnan(mapped.uncs[1]) and list(mapped.is_exact) == [False, True]
+
+        #the mapped set is cached while the set file is unchanged
+        carc = Constants_Archive(path, columnar=True)
+        mapped = carc.load_compiled_set("TEST")
+        os.remove(os.path.join(path, "constants", ".columnar", "TEST", "columns.json"))
+        assert carc.load_compiled_set("TEST") is mapped
+        assert carc.load_constants_set("TEST").digest() == cset.digest() and carc.load_compiled_set("TEST") is mapped
+
+        #a changed set file makes the columnar copy stale
+        changed = cset.copy()
+        changed.add_constant(Constant(name = "e (C)", date = "", note = "", value = 1.602176634e-19, unc = None, rel_unc = None, unit = "C", is_exact = True))
+        changed.json_dump(os.path.join(path, "constants", "TEST.json"))
+        assert Constants_Archive(path, columnar=True).load_compiled_set("TEST").get("e (C)") == 1.602176634e-19
+        assert carc.load_compiled_set("TEST").get("e (C)") == 1.602176634e-19
@@ -0,0 +1,67 @@
+from superHEAT.archive_manager.constants import *
+import multiprocessing
+import numpy as np
+
+def make_set():
+    cset = Constants_Set(set_name = "test", set_date = "yyyy-mm-dd", set_note = "Testing set")
+    cset.add_constant(Constant(name = "a0 (m)", date = "", note = "", value = 5.29177210544e-11, unc = 8.2e-21, rel_unc = 1.6e-10, unit = "m", is_exact = False))
+    cset.add_constant(Constant(name = "c (m s-1)", date = "", note = "", value = 299792458, unc = None, rel_unc = None, unit = "m s-1", is_exact = True))
+    cset.add_constant(Constant(name = "Eh to J", date = "", note = "", value = 4.3597447222060e-18, unc = 4.8e-30, rel_unc = 1.1e-12, unit = "", is_exact = False))
+    return cset
+
+def test_compiled_set():
+    cset = make_set()
+    assert not hasattr(cset.constants["a0 (m)"], "__dict__")
+
+    compiled = cset.compile()
+    assert len(compiled) == 3 and "Eh to J" in compiled
+    assert compiled.get("c (m s-1)") == 299792458
+    idx = compiled.indices(["Eh to J", "a0 (m)"])
+    assert list(compiled.values[idx]) == [4.3597447222060e-18, 5.29177210544e-11]
+    assert np.isnan(compiled.uncs[compiled.index["c (m s-1)"]])
+    assert list(compiled.is_exact) == [False, True, False]
+    assert not compiled.values.flags.writeable
+
+#reads a shared set from another process
+def read_shared(shm_name, queue):
+    shared = Compiled_Constants_Set.attach(shm_name)
+    queue.put((shared.set_name, shared.names, list(shared.values), list(shared.is_exact)))
+    shared.close()
+
+def test_shared_compiled_set():
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return
+    context = multiprocessing.get_context("fork")
+    compiled = make_set().compile()
+    shared = compiled.share()
+    try:
+        queue = context.Queue()
+        proc = context.Process(target=read_shared, args=(shared.shm_name, queue))
+        proc.start()
+        set_name, names, values, is_exact = queue.get(timeout=30)
+        proc.join()
+        assert set_name == "TEST" and names == compiled.names
+        assert values == list(compiled.values) and is_exact == list(compiled.is_exact)
+    finally:
+        shared.close()
+        shared.unlink()
+
+def test_digest_and_diff():
+    cset = make_set()
+    other = Constants_Set(set_name = "other", set_date = "", set_note = "")
+    for key in reversed(list(cset.constants)):
+        other.add_constant(cset.constants[key].copy())
+    assert cset == other and cset.digest() == other.digest()
+    assert cset.diff(other) == {'added' : [], 'removed' : [], 'changed' : {}}
+
+    changed = other.constants["a0 (m)"].copy()
+    changed.value = 5.3e-11
+    other.update(changed)
+    other.add_constant(Constant(name = "e (C)", date = "", note = "", value = 1.602176634e-19, unc = None, rel_unc = None, unit = "C", is_exact = True))
+    assert cset != other and cset.digest() != other.digest()
+    assert cset.diff(other) == {'added' : ["e (C)"], 'removed' : [], 'changed' : {"a0 (m)" : ["value"]}}
+
+    #the recorded digest is metadata, and survives a round trip
+    cset.set_digest = cset.digest()
+    assert Constants_Set.meta_from_dict(cset.meta_to_dict()).set_digest == cset.digest()
+    assert "set_digest" not in other.meta_to_dict()
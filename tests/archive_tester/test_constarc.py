@@ -1,6 +1,11 @@
-from constants import *
-from constarc import *
+from superHEAT.archive_manager.constants import *
+from superHEAT.archive_manager.constarc import *
+import numpy as np
+import tempfile
+import shutil
+import pickle
 import json
+import os
 
 def test_constarc():
     TEST_PATH = "test_constants_archive"
@@ -25,22 +30,253 @@ def test_constarc():
     
     #If test archive exists, delete it
     if os.path.exists(TEST_PATH):
-        os.remove(TEST_PATH)
-    
+        shutil.rmtree(TEST_PATH)
+    os.makedirs(TEST_PATH)
     
     #create archive
     constarc = Constants_Archive(TEST_PATH)
     
     #add constants
+    constarc.add_constants_set(seta)
+    constarc.add_constants_set(setb)
     
-    #load constants
+    #load constants, from a fresh archive object
+    constarc = Constants_Archive(TEST_PATH)
+    TESTS_PASS = TESTS_PASS and sorted(constarc.constants_sets.keys()) == ["TEST_SETA", "TEST_SETB"]
+    load_a = constarc.load_constants_set("TEST_SETA")
+    load_b = constarc.load_constants_set("TEST_SETB")
     
     #compare against tests above
+    TESTS_PASS = TESTS_PASS and (load_a == seta) and (load_b == setb) and not (load_a == setb)
+    TESTS_PASS = TESTS_PASS and load_a.constants["a_c2"] == seta_c2
     
     #delete archive
-    os.path.remove(TEST_PATH)
+    shutil.rmtree(TEST_PATH)
     
     if (TESTS_PASS):
         return 0
     else:
         return 1 
+
+#Builds a small archive in the current directory, returns the archive and its sets
+def make_test_archive(path):
+    seta = Constants_Set(set_name = "test_seta", set_date = "yyyy-mm-dd", set_note = "Testing set a")
+    setb = Constants_Set(set_name = "test_setb", set_date = "yyyy-mm-dd", set_note = "Testing set b")
+    seta.add_constant(Constant(name = "a0 (m)", date = "yyyy-mm-dd", note = "seta a0", value = 5.29177210544e-11, unc = 8.2e-21, rel_unc = 1.6e-10, unit = "m", is_exact = False))
+    seta.add_constant(Constant(name = "c (m s-1)", date = "yyyy-mm-dd", note = "seta c", value = 299792458, unc = None, rel_unc = None, unit = "m s-1", is_exact = True))
+    setb.add_constant(Constant(name = "a0 (m)", date = "yyyy-mm-dd", note = "setb a0", value = 0.5291772083e-10, unc = 1.9e-19, rel_unc = 3.7e-9, unit = "m", is_exact = False))
+    setb.add_constant(Constant(name = "Eh to J", date = "yyyy-mm-dd", note = "setb Eh", value = 4.35974381e-18, unc = 3.4e-25, rel_unc = 7.8e-8, unit = "", is_exact = False))
+    os.makedirs(path, exist_ok=True)
+    constarc = Constants_Archive(path)
+    constarc.add_constants_set(seta)
+    constarc.add_constants_set(setb)
+    return constarc, seta, setb
+
+def test_constarc_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache_archive")
+        constarc, seta, setb = make_test_archive(path)
+        constarc = Constants_Archive(path, cache_size = 1)
+
+        #repeated loads share one read-only set
+        first = constarc.load_constants_set("TEST_SETA")
+        assert constarc.load_constants_set("TEST_SETA") is first
+        assert first == seta
+        try:
+            first.constants["a0 (m)"].value = 1.0
+            assert False, "cached constants should be read-only"
+        except AttributeError:
+            pass
+
+        #loaded sets can be pickled (e.g. sent to worker processes), and stay read-only
+        unpickled = pickle.loads(pickle.dumps(first))
+        assert unpickled == seta and unpickled.set_name == "TEST_SETA"
+        try:
+            unpickled.constants["a0 (m)"] = None
+            assert False, "unpickled sets should be read-only"
+        except TypeError:
+            pass
+        try:
+            unpickled.constants["a0 (m)"].value = 1.0
+            assert False, "unpickled constants should be read-only"
+        except AttributeError:
+            pass
+        assert pickle.loads(pickle.dumps(seta)).constants["c (m s-1)"] == seta.constants["c (m s-1)"]
+
+        #copies are modifiable and do not touch the cache
+        mine = first.copy()
+        mine.constants["a0 (m)"].value = 1.0
+        assert constarc.load_constants_set("TEST_SETA").constants["a0 (m)"].value == seta.constants["a0 (m)"].value
+
+        #the cache is bounded
+        constarc.load_constants_set("TEST_SETB")
+        assert list(constarc.cache.keys()) == ["TEST_SETB"]
+        assert constarc.load_constants_set("TEST_SETA") is not first
+
+        #rewriting the file on disk invalidates the entry
+        second = constarc.load_constants_set("TEST_SETA")
+        changed = seta.copy()
+        changed.update(Constant(name = "c (m s-1)", date = "new", note = "changed", value = 3.0e8, unc = None, rel_unc = None, unit = "m s-1", is_exact = True))
+        changed.json_dump(os.path.join(constarc.path, "TEST_SETA.json"))
+        reloaded = constarc.load_constants_set("TEST_SETA")
+        assert reloaded is not second
+        assert reloaded.constants["c (m s-1)"].value == 3.0e8
+
+def test_constarc_zip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "archive")
+        constarc, seta, setb = make_test_archive(path)
+        zip_path = shutil.make_archive(os.path.join(tmp, "archive"), 'zip', path)
+
+        #read the sets straight from the zip, without extracting it
+        zarc = Constants_Archive(zip_path)
+        assert sorted(zarc.constants_sets.keys()) == ["TEST_SETA", "TEST_SETB"]
+        assert zarc.load_constants_set("TEST_SETB") == setb
+        assert zarc.load_constants_set("TEST_SETB") is zarc.load_constants_set("TEST_SETB")
+
+        #zipped archives are read-only
+        try:
+            zarc.add_constants_set(Constants_Set(set_name = "new", set_date = "", set_note = ""))
+            assert False, "zipped archives should be read-only"
+        except AssertionError as error:
+            assert "read-only" in str(error)
+
+#Adds one set to the archive, run in a separate process
+def add_set(path, idx):
+    constarc = Constants_Archive(path)
+    new_set = Constants_Set(set_name = "proc_{i}".format(i=idx), set_date = "yyyy-mm-dd", set_note = "set {i}".format(i=idx))
+    new_set.add_constant(Constant(name = "x", date = "yyyy-mm-dd", note = "", value = idx, unc = None, rel_unc = None, unit = "", is_exact = True))
+    constarc.add_constants_set(new_set)
+
+def test_constarc_concurrent():
+    import multiprocessing
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return
+    context = multiprocessing.get_context("fork")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "archive")
+        constarc, seta, setb = make_test_archive(path)
+
+        #many writers at once, each from its own (stale) view of the archive
+        procs = [context.Process(target=add_set, args=(path, idx)) for idx in range(8)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+            assert proc.exitcode == 0
+
+        constarc = Constants_Archive(path)
+        assert len(constarc.constants_sets) == 10
+        for idx in range(8):
+            assert constarc.load_constants_set("PROC_{i}".format(i=idx)).constants["x"].value == idx
+
+        #deleting from a stale archive object keeps the sets added since
+        stale = Constants_Archive(path)
+        add_set(path, 8)
+        stale.delete_constants_set("TEST_SETA")
+        names = sorted(Constants_Archive(path).constants_sets.keys())
+        assert "TEST_SETA" not in names and "PROC_8" in names and len(names) == 10
+        assert not os.path.exists(os.path.join(path, "constants", "TEST_SETA.json"))
+
+def test_constarc_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "archive")
+        constarc, seta, setb = make_test_archive(path)
+
+        #"a0" is an alias of "a0 (m)", found in both sets
+        found = dict(constarc.lookup("a0"))
+        assert found["TEST_SETA"] == seta.constants["a0 (m)"]
+        assert found["TEST_SETB"] == setb.constants["a0 (m)"]
+        assert os.path.exists(os.path.join(path, "constants", ".constarc_index.json"))
+
+        set_names, values, uncs, rel_uncs = constarc.lookup_values(["A0 (m)", "c", "Eh to J"])
+        assert set_names == ["TEST_SETA", "TEST_SETB"]
+        assert values[0, 0] == seta.constants["a0 (m)"].value and values[0, 1] == setb.constants["a0 (m)"].value
+        assert values[1, 0] == 299792458 and np.isnan(values[1, 1]) and np.isnan(uncs[1, 0])
+        assert np.isnan(values[2, 0]) and rel_uncs[2, 1] == 7.8e-8
+
+        #an alias shared by several constants of a set is ambiguous, unless one has exactly that name
+        shared = Constants_Set(set_name = "shared", set_date = "", set_note = "")
+        shared.add_constant(Constant(name = "a0 (m)", date = "", note = "", value = 5.29e-11, unc = None, rel_unc = None, unit = "m", is_exact = False))
+        shared.add_constant(Constant(name = "a0 (bohr)", date = "", note = "", value = 1.0, unc = None, rel_unc = None, unit = "bohr", is_exact = True))
+        constarc.add_constants_set(shared)
+        try:
+            constarc.lookup_values("a0", sets=["shared"])
+            assert False, "a0 should be ambiguous in SHARED"
+        except AssertionError as error:
+            assert "ambiguous" in str(error)
+        set_names, values, uncs, rel_uncs = constarc.lookup_values(["a0 (bohr)", "a0 (m)"], sets=["test_seta", "shared"])
+        assert np.isnan(values[0, 0]) and values[0, 1] == 1.0
+        assert values[1].tolist() == [seta.constants["a0 (m)"].value, 5.29e-11]
+        shared = shared.copy()
+        shared.add_constant(Constant(name = "a0", date = "", note = "", value = 2.0, unc = None, rel_unc = None, unit = "", is_exact = True))
+        shared.json_dump(os.path.join(path, "constants", "SHARED.json"))
+        set_names, values, uncs, rel_uncs = constarc.lookup_values("a0", sets=["shared"])
+        assert values.tolist() == [2.0]
+        constarc.delete_constants_set("SHARED")
+
+        #the set files are checked once per call, not once per name
+        stats = []
+        stat_key = constarc.source.stat_key
+        constarc.source.stat_key = lambda rel: stats.append(rel) or stat_key(rel)
+        constarc.lookup_values(["A0 (m)", "c", "Eh to J", "a0"])
+        assert sorted(stats) == ["constants/TEST_SETA.json", "constants/TEST_SETB.json"]
+        constarc.source.stat_key = stat_key
+
+        #changing a set re-indexes it
+        changed = seta.copy()
+        changed.add_constant(Constant(name = "Eh to J", date = "", note = "", value = 4.0e-18, unc = None, rel_unc = None, unit = "", is_exact = False))
+        changed.json_dump(os.path.join(path, "constants", "TEST_SETA.json"))
+        fresh = Constants_Archive(path)
+        set_names, values, uncs, rel_uncs = fresh.lookup_values("eh to j")
+        assert list(values) == [4.0e-18, 4.35974381e-18]
+
+def test_constarc_digests():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "archive")
+        constarc, seta, setb = make_test_archive(path)
+
+        #digests are recorded when sets are added
+        fresh = Constants_Archive(path)
+        assert fresh.constants_sets["TEST_SETA"].set_digest == seta.digest()
+        assert fresh.load_constants_set("TEST_SETB").digest() == setb.digest()
+
+        fresh.record_digests({"TEST_SETA" : "0"*64})
+        assert Constants_Archive(path).constants_sets["TEST_SETA"].set_digest == "0"*64
+        assert Constants_Archive(path).constants_sets["TEST_SETB"].set_digest == setb.digest()
+
+        #the file digest follows the set file on disk, not the recorded set digest
+        recorded = Constants_Archive(path).constants_sets["TEST_SETB"].file_digest
+        assert recorded == fresh.file_digest("TEST_SETB")
+        set_file = os.path.join(path, "constants", "TEST_SETB.json")
+        with open(set_file) as f:
+            text = f.read()
+        with open(set_file, "w") as f:
+            f.write(text.replace("4.35974381e-18", "4.35974382e-18"))
+        fresh = Constants_Archive(path)
+        assert fresh.constants_sets["TEST_SETB"].set_digest == setb.digest()
+        assert fresh.file_digest("TEST_SETB") != recorded
+
+def test_constarc_read_only():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "archive")
+        constarc, seta, setb = make_test_archive(path)
+        os.remove(os.path.join(path, "constants", ".constarc.lock"))
+        before = sorted(os.listdir(os.path.join(path, "constants")))
+
+        lazy = Constants_Archive.open_read_only(path)
+        assert sorted(lazy.constants_sets) == ["TEST_SETA", "TEST_SETB"]
+        assert lazy.constants_sets.parsed == {}
+        assert lazy.load_constants_set("TEST_SETB") == setb
+        assert list(lazy.constants_sets.parsed) == ["TEST_SETB"]
+        assert dict(lazy.lookup("c"))["TEST_SETA"] == seta.constants["c (m s-1)"]
+
+        #nothing was written, and writes are refused
+        assert sorted(os.listdir(os.path.join(path, "constants"))) == before
+        try:
+            lazy.delete_constants_set("TEST_SETA")
+        except AssertionError:
+            pass
+        else:
+            assert False, "a read-only archive should not be modified"
@@ -11,7 +11,7 @@
 
 import numpy as np
 import math
-from geometry import *
+from superHEAT.archive_manager.geometry import *
 
 #testing
 geom = Geometry('test', ['C','H', 'H', 'H'], dtest) 
@@ -34,3 +34,100 @@ print("angle is :", np.degrees(geom.angle(1, 0, 3)))
 print("angle is :", np.degrees(geom.angle(2, 0, 3))) 
 print("dehedral is :", np.degrees(geom.dihedral(1, 0, 2, 3)))
 print("dehedral is :", np.degrees(geom.dihedral(1, 0, 3, 2)))
+
+def test_geometry_tables():
+    geom = Geometry('test', ['C','H', 'H', 'H'], dtest)
+    n = len(geom.atoms)
+
+    dmat = geom.distance_matrix()
+    assert dmat.shape == (n, n) and np.allclose(dmat, dmat.T)
+    assert all(np.isclose(dmat[i, j], geom.dist(i, j)) for i in range(n) for j in range(n))
+
+    assert geom.bonds().tolist() == [[0, 1], [0, 2], [0, 3]]
+    idx = geom.bonded_angles()
+    assert idx.tolist() == [[1, 0, 2], [1, 0, 3], [2, 0, 3]]
+    assert np.allclose(geom.angles(), [geom.angle(*t) for t in idx])
+
+    quads = np.array([[1, 0, 2, 3], [1, 0, 3, 2], [2, 0, 1, 3]])
+    assert np.allclose(geom.dihedrals(quads), [geom.dihedral(*q) for q in quads])
+    signed = geom.dihedrals(quads, signed=True)
+    assert np.allclose(np.abs(signed), geom.dihedrals(quads)) and np.isclose(signed[0], -signed[1])
+
+    #ethane has 9 H-C-C-H dihedrals, and 12 bonded angles
+    ethane = Geometry('ethane', ['C', 'C', 'H', 'H', 'H', 'H', 'H', 'H'], 
+                      [[0, 0, 0], [2.9, 0, 0], [-0.7, 1.7, 0.5], [-0.7, -1.2, 1.3], [-0.7, -0.5, -1.7], [3.6, 1.7, 0.5], [3.6, -1.2, 1.3], [3.6, -0.5, -1.7]])
+    assert ethane.bonded_dihedrals().shape == (9, 4) and ethane.bonded_angles().shape == (12, 3)
+    assert np.allclose(ethane.dihedrals(), [ethane.dihedral(*q) for q in ethane.bonded_dihedrals()])
+
+def test_geometry_batch():
+    import tempfile
+    import os
+    frames = np.stack([dtest, d80_xyz, d150_xyz])
+    batch = Geometry_Batch('batch', ['C', 'H', 'H', 'H'], frames)
+    assert len(batch) == 3 and batch.xyz.shape == (3, 4, 3)
+
+    quads = [[1, 0, 2, 3]]
+    dihedrals = batch.dihedrals(quads)
+    assert dihedrals.shape == (3, 1)
+    assert np.allclose(dihedrals[:, 0], [Geometry('f', ['C','H','H','H'], f).dihedral(1, 0, 2, 3) for f in frames])
+    assert np.allclose(batch.dists([[0, 1], [2, 3]])[1], [batch[1].dist(0, 1), batch[1].dist(2, 3)])
+    assert batch.angles().shape == (3, 3) and batch.distance_matrix().shape == (3, 4, 4)
+
+    #frames and slices are views
+    assert np.shares_memory(batch[1].xyz, batch.xyz)
+    sub = batch[::2]
+    assert len(sub) == 2 and np.shares_memory(sub.xyz, batch.xyz)
+    assert np.allclose(sub.xyz[1], d150_xyz)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_name = os.path.join(tmp, "frames.npy")
+        mapped = Geometry_Batch.create_memmap(file_name, ['C', 'H', 'H', 'H'], 3)
+        mapped.xyz[:] = frames
+        mapped.xyz.flush()
+        del mapped
+        reread = Geometry_Batch.open_memmap(file_name, ['C', 'H', 'H', 'H'])
+        assert isinstance(reread.xyz, np.memmap) and np.allclose(reread.dihedrals(quads), dihedrals)
+        del reread
+
+def test_fingerprint():
+    geom = Geometry('test', ['C', 'H', 'H', 'H'], dtest)
+
+    #rotated, translated and permuted copies have the same fingerprint
+    theta = 0.7
+    rot = np.array([[np.cos(theta), -np.sin(theta), 0.0], [np.sin(theta), np.cos(theta), 0.0], [0.0, 0.0, 1.0]])
+    perm = [2, 0, 3, 1]
+    moved = Geometry('moved', [geom.atoms[p] for p in perm], (dtest @ rot.T + 3.0)[perm])
+    assert moved.fingerprint() == geom.fingerprint()
+
+    #other structures, elements or tolerances do not
+    assert Geometry('d80', ['C', 'H', 'H', 'H'], d80_xyz).fingerprint() != geom.fingerprint()
+    assert Geometry('n', ['N', 'H', 'H', 'H'], dtest).fingerprint() != geom.fingerprint()
+    assert geom.fingerprint(tol=1e-2) != geom.fingerprint()
+
+    batch = Geometry_Batch('batch', ['C', 'H', 'H', 'H'], np.stack([dtest, d80_xyz, dtest + 1.0]))
+    prints = batch.fingerprints()
+    assert prints[0] == prints[2] == geom.fingerprint() and prints[1] != prints[0]
+    assert len(set(prints)) == 2
+
+def test_neighbor_lists():
+    #a cluster of methane molecules on a grid, too large for the dense contact search
+    ch4 = np.array([[0.0, 0.0, 0.0], [1.19, 1.19, 1.19], [-1.19, -1.19, 1.19], [-1.19, 1.19, -1.19], [1.19, -1.19, -1.19]])
+    shifts = np.array([[x, y, z] for x in range(4) for y in range(4) for z in range(4)], dtype=float) * 8.0
+    xyz = (shifts[:, None, :] + ch4[None, :, :]).reshape(-1, 3)
+    atoms = ['C', 'H', 'H', 'H', 'H'] * len(shifts)
+    geom = Geometry('cluster', atoms, xyz)
+    assert len(atoms) > DENSE_ATOMS
+
+    dense = bonds_(geom.distance_matrix(), geom.radii())
+    assert np.array_equal(geom.bonds(), dense) and len(dense) == 4 * len(shifts)
+
+    pairs = np.argwhere(np.triu(geom.distance_matrix() <= 9.0, k=1))
+    assert np.array_equal(neighbor_pairs_(xyz, 9.0, method="cells"), pairs)
+    assert np.array_equal(geom.neighbors(9.0), pairs)
+
+    indptr, indices = geom.bond_graph()
+    assert indices[indptr[0]:indptr[1]].tolist() == [1, 2, 3, 4] and indices[indptr[1]:indptr[2]].tolist() == [0]
+
+    fragments = geom.fragments()
+    assert fragments.tolist() == np.repeat(np.arange(len(shifts)), 5).tolist()
+    assert len(geom.bonded_angles()) == 6 * len(shifts) and len(geom.bonded_dihedrals()) == 0
@@ -0,0 +1,96 @@
+from superHEAT.archive_manager.geometry import *
+from superHEAT.archive_manager.molarc import *
+import multiprocessing
+import tempfile
+import os
+import numpy as np
+
+def test_molarc():
+    with tempfile.TemporaryDirectory() as tmp:
+        molarc = Molecule_Archive(tmp)
+        assert len(molarc) == 0
+
+        molarc.add_molecule(Geometry('ch3_d80', ['C', 'H', 'H', 'H'], d80_xyz), note = "80 degree dihedral")
+        molarc.add_molecules([Geometry('ch3_d150', ['C', 'H', 'H', 'H'], d150_xyz), Geometry('ch3_test', ['C', 'H', 'H', 'H'], dtest)])
+
+        #from a fresh archive object
+        molarc = Molecule_Archive(tmp)
+        assert molarc.names() == ["CH3_D80", "CH3_D150", "CH3_TEST"]
+        assert molarc.find_formula("CH3") == ["CH3_D80", "CH3_D150", "CH3_TEST"]
+        assert molarc.note("ch3_d80") == "80 degree dihedral"
+
+        geom = molarc.get("CH3_D150")
+        assert geom.atoms == ['C', 'H', 'H', 'H'] and np.array_equal(geom.xyz, d150_xyz)
+        assert isinstance(molarc.coords_array(), np.memmap) and molarc.coords_array().shape == (12, 3)
+        assert molarc.find_geometry(Geometry('copy', ['C', 'H', 'H', 'H'], d80_xyz)) == ["CH3_D80"]
+        assert molarc.find_geometry(Geometry('moved', ['H', 'C', 'H', 'H'], d80_xyz[[1, 0, 2, 3]] - 2.0)) == ["CH3_D80"]
+
+        #dtest is d150_xyz, rotated
+        assert molarc.find_geometry(Geometry('copy', ['C', 'H', 'H', 'H'], dtest)) == ["CH3_D150", "CH3_TEST"]
+
+        try:
+            molarc.add_molecule(Geometry('ch3_d80', ['C', 'H', 'H', 'H'], dtest))
+        except AssertionError:
+            pass
+        else:
+            assert False, "molecule names must be unique"
+        assert len(Molecule_Archive(tmp)) == 3
+
+def test_molarc_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = Molecule_Archive(tmp)
+        writer.add_molecules([Geometry('ch3_d80', ['C', 'H', 'H', 'H'], d80_xyz), Geometry('ch3_d150', ['C', 'H', 'H', 'H'], d150_xyz)])
+        index_file = os.path.join(tmp, "molecules", ".molarc_index.json")
+        with open(index_file) as f:
+            assert '"atoms"' not in f.read()
+
+        #opening parses no record, until one is needed
+        reader = Molecule_Archive(tmp)
+        assert reader.parsed == {} and len(reader) == 2 and reader.nrows == 8
+        assert reader.find_formula("CH3") == ["CH3_D80", "CH3_D150"] and reader.parsed == {}
+        assert np.array_equal(reader.get("ch3_d150").xyz, d150_xyz) and list(reader.parsed) == ["CH3_D150"]
+
+        #records appended by another writer are indexed on their own
+        writer.add_molecule(Geometry('ch3_test', ['C', 'H', 'H', 'H'], dtest), note="appended")
+        reader.read_metadata()
+        assert reader.names() == ["CH3_D80", "CH3_D150", "CH3_TEST"] and list(reader.parsed) == ["CH3_D150"]
+        assert reader.note("ch3_test") == "appended" and np.array_equal(reader.get("ch3_test").xyz, dtest)
+
+        #a replaced molarc.json is indexed again from the start
+        arc_file = os.path.join(tmp, "molecules", "molarc.json")
+        with open(arc_file) as f:
+            lines = f.readlines()
+        with open(arc_file, "w") as f:
+            f.writelines([lines[1].replace("CH3_D150", "CH3_D150_RENAMED_TO_BE_LONGER"), lines[0], lines[2]])
+        reader = Molecule_Archive(tmp)
+        assert reader.names() == ["CH3_D150_RENAMED_TO_BE_LONGER", "CH3_D80", "CH3_TEST"]
+        assert np.array_equal(reader.get("ch3_d80").xyz, d80_xyz)
+
+def test_hill_formula():
+    assert hill_formula(['C', 'H', 'H', 'H', 'H', 'O']) == "CH4O"
+    assert hill_formula(['O', 'H', 'H']) == "H2O"
+    assert hill_formula(['CL', 'H']) == "ClH"
+    assert hill_formula(['H1', 'C1', 'C2']) == "C2H"
+
+#adds molecules from another process
+def add_from_process(path, k):
+    Molecule_Archive(path).add_molecules([Geometry('m{k}_{i}'.format(k=k, i=i), ['H', 'H'], [[0, 0, 0], [0, 0, 1.4 + k + i/10]]) for i in range(5)])
+
+def test_molarc_concurrent():
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return
+    context = multiprocessing.get_context("fork")
+    with tempfile.TemporaryDirectory() as tmp:
+        Molecule_Archive(tmp)
+        procs = [context.Process(target=add_from_process, args=(tmp, k)) for k in range(4)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+            assert proc.exitcode == 0
+
+        molarc = Molecule_Archive(tmp)
+        assert len(molarc) == 20
+        for k in range(4):
+            for i in range(5):
+                assert np.isclose(molarc.get('m{k}_{i}'.format(k=k, i=i)).dist(0, 1), 1.4 + k + i/10)
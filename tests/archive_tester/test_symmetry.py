@@ -0,0 +1,59 @@
+import numpy as np
+from superHEAT.archive_manager.geometry import *
+from superHEAT.archive_manager.symmetry import *
+
+def ring(r, n, z=0.0, phase=0.0):
+    t = phase + 2.0 * np.pi * np.arange(n) / n
+    return np.stack([r * np.cos(t), r * np.sin(t), np.full(n, z)], axis=-1)
+
+MOLECULES = {
+    'C2v'   : (['O', 'H', 'H'], [[0, 0, 0], [1.43, 1.1, 0], [-1.43, 1.1, 0]]),
+    'C3v'   : (['N', 'H', 'H', 'H'], np.concatenate([[[0, 0, 0.2]], ring(1.77, 3, -0.5)])),
+    'Td'    : (['C', 'H', 'H', 'H', 'H'], [[0, 0, 0], [1, 1, 1], [1, -1, -1], [-1, 1, -1], [-1, -1, 1]]),
+    'Oh'    : (['S'] + ['F'] * 6, np.concatenate([[[0, 0, 0]], 3 * np.eye(3), -3 * np.eye(3)])),
+    'D6h'   : (['C'] * 6 + ['H'] * 6, np.concatenate([ring(2.64, 6), ring(4.69, 6)])),
+    'D3d'   : (['C', 'C'] + ['H'] * 6, np.concatenate([[[0, 0, 1.45], [0, 0, -1.45]], ring(1.9, 3, 2.1), ring(1.9, 3, -2.1, np.pi / 3)])),
+    'D3h'   : (['C', 'C'] + ['H'] * 6, np.concatenate([[[0, 0, 1.45], [0, 0, -1.45]], ring(1.9, 3, 2.1), ring(1.9, 3, -2.1)])),
+    'D2d'   : (['C'] * 3 + ['H'] * 4, [[0, 0, 0], [0, 0, 2.5], [0, 0, -2.5], [1.7, 0, 3.5], [-1.7, 0, 3.5], [0, 1.7, -3.5], [0, -1.7, -3.5]]),
+    'C2h'   : (['N', 'N', 'H', 'H'], [[1.1, 0.2, 0], [-1.1, -0.2, 0], [1.5, 2.1, 0], [-1.5, -2.1, 0]]),
+    'C2'    : (['O', 'O', 'H', 'H'], [[0, 1.4, 0], [0, -1.4, 0], [1.8, 1.6, 0.3], [-1.8, -1.6, 0.3]]),
+    'Cs'    : (['O', 'H', 'H'], [[0, 0, 0], [1.43, 1.1, 0], [-1.2, 1.3, 0.1]]),
+    'C1'    : (['C', 'O', 'H', 'H'], [[0, 0, 0], [2.3, 0.1, 0.2], [-0.9, 1.8, 0.3], [-0.7, -1.1, 1.6]]),
+    'Dinfh' : (['O', 'C', 'O'], [[0, 0, -2.2], [0, 0, 0], [0, 0, 2.2]]),
+    'Cinfv' : (['H', 'C', 'N'], [[0, 0, -2.0], [0, 0, 0], [0, 0, 2.2]]),
+    'Kh'    : (['AR'], [[1.0, 2.0, 3.0]]),
+}
+
+def test_point_groups():
+    R = rotation_(np.array([0.3, 0.5, 0.81]) / np.linalg.norm([0.3, 0.5, 0.81]), 0.7)
+    noise = np.random.default_rng(3)
+    for name, (atoms, xyz) in MOLECULES.items():
+        xyz = np.asarray(xyz, dtype=float)
+        assert point_group(Geometry(name, list(atoms), xyz)).name == name
+        #in any orientation and position, and with small errors
+        moved = xyz @ R.T + [1.0, -2.0, 0.5] + noise.normal(0.0, 1e-3, xyz.shape)
+        assert point_group(Geometry(name, list(atoms), moved)).name == name
+
+    pg = point_group(Geometry('ch4', *MOLECULES['Td']))
+    assert [orbit.tolist() for orbit in pg.orbits] == [[0], [1, 2, 3, 4]]
+    assert pg.unique_atoms().tolist() == [0, 1] and pg.orbit_of().tolist() == [0, 1, 1, 1, 1]
+    pg = point_group(Geometry('allene', *MOLECULES['D2d']))
+    assert [orbit.tolist() for orbit in pg.orbits] == [[0], [1, 2], [3, 4, 5, 6]]
+
+    batch = Geometry_Batch.from_geometries([Geometry('w', *MOLECULES['C2v']), Geometry('w', *MOLECULES['Cs'])])
+    assert [pg.name for pg in point_groups(batch)] == ['C2v', 'Cs']
+
+def test_symmetric_coordinates():
+    assert symmetric_coordinates(Geometry('w', *MOLECULES['C2v'])).shape == (3, 9)
+    assert symmetric_coordinates(Geometry('ch4', *MOLECULES['Td'])).shape == (1, 15)
+    assert symmetric_coordinates(Geometry('hcn', *MOLECULES['Cinfv'])).shape == (3, 9)
+    Q = symmetric_coordinates(Geometry('bz', *MOLECULES['D6h']))
+    assert Q.shape == (2, 36) and np.allclose(Q @ Q.T, np.eye(2))
+
+def test_large_cluster():
+    #a cubic grid of methanes keeps the Td symmetry of one
+    ch4 = np.asarray(MOLECULES['Td'][1], dtype=float) * 0.69
+    shifts = np.array([[x, y, z] for x in range(-2, 3) for y in range(-2, 3) for z in range(-2, 3)], dtype=float) * 8.0
+    geom = Geometry('cluster', ['C', 'H', 'H', 'H', 'H'] * len(shifts), (shifts[:, None, :] + ch4[None, :, :]).reshape(-1, 3))
+    pg = point_group(geom)
+    assert pg.name == 'Td' and sum(len(orbit) for orbit in pg.orbits) == len(geom.atoms)
@@ -0,0 +1,40 @@
+from superHEAT.archive_manager.constants import *
+from superHEAT.archive_manager.uncertainty import *
+import numpy as np
+
+def make_set():
+    cset = Constants_Set(set_name = "test", set_date = "yyyy-mm-dd", set_note = "Testing set")
+    cset.add_constant(Constant(name = "Eh (J)", date = "", note = "", value = 4.3597447222060e-18, unc = 4.8e-30, rel_unc = 1.1e-12, unit = "J", is_exact = False))
+    cset.add_constant(Constant(name = "a0 (m)", date = "", note = "", value = 5.29177210544e-11, unc = None, rel_unc = 1.6e-10, unit = "m", is_exact = False))
+    cset.add_constant(Constant(name = "NA (mol-1)", date = "", note = "", value = 6.02214076e23, unc = None, rel_unc = None, unit = "mol-1", is_exact = True))
+    return cset
+
+def test_propagate():
+    #linear combination, with and without correlation
+    a, b = 2.0, 3.0
+    value, unc = propagate(lambda x, y: x + 2*y, [a, b], [0.1, 0.2])
+    assert np.isclose(value, 8.0) and np.isclose(unc, np.sqrt(0.1**2 + 0.4**2))
+    value, unc = propagate(lambda x, y: x - y, [a, b], [0.1, 0.1], corr=[[1.0, 1.0], [1.0, 1.0]])
+    assert np.isclose(unc, 0.0, atol=1e-9)
+
+    #a whole table at once, relative uncertainties of a product add in quadrature
+    table = np.linspace(1.0, 2.0, 7).reshape(7, 1) * np.ones((1, 3))
+    value, unc, cov = propagate(lambda x, y: table * x * y, [a, b], [0.02, 0.03], full=True)
+    assert value.shape == table.shape and unc.shape == table.shape
+    assert np.allclose(value, table * 6.0)
+    assert np.allclose(unc / value, np.sqrt(0.01**2 + 0.01**2))
+    assert cov.shape == (21, 21) and np.allclose(np.sqrt(np.diag(cov)), unc.ravel())
+
+def test_propagate_constants():
+    cset = make_set()
+    names = ["Eh (J)", "a0 (m)", "NA (mol-1)"]
+    values, uncs = constants_values(cset, names)
+    assert uncs[0] == 4.8e-30 and np.isclose(uncs[1], 1.6e-10 * 5.29177210544e-11) and uncs[2] == 0.0
+
+    cvalues, cuncs = constants_values(cset.compile(), names)
+    assert np.array_equal(values, cvalues) and np.array_equal(uncs, cuncs)
+
+    energies = np.array([1.0, -0.5, 2.0])
+    value, unc = propagate_constants(lambda Eh, a0, NA: energies * Eh * NA / 1000, cset, names)
+    assert np.allclose(value, energies * 4.3597447222060e-18 * 6.02214076e23 / 1000)
+    assert np.allclose(unc, np.abs(value) * 4.8e-30 / 4.3597447222060e-18, rtol=1e-4)
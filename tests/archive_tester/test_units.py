@@ -0,0 +1,34 @@
+from superHEAT.archive_manager.constants import *
+from superHEAT.archive_manager.units import *
+import numpy as np
+
+def make_set():
+    cset = Constants_Set(set_name = "test", set_date = "yyyy-mm-dd", set_note = "Testing set")
+    cset.add_constant(Constant(name = "Eh to cm-1", date = "", note = "", value = 219474.63, unc = None, rel_unc = None, unit = "", is_exact = False))
+    cset.add_constant(Constant(name = "cm-1 to kcal/mol", date = "", note = "", value = 0.002859144, unc = None, rel_unc = None, unit = "", is_exact = False))
+    cset.add_constant(Constant(name = "Eh (J)", date = "", note = "", value = 4.3597447222060e-18, unc = None, rel_unc = None, unit = "J", is_exact = False))
+    cset.add_constant(Constant(name = "a0 (m)", date = "", note = "", value = 5.29177210544e-11, unc = None, rel_unc = None, unit = "m", is_exact = False))
+    cset.add_constant(Constant(name = "mp/me", date = "", note = "", value = 1836.15267343, unc = None, rel_unc = None, unit = "", is_exact = False))
+    return cset
+
+def test_unit_converter():
+    cset = make_set()
+    conv = unit_converter(cset)
+    assert unit_converter(cset) is conv
+    assert "mp/me" not in conv.units() and "a0" in conv.units()
+
+    assert conv.path("Eh", "kcal/mol") == ["Eh to cm-1", "cm-1 to kcal/mol"]
+    assert np.isclose(conv.factor("Eh", "kcal/mol"), 219474.63 * 0.002859144)
+    assert conv.path("J", "cm-1") == ["1/Eh (J)", "Eh to cm-1"]
+    assert np.isclose(conv.factor("kcal/mol", "Eh") * conv.factor("Eh", "kcal/mol"), 1.0)
+
+    energies = np.array([[1.0, 2.0], [0.5, 0.0]])
+    assert np.allclose(convert(energies, "Eh", "J", cset), energies * 4.3597447222060e-18)
+    assert np.allclose(unit_converter(cset.compile()).convert(energies, "Eh", "cm-1"), energies * 219474.63)
+
+    try:
+        conv.factor("Eh", "m")
+    except AssertionError:
+        pass
+    else:
+        assert False, "Eh and m should not be connected"
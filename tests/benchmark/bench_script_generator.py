@@ -0,0 +1,183 @@
+##############################################
+# bench_script_generator.py
+#
+# October 19, 2026 : created
+#
+# Benchmarks for the script generator at realistic scale
+#
+# Builds synthetic joblists of the requested sizes from the real CALCS
+# and BASIS registries, using generated ZMATs of varying numbers of atoms,
+# and measures the wall time of Joblist.append and Joblist.generate, the
+# files written per second, and the peak memory. Each case runs in its own
+# process so that the peak memory of one case does not hide the next.
+#
+# The results of each run are appended, along with the git commit, to a
+# JSON file so that runs can be compared across commits.
+#
+# NOTE:
+#   Requires docopt. 10^6 jobs writes 2x10^6 files, so it is not run by default
+#
+
+##############################################
+#DOCOPT STRING
+#
+"""bench_script_generator
+
+Usage:
+    bench_script_generator.py [--sizes=<sizes>] [--atoms=<atoms>] [--output=<file>] [--no-generate]
+    bench_script_generator.py (-h | --help)
+
+Options:
+    --sizes=<sizes>   Comma separated number of jobs per case [default: 100,10000]
+    --atoms=<atoms>   Comma separated number of atoms in the ZMAT [default: 2,50]
+    --output=<file>   JSON file the results are appended to [default: bench_results.json]
+    --no-generate     Only benchmark Joblist.append
+    -h --help         Show this screen.
+
+"""
+
+##############################################
+from docopt import docopt
+from pathlib import Path
+import concurrent.futures
+import multiprocessing
+import subprocess
+import itertools
+import datetime
+import platform
+import tempfile
+import copy
+import json
+import time
+import os
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from superHEAT.script_generator import *
+
+RUN_DUMMY = Path(__file__).resolve().parent.parent.parent / "examples" / "script_generator" / "simple" / "run.dummy"
+
+##############################################
+# Synthetic inputs
+
+#write a ZMAT with natoms cartesian atoms that uses every ZMAT abbreviation
+def write_zmat(file, natoms):
+    with open(file, "w") as f:
+        f.write("Synthetic benchmark molecule\n")
+        for i in range(natoms):
+            f.write("X{i} {x:.8f} {y:.8f} {z:.8f}\n".format(i=i+1, x=1.1*i, y=0.5*(i%3), z=0.25*(i%5)))
+        f.write("\n*CFOUR(CALC=XXX,BASIS=SPECIAL,COORD=CARTESIAN\n")
+        f.write("FROZEN_CORE=ZZZ,ABCD=AAA,REF=RHF,CC_PROG=CCC\n")
+        f.write("DBOC=DDD,RELATIVISTIC=RRR,NEWNORM=NNN,NONHF=FFF\n")
+        f.write("SCF_CONV=8,CC_CONV=8,LINEQ_CONV=8\n")
+        f.write("MEMORY=64,MEM_UNIT=GB)\n\n")
+        for i in range(natoms):
+            f.write("X{i}:YYY\n".format(i=i+1))
+        f.write("\n")
+
+#append njobs jobs to joblist, cycling through every calc and basis in the registries
+def fill_joblist(joblist, njobs):
+    zmat_options = copy.deepcopy(ZMAT_OPTIONS)
+    zmat_options.set('ref', 'RHF')
+    combos = itertools.cycle(itertools.product(CALCS.dict.values(), BASIS.dict.values()))
+    for idx in range(njobs):
+        calc, basis = next(combos)
+        zopts = copy.deepcopy(zmat_options)
+        ropts = copy.deepcopy(RUN_OPTIONS)
+        set_calc(calc, zopts)
+        set_basis(basis, zopts)
+        ropts.set('jobname', "bench_" + calc.short_name + "_" + basis.short_name)
+        joblist.append(name=calc.proper_name + "/" + basis.proper_name, zmat_options=zopts, run_options=ropts)
+
+#returns the peak resident memory of this process in MB, or None if unknown
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #bytes on macOS, kilobytes elsewhere
+    return rss / 1.0e6 if platform.system() == 'Darwin' else rss / 1.0e3
+
+##############################################
+# Benchmark a single case. This runs in a fresh process
+def run_case(njobs, natoms, generate):
+    result = {'njobs' : njobs, 'natoms' : natoms}
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            write_zmat("ZMAT", natoms)
+            zmat = Zmat("ZMAT")
+            run = Runscript(str(RUN_DUMMY))
+            joblist = Joblist(molecule="bench", zmat=zmat, run=run)
+
+            t0 = time.perf_counter()
+            fill_joblist(joblist, njobs)
+            dt = time.perf_counter() - t0
+            result['append_s'] = dt
+            result['append_jobs_per_s'] = njobs / dt if dt > 0 else None
+            result['append_peak_rss_mb'] = peak_rss_mb()
+
+            if generate:
+                t0 = time.perf_counter()
+                joblist.generate()
+                dt = time.perf_counter() - t0
+                result['generate_s'] = dt
+                result['generate_files_per_s'] = 2 * njobs / dt if dt > 0 else None
+                result['generate_peak_rss_mb'] = peak_rss_mb()
+        finally:
+            os.chdir(cwd)
+    return result
+
+#current git commit, if we are in a git repository
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+##############################################
+# MAIN
+#
+if __name__ == "__main__":
+
+    args = docopt(__doc__)
+    sizes = [int(n) for n in args['--sizes'].split(',')]
+    atoms = [int(n) for n in args['--atoms'].split(',')]
+    generate = not args['--no-generate']
+
+    record = {'commit' : git_commit(),
+              'date' : datetime.datetime.now().isoformat(timespec='seconds'),
+              'python' : platform.python_version(),
+              'machine' : platform.machine(),
+              'cases' : []}
+
+    print('{n: >10} {a: >6} {ta: >12} {jps: >12} {tg: >12} {fps: >12} {mem: >10}'.format(
+          n='Jobs', a='Atoms', ta='append (s)', jps='jobs/s', tg='generate (s)', fps='files/s', mem='peak MB'))
+
+    #one worker process per case, run one after the other
+    context = multiprocessing.get_context('spawn')
+    for njobs in sizes:
+        for natoms in atoms:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                case = executor.submit(run_case, njobs, natoms, generate).result()
+            record['cases'].append(case)
+            mem = case.get('generate_peak_rss_mb', case['append_peak_rss_mb'])
+            print('{n: >10d} {a: >6d} {ta: >12.3f} {jps: >12.0f} {tg: >12} {fps: >12} {mem: >10}'.format(
+                  n=njobs, a=natoms, ta=case['append_s'], jps=case['append_jobs_per_s'] or 0,
+                  tg='{:.3f}'.format(case['generate_s']) if generate else '-',
+                  fps='{:.0f}'.format(case['generate_files_per_s'] or 0) if generate else '-',
+                  mem='{:.1f}'.format(mem) if mem is not None else '-'))
+
+    #append to the results file
+    history = []
+    if os.path.exists(args['--output']):
+        with open(args['--output'], 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    history.append(record)
+    with open(args['--output'], 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    print("Results appended to", args['--output'])
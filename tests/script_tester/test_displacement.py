@@ -0,0 +1,84 @@
+from superHEAT.script_generator import *
+from superHEAT.archive_manager.geometry import *
+import numpy as np
+import tempfile
+import json
+import copy
+import os
+from pathlib import Path
+from superHEAT.archive_manager import zmatrix
+
+EXAMPLE = Path(__file__).resolve().parent.parent.parent / "examples" / "script_generator" / "simple"
+
+WATER = Geometry('water', ['O', 'H', 'H'], [[0.0, 0.0, 0.0], [1.43, 1.1, 0.0], [-1.43, 1.1, 0.0]])
+
+#a quadratic energy, the same for every orientation and order of the atoms,
+# so that finite differences are exact
+WEIGHTS = {('H', 'H') : 0.1, ('H', 'O') : 0.5, ('O', 'H') : 0.5}
+
+def energy(atoms, xyz):
+    W = np.array([[WEIGHTS.get((a, b), 0.0) for b in atoms] for a in atoms])
+    diff = xyz[..., :, None, :] - xyz[..., None, :, :]
+    return 0.5 * np.sum(W * np.sum(diff**2, axis=-1), axis=(-2, -1))
+
+def test_displacement():
+    W = np.array([[WEIGHTS.get((a, b), 0.0) for b in WATER.atoms] for a in WATER.atoms])
+    L = np.diag(W.sum(axis=1)) - W
+    xyz = np.asarray(WATER.xyz)
+
+    disp = Displacements(WATER, step=0.01, order=1)
+    assert disp.npoints() == 18 and disp.njobs() < 18
+    assert disp.point_name(0) == "+x1" and disp.point_name(13) == "-y2"
+    E = energy(WATER.atoms, disp.xyz[disp.jobs])
+    assert np.allclose(disp.gradient(E, cartesian=True), 2.0 * L @ xyz)
+
+    disp = Displacements(WATER, step=0.01, order=2)
+    assert disp.npoints() == 1 + 2 * 9**2 and disp.njobs() < disp.npoints()
+    E = energy(WATER.atoms, disp.xyz[disp.jobs])
+    assert np.allclose(disp.hessian(E, cartesian=True), 2.0 * np.kron(L, np.eye(3)))
+    assert np.allclose(disp.gradient(E), 2.0 * (L @ xyz).ravel())
+
+    #a geometry without symmetry keeps every point
+    asym = Geometry('asym', ['O', 'H', 'H'], [[0.0, 0.0, 0.0], [1.43, 1.1, 0.0], [-1.2, 1.3, 0.1]])
+    assert Displacements(asym, order=1).njobs() == 18
+
+    zmat = Zmat(str(EXAMPLE / "ZMAT"))
+    run = Runscript(str(EXAMPLE / "run.dummy"))
+    with tempfile.TemporaryDirectory() as tmp:
+        zopts = copy.deepcopy(ZMAT_OPTIONS)
+        zopts.set('calc', 'SCF')
+        zopts.set('basis', 'PVDZ')
+        disp = Displacements(WATER, step=0.01, order=1)
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            disp.generate('water', zmat, run, zopts)
+        finally:
+            os.chdir(cwd)
+        njobs = disp.njobs()
+        assert zmat.all_lines[1:3] == ["ATOM1\n", "ATOM2 1 R\n"]
+        jobs = disp.make_joblist('water', zmat, run, zopts).jobs
+        assert jobs[0].zmat is not jobs[1].zmat and jobs[0].zmat.all_lines != jobs[1].zmat.all_lines
+        assert sorted(f for f in os.listdir(tmp) if f.startswith("zmat.")) == ["zmat." + str(k).zfill(4) for k in range(1, njobs + 1)]
+        with open(os.path.join(tmp, "displacements.json")) as f:
+            data = json.load(f)
+        assert len(data["jobs"]) == njobs and len(data["points"]) == 18
+        assert data["points"][0] == {"point" : 1, "name" : "+x1", "job" : 1}
+        with open(os.path.join(tmp, "zmat.0002")) as f:
+            lines = f.read().splitlines()
+        geom = zmatrix.zmatrix_to_geometry(lines[1:lines.index("", lines.index("") + 1)], units="angstrom")
+        assert np.isclose(energy(geom.atoms, geom.xyz), energy(WATER.atoms, disp.xyz[disp.jobs[1]]))
+
+        #the whole rendered file, with one basis line per atom
+        assert lines[:5] == ["Title", "O", "H 1 R2", "H 1 R3 2 A3", ""] and [line.split()[0] for line in lines[5:8]] == ["R2", "R3", "A3"]
+        assert lines[8] == ""
+        assert lines[9:] == ["*CFOUR(CALC=SCF,BASIS=SPECIAL", "FROZEN_CORE=OFF,ABCD=STANDARD,REF=RHF", "CC_PROG=VCC",
+                             "SCF_CONV=8,CC_CONV=8,LINEQ_CONV=8", "MEMORY=64,MEM_UNIT=GB)", "", "O:PVDZ", "H:PVDZ", "H:PVDZ", ""]
+
+def test_symmetric_displacement():
+    W = np.array([[WEIGHTS.get((a, b), 0.0) for b in WATER.atoms] for a in WATER.atoms])
+    L = np.diag(W.sum(axis=1)) - W
+    disp = Displacements(WATER, step=0.01, order=1, symmetric=True)
+    assert disp.coords.shape == (3, 9) and disp.npoints() == 6
+    E = energy(WATER.atoms, disp.xyz[disp.jobs])
+    assert np.allclose(disp.gradient(E, cartesian=True), 2.0 * L @ np.asarray(WATER.xyz))
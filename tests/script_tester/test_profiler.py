@@ -0,0 +1,31 @@
+from superHEAT.script_generator.profiler import Profiler
+import tempfile
+import json
+import os
+
+def test_profiler():
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "events.jsonl")
+
+        #nothing is recorded while switched off
+        prof = Profiler()
+        with prof.timer('render'):
+            pass
+        prof.count('jobs_rendered')
+        assert prof.totals == {} and prof.counters == {}
+
+        prof.enable(log_file=log)
+        for job in range(3):
+            with prof.timer('render', job=job):
+                pass
+            prof.count('bytes_written', 10)
+        prof.disable()
+
+        assert prof.calls['render'] == 3
+        assert prof.counters['bytes_written'] == 30
+        assert 'render' in prof.summary_string()
+
+        with open(log) as f:
+            events = [json.loads(line) for line in f]
+        assert [e['job'] for e in events] == [0, 1, 2]
+        assert all(e['phase'] == 'render' for e in events)
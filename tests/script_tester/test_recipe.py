@@ -0,0 +1,69 @@
+from superHEAT.script_generator import *
+import tempfile
+import json
+import os
+
+RECIPE = {"name" : "test_recipe",
+          "zmat_options" : {"newnorm" : "OFF"},
+          "jobs" : [{"calc" : ["scf", "mp2"], "basis" : ["DZ", "TZ"],
+                     "name" : "{calc.proper_name}/{basis.proper_name}",
+                     "jobname" : "{molecule}_{calc.short_name}_{basis.short_name}"},
+                    {"zmat_options" : {"calc" : "SCF", "basis" : "PVTZ", "frzcore" : "ON"},
+                     "name" : "explicit SCF"}]}
+
+def test_recipe():
+    with tempfile.TemporaryDirectory() as tmp:
+        file = os.path.join(tmp, "recipe.json")
+        with open(file, "w") as f:
+            json.dump(RECIPE, f)
+
+        #compile, then make sure the second read comes from the cache
+        recipe = Recipe(file)
+        assert len(recipe.plan) == 5
+        assert os.path.exists(recipe.plan_file())
+        cached = Recipe(file)
+        assert cached.plan == recipe.plan
+
+        joblist = cached.make_joblist(molecule="H2")
+        names = [job.name for job in joblist.jobs]
+        assert names == ["SCF/cc-pVDZ", "SCF/cc-pVTZ", "MP2/cc-pVDZ", "MP2/cc-pVTZ", "explicit SCF"]
+
+        mp2 = joblist.jobs[2]
+        assert mp2.zmat_options.get('calc') == 'MP2'
+        assert mp2.zmat_options.get('basis') == 'PVDZ'
+        assert mp2.zmat_options.get('newnorm') == 'OFF'
+        assert mp2.run_options.get('jobname') == 'H2_mp2_DZ'
+
+        explicit = joblist.jobs[4]
+        assert explicit.zmat_options.get('frzcore') == 'ON'
+        assert explicit.zmat_options.get('basis') == 'PVTZ'
+
+def test_recipe_cache_key():
+    with tempfile.TemporaryDirectory() as tmp:
+        file = os.path.join(tmp, "recipe.json")
+        with open(file, "w") as f:
+            json.dump(RECIPE, f)
+        recipe = Recipe(file)
+
+        #a change to a registry compiles the recipe again, and validation rejects a removed calc
+        mp2 = CALCS.dict.pop("mp2")
+        try:
+            try:
+                Recipe(file)
+                assert False, "a recipe using a removed calc should not compile"
+            except SystemExit:
+                pass
+        finally:
+            CALCS.dict["mp2"] = mp2
+        assert Recipe(file).hash == recipe.hash
+
+def test_recipe_naming_fields():
+    with tempfile.TemporaryDirectory() as tmp:
+        file = os.path.join(tmp, "recipe.json")
+        with open(file, "w") as f:
+            json.dump({"jobs" : [{"basis" : "DZ", "zmat_options" : {"calc" : "SCF"}, "name" : "{calc.proper_name}/{basis.proper_name}"}]}, f)
+        try:
+            Recipe(file)
+            assert False, "a naming rule using a missing calc should exit"
+        except SystemExit as error:
+            assert error.code == 1
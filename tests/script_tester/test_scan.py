@@ -0,0 +1,64 @@
+from superHEAT.script_generator import *
+from superHEAT.archive_manager.geometry import *
+import numpy as np
+import tempfile
+import copy
+import os
+from pathlib import Path
+
+EXAMPLE = Path(__file__).resolve().parent.parent.parent / "examples" / "script_generator" / "simple"
+
+ETHANE = Geometry('ethane', ['C', 'C', 'H', 'H', 'H', 'H', 'H', 'H'], 
+                  [[0, 0, 0], [2.9, 0, 0], [-0.7, 1.7, 0.5], [-0.7, -1.2, 1.3], [-0.7, -0.5, -1.7], [3.6, 1.7, 0.5], [3.6, -1.2, 1.3], [3.6, -0.5, -1.7]])
+
+def make_joblist(molecule=None, zmat=None, run=None):
+    joblist = Joblist(molecule=molecule, zmat=zmat, run=run)
+    zopts = copy.deepcopy(ZMAT_OPTIONS)
+    ropts = copy.deepcopy(RUN_OPTIONS)
+    zopts.set('calc', 'SCF')
+    zopts.set('basis', 'PVDZ')
+    ropts.set('jobname', molecule + '_scf')
+    joblist.append(name='SCF/cc-pVDZ', zmat_options=zopts, run_options=ropts)
+    return joblist
+
+def test_scan():
+    scan = Scan(ETHANE, {'R2' : [0.3, 1.5, 1.6], 'D6' : [60.0, 180.0, 300.0]})
+    assert len(scan) == 9 and len(list(scan.points())) == 9
+
+    batches = list(scan.batches(batch_size=4))
+    assert [len(b[0]) for b in batches] == [4, 4, 1]
+    keep = np.concatenate([b[4] for b in batches])
+    assert batches[0][3].shape == (4, 8, 3)
+    assert keep.tolist() == [False]*3 + [True]*6
+
+    geoms = list(scan.geometries())
+    assert [number for number, geom in geoms] == [4, 5, 6, 7, 8, 9]
+    number, geom = geoms[4]
+    assert np.isclose(geom.dist(0, 1), 1.6 * BOHR_PER_ANGSTROM)
+    assert np.isclose(np.degrees(geom.dihedrals([[5] + scan.refs[5].tolist()], signed=True)[0]) % 360, 180.0)
+
+    zmat = Zmat(str(EXAMPLE / "ZMAT"))
+    run = Runscript(str(EXAMPLE / "run.dummy"))
+    with tempfile.TemporaryDirectory() as tmp:
+
+        out = os.path.join(tmp, "scan")
+        assert scan.generate(make_joblist, zmat, run, molecule='ethane', directory=out) == [4, 5, 6, 7, 8, 9]
+        assert sorted(os.listdir(out)) == ["point.000" + str(k) for k in range(4, 10)] + ["scan.txt"]
+        assert sorted(os.listdir(os.path.join(out, "point.0008"))) == ["joblist.txt", "run.0001", "zmat.0001"]
+        with open(os.path.join(out, "point.0008", "zmat.0001")) as f:
+            lines = f.read().splitlines()
+        assert lines[1] == "C" and "R2 = 1.60000000" in lines and "D6 = 180.00000000" in lines
+        assert lines[0] == "Title" and lines[9] == "" and lines[28] == "" and lines[29].startswith("*CFOUR(CALC=SCF,BASIS=SPECIAL")
+        assert lines[lines.index("MEMORY=64,MEM_UNIT=GB)") + 1:] == ["", "C:PVDZ", "C:PVDZ"] + ["H:PVDZ"] * 6 + [""]
+        with open(os.path.join(out, "scan.txt")) as f:
+            assert f.read().count("pruned") == 3
+
+def test_scan_large_contacts():
+    #chains of ethanes, checked with neighbor lists
+    xyz = np.concatenate([np.asarray(ETHANE.xyz) + [0.0, 0.0, 9.0 * k] for k in range(10)])
+    geom = Geometry('chain', list(ETHANE.atoms) * 10, xyz)
+    assert len(geom.atoms) > DENSE_ATOMS
+    scan = Scan(geom, {'R2' : [1.5]})
+    clash = xyz.copy()
+    clash[-1] = clash[0] + [0.1, 0.0, 0.0]
+    assert scan.physical(np.stack([xyz, clash])).tolist() == [True, False]
@@ -0,0 +1,71 @@
+from superHEAT.archive_manager.geometry import *
+from superHEAT.archive_manager.zmatrix import *
+from superHEAT.archive_manager.alignment import rmsd_
+from superHEAT.script_generator import Zmat
+import numpy as np
+import tempfile
+import os
+from pathlib import Path
+
+EXAMPLES = Path(__file__).resolve().parent.parent.parent / "examples" / "script_generator"
+
+ETHANE = Geometry('ethane', ['C', 'C', 'H', 'H', 'H', 'H', 'H', 'H'], 
+                  [[0, 0, 0], [2.9, 0, 0], [-0.7, 1.7, 0.5], [-0.7, -1.2, 1.3], [-0.7, -0.5, -1.7], [3.6, 1.7, 0.5], [3.6, -1.2, 1.3], [3.6, -0.5, -1.7]])
+
+def test_zmatrix_conversion():
+    rng = np.random.default_rng(1)
+    batch = Geometry_Batch('batch', ETHANE.atoms, ETHANE.xyz[None] + 0.05 * rng.normal(size=(20, 8, 3)))
+    refs = zmatrix_refs_(batch.xyz)
+    assert np.all(refs[1:, 0] < np.arange(1, 8)) and refs[3:, 2].min() >= 0
+
+    r, a, d = cartesian_to_zmatrix_(batch.xyz, refs)
+    assert r.shape == (20, 8)
+    xyz = zmatrix_to_cartesian_(refs, r, a, d)
+    assert np.allclose(rmsd_(xyz, batch.xyz), 0.0, atol=1e-6)
+    assert np.allclose(xyz[:, 0], 0.0) and np.allclose(xyz[:, 1, :2], 0.0) and np.allclose(xyz[:, 2, 1], 0.0)
+
+    #through the text of the Z-matrix, in Angstrom and in Bohr
+    blocks = zmatrix_blocks(batch)
+    assert len(blocks) == 20 and blocks[0][3] == "H 1 R4 3 A4 2 D4"
+    assert np.isclose(rmsd_(zmatrix_to_geometry(blocks[7]).xyz, batch.xyz[7]), 0.0, atol=1e-6)
+    bohr = zmatrix_blocks(batch[7], units="bohr")[0]
+    assert np.isclose(rmsd_(zmatrix_to_geometry(bohr, units="bohr").xyz, batch.xyz[7]), 0.0, atol=1e-6)
+
+    #linear molecules
+    co2 = Geometry('co2', ['O', 'C', 'O'], [[0, 0, -2.2], [0, 0, 0], [0, 0, 2.2]])
+    assert np.allclose(zmatrix_to_geometry(zmatrix_blocks(co2)[0]).distance_matrix(), co2.distance_matrix())
+
+def test_zmat_set_geometry():
+    zmat = Zmat(str(EXAMPLES / "simple" / "ZMAT"))
+    zmat.set_geometry(ETHANE)
+    assert zmat.all_lines[0] == "Title\n" and zmat.all_lines[1] == "C\n" and zmat.all_lines[3] == "H 1 R3 2 A3\n"
+    assert zmat.all_lines[zmat.options_start() - 1] == "\n"
+    assert zmat.all_lines[zmat.options_start()].startswith("*CFOUR(CALC=XXX")
+    assert np.allclose(zmat.get_geometry().distance_matrix(), ETHANE.distance_matrix(), atol=1e-6)
+
+    #the special basis lines are rebuilt for the new atoms, and the whole file is rendered
+    h2o = Geometry('h2o', ['O', 'H', 'H'], [[0, 0, 0], [0, 1.43, 1.11], [0, -1.43, 1.11]])
+    zmat.set_geometry(block=zmatrix_blocks(h2o, units="bohr")[0])
+    zmat.replace("YYY", "PVDZ")
+    with tempfile.TemporaryDirectory() as tmp:
+        zmat.to_file(os.path.join(tmp, "zmat.0001"))
+        with open(os.path.join(tmp, "zmat.0001")) as f:
+            text = f.read()
+    assert text == ("Title\nO\nH 1 R2\nH 1 R3 2 A3\n\nR2 = 1.81024860\nR3 = 1.81024860\nA3 = 104.36107100\n\n"
+                    "*CFOUR(CALC=XXX,BASIS=SPECIAL\nFROZEN_CORE=ZZZ,ABCD=AAA,REF=RHF\nCC_PROG=CCC\n"
+                    "SCF_CONV=8,CC_CONV=8,LINEQ_CONV=8\nMEMORY=64,MEM_UNIT=GB)\n\n"
+                    "O:PVDZ\nH:PVDZ\nH:PVDZ\n\n")
+
+    #atoms with their own line keep their basis, the others take that of the remaining lines
+    zmat = Zmat(str(EXAMPLES / "mixed_basis" / "ZMAT"))
+    zmat.set_geometry(h2o)
+    start, end = zmat.special_basis()
+    assert zmat.all_lines[start:end] == ["O:YYY\n", "H:HYY\n", "H:HYY\n"]
+    assert zmat.all_lines[end:] == ["\n"]
+
+    #setting it again replaces the block, and the basis lines
+    zmat.set_geometry(block=zmatrix_blocks(Geometry('h2', ['H', 'H'], [[0, 0, 0], [0, 0, 1.4]]))[0])
+    assert zmat.all_lines[1:5] == ["H\n", "H 1 R2\n", "\n", "R2 = 0.74084809\n"]
+    assert len(zmat.get_geometry().atoms) == 2
+    start, end = zmat.special_basis()
+    assert zmat.all_lines[start:end] == ["H:HYY\n", "H:HYY\n"]
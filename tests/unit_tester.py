@@ -2,10 +2,20 @@
 # unit_tester.py
 #
 # March 28, 2025 @ ANL : JHT added
+# October 19, 2026 : test discovery, process pool honoring -j, per-test timing
 #
-# Unit testing program for superHEAT 
+# Unit testing program for superHEAT
 #
-# NOTE: 
+# Discovers every top level test_* function in the tests/**/test_*.py files,
+# and runs them in a pool of -j worker processes. Each test runs in its own
+# temporary working directory, so tests that build archives at relative paths
+# (e.g. test_constarc) never see each other's files.
+#
+# A test passes if it returns TEST_PASS (or nothing), and fails if it returns
+# anything else or raises. The output of failing tests is printed at the end,
+# along with the slowest tests.
+#
+# NOTE:
 #   Requires docopt
 #
 
@@ -15,46 +25,102 @@
 """unit_test
 
 Usage:
-    unit_test.py [-j <ntask>]
+    unit_test.py [-j <ntask>] [--slowest=<n>] [<pattern>]
 
 Options:
-    -j  Number of concurrent tests to run [default: 1]
+    -j <ntask>      Number of concurrent tests to run [default: 1]
+    --slowest=<n>   Number of slowest tests to report [default: 5]
+    <pattern>       Only run tests whose name contains this string
 
 """
 
 ##############################################
 from docopt import docopt
+from pathlib import Path
 import concurrent.futures
+import importlib.util
+import contextlib
+import traceback
+import tempfile
+import ast
+import io
+import os
 import sys
 
 import time
 
-#from constarc import *
-#from archive_tester import * 
-
 TEST_PASS = 0
 TEST_FAIL = 1
 
-def call_member_func(obj, func):
-    func = getattr(obj, func)
-    return func()
-
-def success():
-    return TEST_PASS 
-
-def fail():
-    return TEST_FAIL
+TEST_DIR = Path(__file__).resolve().parent
+TOP_DIR  = TEST_DIR.parent
 
 class unit_test:
-    def __init__(self, func, name, note):
-        self.func = func
+    def __init__(self, file, name, note):
+        self.file = file
         self.name = name
         self.note = note
-        self.future = None
         self.result = None
+        self.duration = None
+        self.output = ""
 
-    def execute(self):
-        self.result = self.func()
+    #full name, used for reporting and filtering
+    def full_name(self):
+        return str(Path(self.file).relative_to(TEST_DIR).with_suffix('')) + "::" + self.name
+
+##############################################
+# Discovery
+#
+# Test files are parsed rather than imported here, so that module level code
+# only ever runs inside the workers
+#
+def discover(test_dir=TEST_DIR):
+    test_list = []
+    for file in sorted(test_dir.rglob("test_*.py")):
+        with open(file, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=str(file))
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) and node.name.startswith("test_"):
+                note = ast.get_docstring(node) or 'None'
+                test_list.append(unit_test(file = str(file), name = node.name, note = note.splitlines()[0]))
+    return test_list
+
+##############################################
+# Execution, inside the worker processes
+#
+_MODULES = {}
+
+#import a test file by path, once per worker
+def load_module(file):
+    if file not in _MODULES:
+        name = "unit_test_" + str(len(_MODULES))
+        spec = importlib.util.spec_from_file_location(name, file)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _MODULES[file] = module
+    return _MODULES[file]
+
+#run a single test in a fresh temporary directory, returns (result, duration, output)
+def execute(file, name):
+    if str(TOP_DIR) not in sys.path:
+        sys.path.insert(0, str(TOP_DIR))
+
+    output = io.StringIO()
+    cwd = os.getcwd()
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="superHEAT_test_") as tmp:
+        os.chdir(tmp)
+        try:
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                func = getattr(load_module(file), name)
+                ret = func()
+            result = TEST_PASS if ret is None or ret == TEST_PASS else TEST_FAIL
+        except BaseException:
+            output.write(traceback.format_exc())
+            result = TEST_FAIL
+        finally:
+            os.chdir(cwd)
+    return result, time.perf_counter() - t0, output.getvalue()
 
 
 ##############################################
@@ -63,27 +129,44 @@ class unit_test:
 if __name__ == "__main__":
 
     args = docopt(__doc__, version="Unit Tester 1.0")
-    ntask = args['-j'] 
+    ntask = int(args['-j'])
     if (ntask > 100) or (ntask < 1):
         ntask = 1
+    nslow = int(args['--slowest'])
 
-    test_list = []
-
-    #Add tests here
-    test_list.append(unit_test(func = success, name = "Default Pass", note= 'None'))
-    test_list.append(unit_test(func = fail, name = "Default Fail", note= 'None'))
+    test_list = discover()
+    if args['<pattern>'] is not None:
+        test_list = [test for test in test_list if args['<pattern>'] in test.full_name()]
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers = 4) as executor:
-        futures = [executor.submit(call_member_func, test, "execute") for test in test_list] 
+    t0 = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers = ntask) as executor:
+        futures = {executor.submit(execute, test.file, test.name) : test for test in test_list}
+        for future in concurrent.futures.as_completed(futures):
+            test = futures[future]
+            test.result, test.duration, test.output = future.result()
+    wall = time.perf_counter() - t0
 
     #print the results
-    print('{name: <30} {note: <50} {result: <10}'.format(name='Name', note='Note', result='Result'))
+    print('{name: <50} {note: <40} {time: >10} {result: <10}'.format(name='Name', note='Note', time='Time (s)', result='Result'))
     for test in test_list:
         rstring = ""
         if (test.result == TEST_PASS):
             rstring = "SUCCESS"
         else:
             rstring = "FAIL"
-        print('{name: <30} {note: <50} {result: <10}'.format(name=test.name, note=test.note, result=rstring))
-
-
+        print('{name: <50} {note: <40} {time: >10.3f} {result: <10}'.format(name=test.full_name(), note=test.note[:40], time=test.duration, result=rstring))
+
+    #print the output of the failures
+    failed = [test for test in test_list if test.result != TEST_PASS]
+    for test in failed:
+        print("\n---- Output of", test.full_name(), "----")
+        print(test.output)
+
+    #print the slowest tests
+    print("\nSlowest tests")
+    for test in sorted(test_list, key=lambda t: t.duration, reverse=True)[:nslow]:
+        print('{time: >10.3f} s  {name}'.format(time=test.duration, name=test.full_name()))
+
+    print("\n{npass} passed, {nfail} failed in {wall:.2f} s with {ntask} workers".format(
+          npass=len(test_list) - len(failed), nfail=len(failed), wall=wall, ntask=ntask))
+    sys.exit(TEST_FAIL if failed else TEST_PASS)
@@ -1,3 +1,6 @@
-# Zips the archive directory 
-import shutil
-shutil.unpack_archive('archive.zip', 'archive')
+# Unzips the archive directory 
+#
+# Only members that changed since the last unzip are extracted.
+# See superHEAT/archive_manager/archive_pack.py
+from superHEAT.archive_manager.archive_pack import unpack_archive
+unpack_archive('archive.zip', 'archive')
@@ -1,3 +1,7 @@
 # Zips the archive directory 
-import shutil
-shutil.make_archive('archive', 'zip', 'archive')
+#
+# Only files that changed since the last zip are repacked, and the zip is written
+# deterministically, so an unchanged archive gives an identical archive.zip.
+# See superHEAT/archive_manager/archive_pack.py
+from superHEAT.archive_manager.archive_pack import pack_archive
+pack_archive('archive', 'archive.zip')